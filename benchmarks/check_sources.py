@@ -0,0 +1,250 @@
+"""
+Scenario checks of the source handling against benchmarks.server (no database needed).
+
+Runs the real stages in a scratch project (benchmarks/work/checks/project/) against a
+copy of the generated x1 files (benchmarks/work/checks/sources/) and changes those
+files between the steps; the server's request log shows what went over the wire.
+
+  extract:   first run downloads everything, a second run costs one 304 per file, a
+             changed file is the only one downloaded again, an interrupted download is
+             resumed with a Range request instead of starting over
+  scheduler: `etl.scheduler --once --dry-run` on a current DWH sends one HEAD per file
+             (all 304) and plans nothing; one changed DWD file is found by HEAD alone and
+             plans only the weather branch; appended AKTIN days cost one range request
+             for the file tail and plan only the AKTIN branch
+
+The load is not run: its manifest consumer is marked directly (as after a successful load).
+
+  python -m benchmarks.check_sources
+Exits 1 if a check fails.
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.generate import AKTIN_FILE
+from benchmarks.run import PROJECT_PARTS, ensure_data
+from benchmarks.server import SourceServer
+from etl.manifest import MANIFEST_PATH, SourceManifest
+from etl.scheduler import CONSUMERS, TAIL_BYTES
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+CHECK_DIR = PROJECT_ROOT / "benchmarks/work/checks"
+
+# bytes after which the resume scenario breaks off the download
+DROP_AFTER = 100_000
+
+# read size of etl.manifest.fetch()
+CHUNK_BYTES = 1 << 16
+
+
+class Checks:
+    def __init__(self):
+        self.failures: list[str] = []
+
+    def __call__(self, name: str, ok: bool, detail: str = ""):
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}" + (f" ({detail})" if detail else ""))
+        if not ok:
+            self.failures.append(name)
+
+
+# =========================
+# Setup
+# =========================
+def scratch(scale: int) -> tuple[Path, Path]:
+    """(copy of the generated source files, scratch project)."""
+    shutil.rmtree(CHECK_DIR, ignore_errors=True)
+    sources = CHECK_DIR / "sources"
+    shutil.copytree(ensure_data(scale), sources)
+    root = CHECK_DIR / "project"
+    for part in PROJECT_PARTS:
+        shutil.copytree(PROJECT_ROOT / part, root / part, ignore=shutil.ignore_patterns("__pycache__"))
+    return sources, root
+
+
+def etl(root: Path, srv: SourceServer, *args: str) -> str:
+    """python -m <args> in the scratch project; returns stdout + stderr, raises on failure."""
+    env = {**os.environ, **srv.env(), "ETL_METRICS_DB": "0", "ETL_DAILY": "0", "PYTHONPATH": str(root)}
+    r = subprocess.run([sys.executable, "-m", *args], cwd=root, env=env,
+                       stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    if r.returncode != 0:
+        raise RuntimeError(f"python -m {' '.join(args)} failed (exit {r.returncode}):\n{r.stdout[-3000:]}")
+    return r.stdout
+
+
+def sha256(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def mark_loaded(root: Path):
+    """Records the current raw data as loaded in the scratch manifest (no database needed)."""
+    manifest = SourceManifest.load(root / MANIFEST_PATH.relative_to(PROJECT_ROOT))
+    manifest.mark_consumed(*CONSUMERS["load"])
+    manifest.save()
+
+
+def planned(out: str) -> list[str]:
+    """Stages of the scheduler's "would run:" line, [] if it found the DWH current."""
+    m = re.search(r"would run: (.+)$", out, re.M)
+    return m.group(1).split() if m else []
+
+
+# =========================
+# Upstream changes
+# =========================
+def change_dwd_value(path: Path, year: int = 2020):
+    """New Germany-wide value for one month of a DWD file (latin-1, ';'-separated)."""
+    lines = path.read_text(encoding="latin-1").split("\n")
+    header = next(l for l in lines if l.startswith("Jahr"))
+    col = [c.strip() for c in header.split(";")].index("Deutschland")
+    for i, line in enumerate(lines):
+        if line.startswith(f"{year};"):
+            fields = line.split(";")
+            fields[col] = f"{float(fields[col].replace(',', '.')) + 1.5:.2f}".replace(".", ",")
+            lines[i] = ";".join(fields)
+            break
+    path.write_text("\n".join(lines), encoding="latin-1")
+
+
+def append_aktin_days(path: Path, days: int = 3) -> str:
+    """Copies the rows of the last day to the following days; returns the new last day."""
+    from datetime import date, timedelta
+
+    text = path.read_text(encoding="utf-8")
+    last = text.rstrip("\n").rsplit("\n", 1)[1].split("\t", 1)[0]
+    rows = [l for l in text.splitlines() if l.startswith(last + "\t")]
+    day = date.fromisoformat(last)
+    with open(path, "a", encoding="utf-8") as f:
+        for _ in range(days):
+            day += timedelta(days=1)
+            f.writelines(r.replace(last, day.isoformat(), 1) + "\n" for r in rows)
+    return day.isoformat()
+
+
+# =========================
+# Scenarios
+# =========================
+def check_extract(sources: Path, root: Path, check: Checks):
+    aktin = sources / AKTIN_FILE
+    dwd_file = sources / "dwd/precipitation/regional_averages_rr_07.txt"
+    n_files = sum(1 for p in sources.rglob("*") if p.is_file() and p.name != ".complete")
+
+    print("=== extract: conditional GET ===")
+    with SourceServer(sources) as srv:
+        etl(root, srv, "etl", "extract")
+        reqs = srv.requests
+        check("first run downloads every file",
+              len(reqs) == n_files and all(r["method"] == "GET" and r["status"] == 200 for r in reqs),
+              f"{len(reqs)} requests for {n_files} files")
+
+        srv.reset_log()
+        etl(root, srv, "etl", "extract")
+        reqs = srv.requests
+        check("second run: one 304 per file, no body",
+              len(reqs) == n_files and all(r["status"] == 304 for r in reqs) and not sum(r["bytes"] for r in reqs),
+              f"statuses {sorted({r['status'] for r in reqs})}")
+
+        change_dwd_value(dwd_file)
+        srv.reset_log()
+        etl(root, srv, "etl", "extract")
+        got = [r for r in srv.requests if r["status"] == 200]
+        check("changed file is the only one downloaded",
+              [r["path"] for r in got] == [f"/dwd/precipitation/{dwd_file.name}"],
+              ", ".join(r["path"] for r in got) or "nothing downloaded")
+        local = root / "data/raw/dwd/precipitation" / dwd_file.name
+        check("local copy matches the changed file", sha256(local) == sha256(dwd_file))
+
+    print("=== extract: resume after a dropped connection ===")
+    append_aktin_days(aktin)
+    with SourceServer(sources, drop_after=DROP_AFTER) as srv:
+        out = etl(root, srv, "etl", "extract_aktin")
+        reqs = [r for r in srv.requests if r["method"] == "GET"]
+        size = aktin.stat().st_size
+        check("download broke off and was resumed with a Range request",
+              [r["status"] for r in reqs] == [200, 206] and (reqs[1]["range"] or "bytes=0-") != "bytes=0-"
+              and "resuming" in out,
+              " -> ".join(f"{r['status']} {r['bytes']} B" for r in reqs))
+        # the .part file only gets complete chunks, the one broken off is fetched again
+        n = sum(r["bytes"] for r in reqs)
+        check("at most one chunk downloaded twice", size <= n <= size + CHUNK_BYTES, f"{n} bytes for {size}")
+        check("resumed file is complete", sha256(root / "data/raw" / AKTIN_FILE) == sha256(aktin))
+
+
+def check_scheduler(sources: Path, root: Path, check: Checks):
+    aktin = sources / AKTIN_FILE
+    dwd_file = sources / "dwd/precipitation/regional_averages_rr_08.txt"
+    n_files = sum(1 for p in sources.rglob("*") if p.is_file() and p.name != ".complete")
+    dry_run = ("etl.scheduler", "--once", "--dry-run")
+
+    print("=== scheduler: HEAD / tail-range probe ===")
+    with SourceServer(sources) as srv:
+        # current raw data, transformed and (as far as the manifest knows) loaded
+        etl(root, srv, "etl", "extract", "transform")
+        mark_loaded(root)
+
+        srv.reset_log()
+        out = etl(root, srv, *dry_run)
+        reqs = srv.requests
+        check("nothing changed: DWH is current, nothing planned", "DWH is current" in out and not planned(out))
+        check("nothing changed: one HEAD per file, all 304",
+              len(reqs) == n_files and all(r["method"] == "HEAD" and r["status"] == 304 for r in reqs),
+              f"{len(reqs)} requests for {n_files} files, "
+              f"{sorted({(r['method'], r['status']) for r in reqs})}")
+
+        change_dwd_value(dwd_file, year=2021)
+        srv.reset_log()
+        out = etl(root, srv, *dry_run)
+        reqs = srv.requests
+        check("one changed DWD file: only the weather branch planned",
+              planned(out) == ["extract_dwd", "transform_weather", "validate", "load"],
+              " ".join(planned(out)) or "nothing planned")
+        changed = [r["path"] for r in reqs if r["status"] != 304]
+        check("one changed DWD file: found by HEAD alone, nothing downloaded",
+              all(r["method"] == "HEAD" for r in reqs) and changed == [f"/dwd/precipitation/{dwd_file.name}"],
+              ", ".join(changed) or "no change seen")
+
+        # run what was planned, then the DWH is current again
+        etl(root, srv, "etl", "extract_dwd", "transform_weather")
+        mark_loaded(root)
+        check("after the planned stages: DWH is current", not planned(etl(root, srv, *dry_run)))
+
+        last_day = append_aktin_days(aktin)
+        size = aktin.stat().st_size
+        srv.reset_log()
+        out = etl(root, srv, *dry_run)
+        gets = [r for r in srv.requests if r["method"] == "GET"]
+        check("appended AKTIN days: only the AKTIN branch planned",
+              planned(out) == ["extract_aktin", "transform_aktin", "validate", "load"],
+              " ".join(planned(out)) or "nothing planned")
+        check("appended AKTIN days: one range request for the last TAIL_BYTES",
+              len(gets) == 1 and gets[0]["status"] == 206
+              and gets[0]["range"] == f"bytes={size - TAIL_BYTES}-" and gets[0]["bytes"] <= TAIL_BYTES,
+              " -> ".join(f"{r['status']} {r['range']} {r['bytes']} B" for r in gets))
+        check("appended AKTIN days: latest day read from the tail", f"up to {last_day}" in out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Scenario checks of the source handling (see module docstring)")
+    parser.add_argument("--scale", type=int, default=1, help="size of the generated data (default 1)")
+    args = parser.parse_args(argv)
+
+    sources, root = scratch(args.scale)
+    check = Checks()
+    check_extract(sources, root, check)
+    check_scheduler(sources, root, check)
+
+    if check.failures:
+        print(f"FAILED: {', '.join(check.failures)}")
+        return 1
+    print("All checks passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
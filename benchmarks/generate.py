@@ -0,0 +1,130 @@
+"""
+Synthetic AKTIN / DWD source files at a multiple of today's size.
+
+  AKTIN: same date range and layout as the RKI file (2017-01-01 .. 2025-06-30,
+         7 age groups x 2 ED types), the number of syndromes grows with the scale
+         (5 real ones at 1x, SYN_0005 ... added above) -> monthly rows and facts grow too.
+  DWD:   36 regional_averages_*.txt files as published; the history grows backwards
+         (145 years at 1x), precipitation uses ',' as decimal separator like the real files.
+
+Files are written block by block, so memory stays flat also at 1000x.
+
+  python -m benchmarks.generate --scale 10 --out benchmarks/data/x10
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+SCALES = [1, 10, 100, 1000]
+
+AKTIN_FILE = "aktin/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv"
+AKTIN_START, AKTIN_END = "2017-01-01", "2025-06-30"
+SYNDROMES = ["ARI", "SARI", "ILI", "COVID", "GI"]
+AGE_GROUPS = ["00+", "0-4", "5-14", "15-34", "35-59", "60-79", "80+"]
+ED_TYPES = ["all", "central"]
+AKTIN_MEASURES = ["relative_cases", "relative_cases_7day_ma", "expected_value",
+                  "expected_lowerbound", "expected_upperbound"]
+
+DWD_YEARS = 145
+DWD_LAST_YEAR = 2025
+DWD_PARAMETERS = {"air_temperature_mean": ("tm", "."), "precipitation": ("rr", ","), "sunshine_duration": ("sd", ".")}
+# mean / standard deviation of the monthly values; precipitation and sunshine are never negative
+DWD_DISTRIBUTION = {"air_temperature_mean": (9, 7), "precipitation": (60, 30), "sunshine_duration": (130, 60)}
+REGIONS = [
+    "Brandenburg/Berlin", "Brandenburg", "Baden-Wuerttemberg", "Bayern", "Hessen",
+    "Mecklenburg-Vorpommern", "Niedersachsen", "Niedersachsen/Hamburg/Bremen", "Nordrhein-Westfalen",
+    "Rheinland-Pfalz", "Schleswig-Holstein", "Saarland", "Sachsen", "Sachsen-Anhalt",
+    "Thueringen/Sachsen-Anhalt", "Thueringen", "Deutschland",
+]
+
+
+def syndromes(scale: int) -> list[str]:
+    extra = len(SYNDROMES) * (scale - 1)
+    return SYNDROMES + [f"SYN_{i:04d}" for i in range(len(SYNDROMES), len(SYNDROMES) + extra)]
+
+
+def generate_aktin(path: Path, scale: int, seed: int = 1) -> int:
+    """Writes the AKTIN TSV (date-ordered, one month per block). Returns the number of rows."""
+    rng = np.random.default_rng(seed)
+    syn = syndromes(scale)
+    days = pd.date_range(AKTIN_START, AKTIN_END, freq="D")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    n_rows = 0
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write("\t".join(["date", "ed_type", "age_group", "syndrome", *AKTIN_MEASURES, "ed_count"]) + "\n")
+        for _, month_days in pd.Series(days).groupby(days.to_period("M")):
+            block = pd.MultiIndex.from_product(
+                [month_days.dt.strftime("%Y-%m-%d"), ED_TYPES, AGE_GROUPS, syn],
+                names=["date", "ed_type", "age_group", "syndrome"],
+            ).to_frame(index=False)
+            n = len(block)
+            for c in ("relative_cases", "relative_cases_7day_ma"):
+                v = np.round(rng.random(n) * 10, 2)
+                v[rng.random(n) < 0.1] = np.nan
+                block[c] = v
+            # model values: lower <= expected <= upper, missing together (docs/data_quality.md)
+            expected = np.round(rng.random(n) * 10, 2)
+            spread = np.round(rng.random(n) * 2, 2)
+            no_model = rng.random(n) < 0.1
+            for c, v in (("expected_value", expected), ("expected_lowerbound", np.maximum(expected - spread, 0)),
+                         ("expected_upperbound", expected + spread)):
+                block[c] = np.where(no_model, np.nan, v)
+            block["ed_count"] = rng.integers(10, 40, n)
+            block.to_csv(f, sep="\t", index=False, header=False, na_rep="NA")
+            n_rows += n
+    tmp.replace(path)
+    return n_rows
+
+
+def generate_dwd(root: Path, scale: int, seed: int = 2) -> int:
+    """Writes the 36 regional_averages files. Returns the number of data lines."""
+    rng = np.random.default_rng(seed)
+    years = np.arange(DWD_LAST_YEAR - DWD_YEARS * scale + 1, DWD_LAST_YEAR + 1)
+    n_lines = 0
+    for param, (abbr, dec) in DWD_PARAMETERS.items():
+        d = root / param
+        d.mkdir(parents=True, exist_ok=True)
+        for m in range(1, 13):
+            mean, sd = DWD_DISTRIBUTION[param]
+            v = rng.normal(mean, sd, (len(years), len(REGIONS)))
+            if param != "air_temperature_mean":
+                v = np.abs(v)
+            values = pd.DataFrame(np.round(v, 2), columns=REGIONS)
+            values.insert(0, "Monat", f"{m:02d}")
+            values.insert(0, "Jahr", years)
+            body = values.to_csv(sep=";", index=False, header=False, float_format="%8.2f", lineterminator=";\n")
+            if dec == ",":
+                body = body.replace(".", ",")
+            header = f"Monat;Monatsmittel {param};\nJahr;Monat;" + ";".join(REGIONS) + ";\n"
+            (d / f"regional_averages_{abbr}_{m:02d}.txt").write_text(header + body, encoding="utf-8")
+            n_lines += len(years)
+    return n_lines
+
+
+def generate(out: Path, scale: int) -> dict:
+    """AKTIN + DWD for one scale below `out` (layout as served by benchmarks.server)."""
+    t0 = time.perf_counter()
+    aktin_rows = generate_aktin(out / AKTIN_FILE, scale)
+    dwd_lines = generate_dwd(out / "dwd", scale)
+    info = {"scale": scale, "aktin_rows": aktin_rows, "dwd_lines": dwd_lines,
+            "seconds": round(time.perf_counter() - t0, 2)}
+    print(f"generated x{scale} in {out}: {aktin_rows} AKTIN rows, {dwd_lines} DWD lines ({info['seconds']}s)")
+    return info
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic AKTIN/DWD source files")
+    parser.add_argument("--scale", type=int, default=1, help=f"multiple of today's size, e.g. {SCALES}")
+    parser.add_argument("--out", type=Path, default=None, help="target directory (default benchmarks/data/x<scale>)")
+    args = parser.parse_args(argv)
+    generate(args.out or PROJECT_ROOT / f"benchmarks/data/x{args.scale}", args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmarks extract, transform and load at a multiple of today's data size.
+
+Per scale and repeat:
+  1. a scratch copy of the project in benchmarks/work/x<scale>/ (own data/, logs/),
+  2. the generated files behind benchmarks.server (AKTIN_URL / DWD_BASE_URL),
+  3. a throwaway database (PG* env, database ETL_BENCH_DB, default dwh_bench),
+     dropped and recreated from db/init/01_schema.sql,
+  4. every stage as its own `python -m etl <stage>` process, so peak RSS is per stage.
+
+Wall time, CPU time and peak RSS come from the stage metrics (logs/etl_metrics.jsonl);
+the best of --repeat runs counts. --save-baseline writes benchmarks/baselines/x<scale>.json,
+--check compares against it and exits 1 if a stage got slower than --threshold.
+
+  python -m benchmarks.run --scale 1 10 --repeat 3 --save-baseline
+  python -m benchmarks.run --scale 10 --check --threshold 0.2
+  python -m benchmarks.run --scale 100 --stages transform_aktin --profile
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.generate import generate
+from benchmarks.server import SourceServer
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+DATA_DIR = PROJECT_ROOT / "benchmarks/data"
+WORK_DIR = PROJECT_ROOT / "benchmarks/work"
+BASELINE_DIR = PROJECT_ROOT / "benchmarks/baselines"
+
+STAGES = ["extract_aktin", "extract_dwd", "transform_aktin", "transform_weather", "validate", "load"]
+DB_STAGES = {"load"}
+
+# copied into the scratch project (everything the stages read besides data/)
+PROJECT_PARTS = ["etl", "postgres", "db"]
+
+BENCH_DB = os.getenv("ETL_BENCH_DB", "dwh_bench")
+
+MEASURES = ("wall_seconds", "cpu_seconds", "peak_rss_mb")
+
+
+# =========================
+# Setup
+# =========================
+def ensure_data(scale: int) -> Path:
+    out = DATA_DIR / f"x{scale}"
+    if not (out / ".complete").exists():
+        shutil.rmtree(out, ignore_errors=True)
+        info = generate(out, scale)
+        (out / ".complete").write_text(json.dumps(info), encoding="utf-8")
+    return out
+
+
+def scratch_project(scale: int) -> Path:
+    root = WORK_DIR / f"x{scale}"
+    shutil.rmtree(root, ignore_errors=True)
+    root.mkdir(parents=True)
+    for part in PROJECT_PARTS:
+        shutil.copytree(PROJECT_ROOT / part, root / part, ignore=shutil.ignore_patterns("__pycache__"))
+    return root
+
+
+def reset_database(db: str):
+    """Drops and recreates the throwaway database and applies db/init/01_schema.sql."""
+    import psycopg2
+
+    params = dict(
+        host=os.getenv("PGHOST", "localhost"),
+        port=int(os.getenv("PGPORT", "5432")),
+        user=os.getenv("PGUSER", "admin"),
+        password=os.getenv("PGPASSWORD", "passwort"),
+    )
+    if db == os.getenv("PGDATABASE", "mydb"):
+        raise SystemExit(f"Refusing to drop '{db}': it is the configured DWH database (set ETL_BENCH_DB)")
+    conn = psycopg2.connect(dbname=os.getenv("ETL_BENCH_ADMIN_DB", "postgres"), **params)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'DROP DATABASE IF EXISTS "{db}" WITH (FORCE);')
+            cur.execute(f'CREATE DATABASE "{db}";')
+    finally:
+        conn.close()
+
+    conn = psycopg2.connect(dbname=db, **params)
+    try:
+        with conn, conn.cursor() as cur:
+            cur.execute((PROJECT_ROOT / "db/init/01_schema.sql").read_text(encoding="utf-8"))
+    finally:
+        conn.close()
+
+
+# =========================
+# Run
+# =========================
+def run_stage(root: Path, stage: str, env: dict, profile: bool) -> dict:
+    """One stage in its own process; returns its record from the scratch logs/etl_metrics.jsonl."""
+    cmd = [sys.executable, "-m", "etl", stage]
+    if profile:
+        cmd += ["--profile", stage]
+    log_path = root / "logs" / f"bench_{stage}.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "w", encoding="utf-8") as log:
+        rc = subprocess.run(cmd, cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT).returncode
+
+    recs = []
+    metrics_log = root / "logs/etl_metrics.jsonl"
+    if metrics_log.exists():
+        for line in metrics_log.read_text(encoding="utf-8").splitlines():
+            rec = json.loads(line)
+            if rec["run_id"] == env["ETL_RUN_ID"] and rec["stage"] == stage:
+                recs.append(rec)
+    if rc != 0 or not recs or recs[-1]["status"] != "ok":
+        tail = "\n".join(log_path.read_text(encoding="utf-8").splitlines()[-20:])
+        raise RuntimeError(f"stage {stage} failed (exit {rc}), see {log_path}:\n{tail}")
+    return recs[-1]
+
+
+def run_scale(scale: int, stages: list[str], repeat: int, profile: bool) -> dict:
+    data = ensure_data(scale)
+    best: dict[str, dict] = {}
+    with SourceServer(data) as srv:
+        for i in range(repeat):
+            root = scratch_project(scale)
+            # earlier stages produce the input of the later ones: run them, report only `stages`
+            needed = STAGES[:max(STAGES.index(s) for s in stages) + 1]
+            if DB_STAGES & set(needed):
+                reset_database(BENCH_DB)
+            env = {
+                **os.environ, **srv.env(),
+                "PGDATABASE": BENCH_DB,
+                "ETL_METRICS_DB": "0",
+                "ETL_RUN_ID": f"bench-x{scale}-{i + 1}",
+                "PYTHONPATH": str(root),
+            }
+            for stage in needed:
+                rec = run_stage(root, stage, env, profile and stage in stages)
+                if stage not in stages:
+                    continue
+                print(f"  x{scale} #{i + 1} {stage:<18} {rec['wall_seconds']:8.2f}s wall "
+                      f"{rec['cpu_seconds']:8.2f}s cpu {rec['peak_rss_mb']:8.1f} MB")
+                cur = {m: rec[m] for m in MEASURES}
+                cur["rows_out"] = rec.get("rows_out")
+                prev = best.get(stage)
+                # best of n: the least disturbed run; memory is not noisy, keep the highest
+                if prev is None or cur["wall_seconds"] < prev["wall_seconds"]:
+                    if prev is not None:
+                        cur["peak_rss_mb"] = max(cur["peak_rss_mb"], prev["peak_rss_mb"])
+                    best[stage] = cur
+                else:
+                    prev["peak_rss_mb"] = max(cur["peak_rss_mb"], prev["peak_rss_mb"])
+    return {
+        "scale": scale,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"node": platform.node(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "repeat": repeat,
+        "stages": best,
+    }
+
+
+# =========================
+# Baselines
+# =========================
+def baseline_path(scale: int) -> Path:
+    return BASELINE_DIR / f"x{scale}.json"
+
+
+def save_baseline(result: dict) -> Path:
+    path = baseline_path(result["scale"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def check(result: dict, threshold: float, min_seconds: float) -> list[str]:
+    """Stages slower than baseline * (1 + threshold) (and by more than min_seconds, against timer noise)."""
+    path = baseline_path(result["scale"])
+    if not path.exists():
+        raise SystemExit(f"No baseline for x{result['scale']} ({path}); run with --save-baseline first")
+    base = json.loads(path.read_text(encoding="utf-8"))
+    if base.get("machine", {}).get("node") != result["machine"]["node"]:
+        print(f"NOTE: baseline x{result['scale']} was recorded on '{base['machine'].get('node')}'")
+
+    failures = []
+    print(f"=== x{result['scale']} vs baseline ({base['created_at']}) ===")
+    for stage, cur in result["stages"].items():
+        old = base["stages"].get(stage)
+        if old is None:
+            print(f"  {stage:<18} no baseline")
+            continue
+        ratio = cur["wall_seconds"] / old["wall_seconds"] if old["wall_seconds"] else float("inf")
+        slower = ratio > 1 + threshold and cur["wall_seconds"] - old["wall_seconds"] > min_seconds
+        print(f"  {stage:<18} {old['wall_seconds']:8.2f}s -> {cur['wall_seconds']:8.2f}s ({ratio - 1:+6.1%})  "
+              f"RSS {old['peak_rss_mb']:7.1f} -> {cur['peak_rss_mb']:7.1f} MB  {'SLOWER' if slower else 'ok'}")
+        if slower:
+            failures.append(f"x{result['scale']} {stage}: {ratio - 1:+.1%}")
+    return failures
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="ETL benchmarks on synthetic data (see module docstring)")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1], help="e.g. 1 10 100 1000")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scale, the fastest counts")
+    parser.add_argument("--profile", action="store_true",
+                        help="also write the sampling profiles (benchmarks/work/x<scale>/logs/profile/)")
+    parser.add_argument("--save-baseline", action="store_true", help="write benchmarks/baselines/x<scale>.json")
+    parser.add_argument("--check", action="store_true", help="compare with the baseline, exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.1,
+                        help="ignore slowdowns smaller than this (timer noise of short stages)")
+    args = parser.parse_args(argv)
+
+    stages = [s for s in STAGES if s in args.stages]
+    failures = []
+    for scale in args.scale:
+        t0 = time.perf_counter()
+        print(f"=== benchmark x{scale}: {', '.join(stages)} ===")
+        result = run_scale(scale, stages, max(1, args.repeat), args.profile)
+        print(f"  done in {time.perf_counter() - t0:.1f}s")
+        if args.check:
+            failures += check(result, args.threshold, args.min_seconds)
+        if args.save_baseline:
+            print(f"Saved baseline {save_baseline(result).relative_to(PROJECT_ROOT)}")
+
+    if failures:
+        print(f"REGRESSION (> {args.threshold:.0%} slower): " + "; ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Local HTTP stand-in for the RKI (AKTIN) and DWD servers, serving a directory
+written by benchmarks.generate:
+
+  /aktin/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv
+  /dwd/<parameter>/regional_averages_<abbr>_<MM>.txt
+
+Sends ETag / Last-Modified and answers If-None-Match, If-Modified-Since and
+Range / If-Range like the real servers, so the extract stages take their normal path.
+--drop-after N cuts the first download of every file after N bytes (resume path);
+SourceServer.requests records what was asked (benchmarks.check_sources).
+
+  python -m benchmarks.server benchmarks/data/x10 --port 8765
+  AKTIN_URL=http://127.0.0.1:8765/aktin/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv \
+  DWD_BASE_URL=http://127.0.0.1:8765/dwd/ python -m etl extract
+"""
+import argparse
+import email.utils
+import http.server
+import shutil
+import socket
+import threading
+from functools import partial
+from pathlib import Path
+
+from benchmarks.generate import AKTIN_FILE
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, *args, root: Path, **kwargs):
+        self.root = root
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _record(self, status: int, n_bytes: int = 0):
+        with self.server.lock:
+            self.server.requests.append({
+                "method": self.command, "path": self.path, "status": status,
+                "range": self.headers.get("Range"), "bytes": n_bytes,
+            })
+
+    def _target(self) -> Path | None:
+        rel = self.path.split("?", 1)[0].lstrip("/")
+        path = (self.root / rel).resolve()
+        if self.root not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def _send(self, head_only: bool):
+        path = self._target()
+        if path is None:
+            self._record(404)
+            self.send_error(404)
+            return
+        st = path.stat()
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+        if self.headers.get("If-None-Match") == etag or (
+            "If-None-Match" not in self.headers and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self._record(304)
+            return
+
+        start, size = 0, st.st_size
+        rng = self.headers.get("Range", "")
+        if rng.startswith("bytes=") and self.headers.get("If-Range", etag) in (etag, last_modified):
+            first = rng[len("bytes="):].split("-", 1)[0]
+            if first.isdigit() and int(first) < size:
+                start = int(first)
+
+        self.send_response(206 if start else 200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.send_header("Accept-Ranges", "bytes")
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.send_header("Content-Length", str(size - start))
+        self.end_headers()
+        if head_only:
+            self._record(206 if start else 200)
+            return
+
+        n = size - start
+        with self.server.lock:
+            drop = self.server.drop_after is not None and path not in self.server.dropped
+            if drop:
+                self.server.dropped.add(path)
+                n = min(n, self.server.drop_after)
+        with open(path, "rb") as f:
+            f.seek(start)
+            if drop:
+                self.wfile.write(f.read(n))
+            else:
+                shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+        self._record(206 if start else 200, n)
+        if drop:
+            # connection lost in the middle of the body
+            self.wfile.flush()
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_GET(self):
+        self._send(head_only=False)
+
+    def do_HEAD(self):
+        self._send(head_only=True)
+
+
+class SourceServer:
+    """
+    Serves `root` on 127.0.0.1 in a background thread (port 0 = any free port).
+    drop_after: the first GET of each file breaks off after that many bytes.
+    """
+
+    def __init__(self, root: Path, port: int = 0, drop_after: int | None = None):
+        handler = partial(_Handler, root=Path(root).resolve())
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = []
+        self.httpd.drop_after = drop_after
+        self.httpd.dropped = set()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def requests(self) -> list[dict]:
+        """method, path, status, range and body bytes of every request so far."""
+        with self.httpd.lock:
+            return list(self.httpd.requests)
+
+    def reset_log(self):
+        with self.httpd.lock:
+            self.httpd.requests.clear()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """AKTIN_URL / DWD_BASE_URL for etl.extract.fetcher."""
+        return {"AKTIN_URL": f"{self.base_url}/{AKTIN_FILE}", "DWD_BASE_URL": f"{self.base_url}/dwd/"}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Serve generated AKTIN/DWD files over HTTP")
+    parser.add_argument("root", type=Path, help="directory written by benchmarks.generate")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--drop-after", type=int, default=None, metavar="BYTES",
+                        help="break off the first download of every file after BYTES (resume tests)")
+    args = parser.parse_args(argv)
+    with SourceServer(args.root, args.port, args.drop_after) as srv:
+        for k, v in srv.env().items():
+            print(f"{k}={v}")
+        try:
+            srv._thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -41,3 +41,158 @@ CREATE TABLE IF NOT EXISTS fakt_erkrankungen (
   sunshine_duration DOUBLE PRECISION NULL
 );
 
+
+-- Daily-grain mart (ETL_DAILY=1, etl/load/load_daily.py) with its own day dimension:
+-- dim_datum stays one row per month (the 1st), written by the monthly load only
+CREATE TABLE IF NOT EXISTS dim_tag (
+  tag_key BIGSERIAL PRIMARY KEY,
+  datum DATE NOT NULL,
+  jahr INT NOT NULL,
+  monat INT NOT NULL,
+  woche INT NOT NULL,
+  saison TEXT NOT NULL,
+  tag INT NOT NULL,
+  wochentag INT NOT NULL,
+  CONSTRAINT uq_dim_tag_datum UNIQUE (datum)
+);
+
+CREATE TABLE IF NOT EXISTS fakt_erkrankungen_taeglich (
+  jahr INT NOT NULL,
+  tag_key BIGINT NOT NULL,
+  syndrom_key BIGINT NOT NULL,
+  altersgruppe_key BIGINT NOT NULL,
+  edtype_key BIGINT NOT NULL,
+
+  relative_cases DOUBLE PRECISION NULL,
+  relative_cases_7day_ma DOUBLE PRECISION NULL,
+  expected_value DOUBLE PRECISION NULL,
+  expected_lowerbound DOUBLE PRECISION NULL,
+  expected_upperbound DOUBLE PRECISION NULL,
+  ed_count DOUBLE PRECISION NULL,
+
+  PRIMARY KEY (jahr, tag_key, syndrom_key, altersgruppe_key, edtype_key)
+) PARTITION BY RANGE (jahr);
+-- partitions (fakt_erkrankungen_taeglich_yYYYY) are created by the load
+
+CREATE INDEX IF NOT EXISTS ix_fakt_taeglich_alter_edtype_syndrom
+  ON fakt_erkrankungen_taeglich (altersgruppe_key, edtype_key, syndrom_key);
+
+-- Join/filter indexes for the BI view (dashboards filter altersgruppe + edtype, group by syndrom).
+-- ETL_FACT_LAYOUT=partitioned turns the table into one partitioned by jahr
+-- (python -m etl.load.partitioning, run by etl/entrypoint.sh after this file).
+CREATE INDEX IF NOT EXISTS ix_fakt_alter_edtype_syndrom
+  ON fakt_erkrankungen (altersgruppe_key, edtype_key, syndrom_key);
+CREATE INDEX IF NOT EXISTS ix_fakt_syndrom ON fakt_erkrankungen (syndrom_key);
+CREATE INDEX IF NOT EXISTS ix_dim_datum_jahr_monat ON dim_datum (jahr, monat);
+
+-- Dimension versions for the ETL key cache (etl/load/dim_cache.py):
+-- every write to a dimension bumps its counter, a cached value -> key map is valid
+-- only while (epoch, version) are unchanged
+CREATE TABLE IF NOT EXISTS etl_dim_version (
+  table_name TEXT PRIMARY KEY,
+  epoch UUID NOT NULL DEFAULT gen_random_uuid(),
+  version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION etl_bump_dim_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO etl_dim_version (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = etl_dim_version.version + 1;
+    RETURN NULL;
+END$$;
+
+CREATE OR REPLACE TRIGGER trg_dim_syndrom_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_syndrom
+FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+
+CREATE OR REPLACE TRIGGER trg_dim_altersgruppe_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_altersgruppe
+FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+
+CREATE OR REPLACE TRIGGER trg_dim_edtype_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_edtype
+FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+
+CREATE OR REPLACE TRIGGER trg_dim_datum_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_datum
+FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+
+CREATE OR REPLACE TRIGGER trg_dim_tag_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_tag
+FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+
+INSERT INTO etl_dim_version (table_name)
+VALUES ('dim_syndrom'), ('dim_altersgruppe'), ('dim_edtype'), ('dim_datum'), ('dim_tag')
+ON CONFLICT DO NOTHING;
+
+-- ETL observability: one row per pipeline stage and run (written by etl/metrics.py)
+CREATE TABLE IF NOT EXISTS etl_run_metrics (
+  run_id TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  started_at TIMESTAMPTZ NOT NULL,
+  status TEXT NOT NULL,
+  wall_seconds DOUBLE PRECISION NULL,
+  cpu_seconds DOUBLE PRECISION NULL,
+  bytes_downloaded BIGINT NULL,
+  rows_in BIGINT NULL,
+  rows_out BIGINT NULL,
+  rows_skipped BIGINT NULL,
+  peak_rss_mb DOUBLE PRECISION NULL,
+  -- peak_rss_mb is process-wide: stages that ran at the same time (NULL = ran alone)
+  rss_shared_with TEXT NULL,
+  error TEXT NULL,
+  PRIMARY KEY (run_id, stage)
+);
+
+-- load: written rows split into inserted / updated, plus rows compared but unchanged
+ALTER TABLE etl_run_metrics
+  ADD COLUMN IF NOT EXISTS rows_inserted BIGINT NULL,
+  ADD COLUMN IF NOT EXISTS rows_updated BIGINT NULL,
+  ADD COLUMN IF NOT EXISTS rows_unchanged BIGINT NULL;
+
+-- Rows rejected (or warned about) by the data-quality checks (etl/quality.py, docs/data_quality.md):
+-- the findings of the latest check, which replaces the rows of the tables it checked; run_id = the
+-- run that found them, rules = violated rules, row_data = the processed row as JSON
+CREATE TABLE IF NOT EXISTS etl_quarantine (
+  quarantine_key BIGSERIAL PRIMARY KEY,
+  run_id TEXT NOT NULL,
+  checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  source TEXT NOT NULL,
+  action TEXT NOT NULL,
+  rules TEXT[] NOT NULL,
+  reason TEXT NOT NULL,
+  year INT NULL,
+  month INT NULL,
+  syndrome TEXT NULL,
+  age_group TEXT NULL,
+  ed_type TEXT NULL,
+  row_data JSONB NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_etl_quarantine_run ON etl_quarantine (run_id);
+
+CREATE SCHEMA IF NOT EXISTS bi;
+
+-- Run-over-run view for Superset (throughput per stage)
+CREATE OR REPLACE VIEW bi.vw_etl_run_metrics AS
+SELECT
+  run_id,
+  stage,
+  started_at,
+  date_trunc('month', started_at)::date AS run_month,
+  status,
+  wall_seconds,
+  cpu_seconds,
+  bytes_downloaded,
+  rows_in,
+  rows_out,
+  rows_skipped,
+  peak_rss_mb,
+  rss_shared_with,
+  CASE WHEN wall_seconds > 0 THEN rows_out / wall_seconds END AS rows_out_per_second,
+  -- appended (CREATE OR REPLACE VIEW can only add columns at the end)
+  rows_inserted,
+  rows_updated,
+  rows_unchanged
+FROM etl_run_metrics;
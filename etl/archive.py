@@ -0,0 +1,179 @@
+import argparse
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+from etl.manifest import SourceManifest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+# data/archive/objects/<sha256[:2]>/<sha256>.gz    every raw file content once, gzip-compressed
+# data/archive/snapshots/<run_id>.json             state of all raw files after an extract run
+ARCHIVE_DIR = PROJECT_ROOT / "data/archive"
+OBJECTS_DIR = ARCHIVE_DIR / "objects"
+SNAPSHOTS_DIR = ARCHIVE_DIR / "snapshots"
+
+# ETL_ARCHIVE=0 -> extract does not archive (raw files are overwritten as before)
+ENABLED = os.getenv("ETL_ARCHIVE", "1").strip().lower() in ("1", "true", "yes")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def object_path(sha256: str) -> Path:
+    return OBJECTS_DIR / sha256[:2] / f"{sha256}.gz"
+
+
+def store(path: Path, sha256: str) -> int:
+    """
+    Adds the content of `path` (plain or .gz) under its SHA-256 (the one the manifest
+    recorded for the download). Known content is not read again.
+    Returns the bytes added to the archive (0 = already there).
+    """
+    target = object_path(sha256)
+    if target.exists():
+        return 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    h = hashlib.sha256()
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+        for block in iter(lambda: src.read(1 << 20), b""):
+            h.update(block)
+            dst.write(block)
+    if h.hexdigest() != sha256:
+        tmp.unlink()
+        raise ValueError(f"{path} does not match its manifest entry (sha256 {sha256[:12]}...), not archived")
+    os.replace(tmp, target)
+    return target.stat().st_size
+
+
+# =========================
+# Snapshots
+# =========================
+def _read_snapshot(path: Path) -> dict:
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def list_snapshots() -> list[dict]:
+    """All snapshots, oldest first."""
+    if not SNAPSHOTS_DIR.exists():
+        return []
+    snaps = [_read_snapshot(p) for p in SNAPSHOTS_DIR.glob("*.json")]
+    return sorted(snaps, key=lambda s: (s["created_at"], s["id"]))
+
+
+def load_snapshot(snapshot_id: str) -> dict:
+    """By id, unique id prefix or "latest"."""
+    snaps = list_snapshots()
+    if not snaps:
+        raise SystemExit(f"No snapshots in {SNAPSHOTS_DIR}")
+    if snapshot_id == "latest":
+        return snaps[-1]
+    hits = [s for s in snaps if s["id"] == snapshot_id] or [s for s in snaps if s["id"].startswith(snapshot_id)]
+    if len(hits) != 1:
+        raise SystemExit(f"Snapshot '{snapshot_id}' {'is ambiguous' if hits else 'not found'} "
+                         f"(python -m etl.archive list)")
+    return hits[0]
+
+
+def record_snapshot(snapshot_id: str, manifest: SourceManifest, results: list[dict]) -> dict:
+    """
+    Archives the files of one fetch_all() and records them in snapshot `snapshot_id`.
+    A snapshot always describes all raw files: it starts from the previous snapshot
+    (or from itself, when the AKTIN and DWD extracts of one run both report).
+    """
+    added = 0
+    files = {}
+    dropped = []
+    for res in results:
+        entry = manifest.sources[res["url"]]
+        try:
+            added += store(Path(res["path"]), entry["sha256"])
+        except (OSError, ValueError) as exc:
+            # the extract itself succeeded; the snapshot just cannot vouch for this file
+            print(f"WARN: {exc}")
+            dropped.append(res["url"])
+            continue
+        files[res["url"]] = {k: entry.get(k) for k in ("group", "path", "sha256", "size", "etag", "last_modified")}
+
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOTS_DIR / f"{snapshot_id}.json"
+    with open(ARCHIVE_DIR / "snapshots.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if path.exists():
+            snap = _read_snapshot(path)
+        else:
+            prev = list_snapshots()
+            snap = {"id": snapshot_id, "created_at": _now(), "changed": [],
+                    "files": dict(prev[-1]["files"]) if prev else {}}
+        for url in dropped:
+            snap["files"].pop(url, None)
+        for url, f in files.items():
+            if snap["files"].get(url, {}).get("sha256") != f["sha256"] and url not in snap["changed"]:
+                snap["changed"].append(url)
+            snap["files"][url] = f
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(snap, indent=2, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    print(f"Archived snapshot {snapshot_id}: {len(files)} file(s), "
+          f"{len(snap['changed'])} changed, {added} bytes added")
+    return snap
+
+
+def restore(snapshot_id: str, manifest: SourceManifest | None = None) -> dict:
+    """
+    Writes the raw files of a snapshot back to data/raw (no network) and points the
+    manifest at them: the next extract downloads in full again and reports the
+    difference to upstream as a change. Returns the snapshot.
+    """
+    snap = load_snapshot(snapshot_id)
+    own_manifest = manifest is None
+    manifest = manifest or SourceManifest.load()
+    for url, f in sorted(snap["files"].items()):
+        target = PROJECT_ROOT / f["path"]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        src = object_path(f["sha256"])
+        if target.suffix == ".gz":
+            shutil.copyfile(src, tmp)
+        else:
+            with gzip.open(src, "rb") as fin, open(tmp, "wb") as fout:
+                shutil.copyfileobj(fin, fout, 1 << 20)
+        os.replace(tmp, target)
+        # only one representation on disk (see manifest.fetch)
+        other = target.with_suffix("") if target.suffix == ".gz" else target.with_name(target.name + ".gz")
+        other.unlink(missing_ok=True)
+        manifest.restore(url, f, target)
+    if own_manifest:
+        manifest.save()
+    print(f"Restored snapshot {snap['id']} ({snap['created_at']}): {len(snap['files'])} raw file(s)")
+    return snap
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m etl.archive", description="Raw data archive")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="snapshots, oldest first")
+    p = sub.add_parser("restore", help="raw files of a snapshot -> data/raw (replay: python -m etl --replay ID)")
+    p.add_argument("snapshot", help="id, id prefix or 'latest'")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "list":
+        for s in list_snapshots():
+            groups = sorted({s["files"][u]["group"] for u in s["changed"] if u in s["files"]})
+            print(f"{s['id']:<28} {s['created_at']}  {len(s['files']):3d} files  "
+                  f"changed: {', '.join(groups) if groups else '-'}")
+    else:
+        restore(args.snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,9 +16,35 @@ done
 
 # Schema anwenden (idempotent durch CREATE TABLE IF NOT EXISTS)
 psql -h "$PGHOST" -U "$PGUSER" -d "$PGDATABASE" -f /app/db/init/01_schema.sql
+# Faktentabelle ggf. auf Partitionierung umstellen (ETL_FACT_LAYOUT), Constraints + Indizes.
+# Schlägt das fehl (z. B. Migration heap -> partitioned), startet kein ETL: der Container
+# bricht mit dem Fehler ab, statt mit einem anderen als dem konfigurierten Layout zu laden.
+if ! (cd /app && python -m etl.load.partitioning); then
+  echo "ERROR: fact table layout ETL_FACT_LAYOUT=${ETL_FACT_LAYOUT:-heap} could not be applied (error above), not starting the ETL" >&2
+  exit 1
+fi
 
-echo "==> Initial ETL run on container start..."
-/app/scripts/run_etl.sh
+# BI-Views und materialisierte BI-Tabellen (bi.*)
+psql -h "$PGHOST" -U "$PGUSER" -d "$PGDATABASE" -v ON_ERROR_STOP=1 -f /app/postgres/02_views.sql
 
-echo "==> Starting supercronic scheduler..."
-exec /usr/local/bin/supercronic /app/etl/cron/etl.cron
+# poll (Standard): Quellen regelmäßig per HEAD prüfen, nur betroffene Stufen laufen lassen;
+#                  kein Lauf beim Start, wenn das DWH schon aktuell ist
+# cron:            fester Monatslauf (etl/cron/etl.cron) plus ein voller Lauf bei jedem Start
+case "${ETL_SCHEDULE:-poll}" in
+  poll)
+    echo "==> Starting freshness-aware scheduler (every ${ETL_POLL_INTERVAL:-3600}s)..."
+    cd /app
+    exec python -m etl.scheduler
+    ;;
+  cron)
+    echo "==> Initial ETL run on container start..."
+    /app/scripts/run_etl.sh
+
+    echo "==> Starting supercronic scheduler..."
+    exec /usr/local/bin/supercronic /app/etl/cron/etl.cron
+    ;;
+  *)
+    echo "Unknown ETL_SCHEDULE='${ETL_SCHEDULE}' (poll|cron)" >&2
+    exit 1
+    ;;
+esac
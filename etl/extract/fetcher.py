@@ -0,0 +1,163 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from etl import archive, metrics, profiling
+from etl.manifest import SourceManifest, fetch, stored_path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # → DWH
+
+# Base URLs can be pointed at a local stand-in server (tests / benchmarks)
+AKTIN_URL = os.getenv(
+    "AKTIN_URL",
+    "https://raw.githubusercontent.com/robert-koch-institut/Daten_der_Notaufnahmesurveillance/main/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv",
+)
+DWD_BASE_URL = os.getenv(
+    "DWD_BASE_URL",
+    "https://opendata.dwd.de/climate_environment/CDC/regional_averages_DE/monthly/",
+)
+
+AKTIN_RAW = PROJECT_ROOT / "data/raw/aktin/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv"
+DWD_RAW_DIR = PROJECT_ROOT / "data/raw/dwd"
+
+# DWD parameter directory -> file abbreviation (regional_averages_<abbr>_<MM>.txt)
+DWD_PARAMETERS = {
+    "air_temperature_mean": "tm",
+    "precipitation": "rr",
+    "sunshine_duration": "sd",
+}
+
+WORKERS = int(os.getenv("ETL_FETCH_WORKERS", "8"))
+RETRIES = int(os.getenv("ETL_FETCH_RETRIES", "3"))
+TIMEOUT = int(os.getenv("ETL_FETCH_TIMEOUT", "60"))
+
+# ETL_RAW_COMPRESS=1 -> keep the (large, growing) AKTIN file gzip-compressed on disk
+RAW_COMPRESS = os.getenv("ETL_RAW_COMPRESS", "0").strip().lower() in ("1", "true", "yes")
+
+
+@dataclass(frozen=True)
+class Source:
+    url: str
+    out_path: Path
+    group: str
+    compress: bool = False
+
+
+def aktin_sources() -> list[Source]:
+    return [Source(AKTIN_URL, AKTIN_RAW, "aktin", compress=RAW_COMPRESS)]
+
+
+def dwd_sources(parameter: str) -> list[Source]:
+    abbr = DWD_PARAMETERS[parameter]
+    base = DWD_BASE_URL.rstrip("/") + f"/{parameter}/"
+    out = []
+    for m in range(1, 13):
+        filename = f"regional_averages_{abbr}_{m:02d}.txt"
+        out.append(Source(base + filename, DWD_RAW_DIR / parameter / filename, "dwd"))
+    return out
+
+
+def all_sources() -> list[Source]:
+    out = aktin_sources()
+    for parameter in DWD_PARAMETERS:
+        out += dwd_sources(parameter)
+    return out
+
+
+def make_session(pool_size: int = WORKERS, retries: int = RETRIES) -> requests.Session:
+    """Keep-alive session: one connection pool per host, retry with exponential backoff."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_all(sources: list[Source], workers: int = WORKERS, session=None,
+              manifest: SourceManifest | None = None) -> list[dict]:
+    """
+    Downloads all sources concurrently over one pooled session.
+    Returns one result dict per source (url, path, changed, bytes, seconds), in input order.
+    """
+    own_manifest = manifest is None
+    manifest = manifest or SourceManifest.load()
+    session = session or make_session(pool_size=workers)
+
+    def _one(src: Source) -> dict:
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        changed, n_bytes = fetch(
+            src.url, src.out_path, src.group, manifest,
+            session=session, timeout=TIMEOUT, compress=src.compress,
+        )
+        secs = time.perf_counter() - t0
+        status = "unchanged (304)" if n_bytes == 0 else ("changed" if changed else "same content")
+        print(f"  {stored_path(src.out_path, src.compress).relative_to(PROJECT_ROOT)}: {status}, {n_bytes} bytes, {secs:.2f}s")
+        return {"url": src.url, "path": stored_path(src.out_path, src.compress), "changed": changed, "bytes": n_bytes,
+                "seconds": secs, "cpu_seconds": time.thread_time() - cpu0}
+
+    t0 = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(_one, sources))
+    finally:
+        if own_manifest:
+            manifest.save()
+
+    if archive.ENABLED:
+        archive.record_snapshot(metrics.RUN_ID, manifest, results)
+
+    total = sum(r["bytes"] for r in results)
+    n_changed = sum(r["changed"] for r in results)
+    metrics.count(bytes_downloaded=total)
+    metrics.add_cpu(sum(r["cpu_seconds"] for r in results))
+    print(f"Fetched {len(results)} files ({n_changed} changed, {total} bytes) in {time.perf_counter() - t0:.2f}s")
+    return results
+
+
+SOURCE_SETS = {
+    "aktin": aktin_sources,
+    "dwd": lambda: [s for p in DWD_PARAMETERS for s in dwd_sources(p)],
+    **{p: (lambda p=p: dwd_sources(p)) for p in DWD_PARAMETERS},
+}
+
+
+def main(argv: list[str] | None = None):
+    """python -m etl.extract.fetcher [aktin|dwd|<dwd parameter> ...]  (default: everything)"""
+    names = argv if argv is not None else sys.argv[1:]
+    if not names:
+        sources = all_sources()
+    else:
+        unknown = [n for n in names if n not in SOURCE_SETS]
+        if unknown:
+            raise SystemExit(f"Unknown source set(s): {unknown}. Known: {sorted(SOURCE_SETS)}")
+        sources = [s for n in names for s in SOURCE_SETS[n]()]
+    return fetch_all(sources)
+
+
+def stage_name(names: list[str]) -> str:
+    """Pipeline stage (or alias) a standalone run corresponds to, for metrics and profiles."""
+    if names and set(names) == {"aktin"}:
+        return "extract_aktin"
+    if names and "aktin" not in names:
+        return "extract_dwd"
+    return "extract"
+
+
+if __name__ == "__main__":
+    name = stage_name(sys.argv[1:])
+    with metrics.stage(name), profiling.profiled(name):
+        main()
@@ -0,0 +1,173 @@
+import re
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../DWH
+
+VIEWS_SQL = PROJECT_ROOT / "postgres/02_views.sql"
+
+VIEW = "bi.vw_erkrankungen_monatlich"
+FLAT_TABLE = "bi.erkrankungen_monatlich"
+ROLLUP_TABLE = "bi.agg_erkrankungen_klassen"
+
+# Class boundaries of the dashboard datasets (superset/assets/dashboards)
+CLASS_COLUMNS = """
+  CASE
+    WHEN temperature_mean IS NULL THEN NULL
+    WHEN temperature_mean <= 2 THEN 'kalt (≤ 2°C)'
+    WHEN temperature_mean <= 12 THEN 'mild (2–12°C)'
+    ELSE 'warm (> 12°C)'
+  END,
+  CASE
+    WHEN precipitation IS NULL THEN NULL
+    WHEN precipitation < 10 THEN '<10 mm'
+    WHEN precipitation < 30 THEN '10–30 mm'
+    WHEN precipitation < 60 THEN '30–60 mm'
+    WHEN precipitation < 100 THEN '60–100 mm'
+    ELSE '>=100 mm'
+  END,
+  CASE
+    WHEN precipitation IS NULL THEN NULL
+    WHEN precipitation < 40 THEN 'trocken'
+    WHEN precipitation < 80 THEN 'normal'
+    ELSE 'sehr nass'
+  END,
+  CASE
+    WHEN sunshine_duration IS NULL THEN NULL
+    WHEN sunshine_duration < 50 THEN '<50 h'
+    WHEN sunshine_duration < 100 THEN '50–100 h'
+    WHEN sunshine_duration < 150 THEN '100–150 h'
+    WHEN sunshine_duration < 200 THEN '150–200 h'
+    ELSE '>=200 h'
+  END"""
+
+# flat row -> one (rollup_dim, bucket) per dashboard grouping
+ROLLUP_BUCKETS = """
+  CROSS JOIN LATERAL (VALUES
+    ('season', f.season),
+    ('temperature', f.temperature_class),
+    ('precipitation', f.precipitation_class),
+    ('precipitation_category', f.precipitation_category),
+    ('sunshine', f.sunshine_class)
+  ) AS b(rollup_dim, bucket)"""
+
+MEASURE_COLUMNS = [
+    "relative_cases", "relative_cases_7day_ma",
+    "expected_value", "expected_lowerbound", "expected_upperbound",
+    "ed_count", "temperature_mean", "precipitation", "sunshine_duration",
+]
+
+
+def apply_views_sql(cur):
+    """Runs postgres/02_views.sql (its daily view needs the daily tables, created if missing)."""
+    from etl.load.load_daily import ensure_daily_schema
+
+    ensure_daily_schema(cur)
+    cur.execute(VIEWS_SQL.read_text(encoding="utf-8"))
+
+
+def ensure_bi_layer(cur) -> bool:
+    """
+    Creates view + BI tables from postgres/02_views.sql when they are missing.
+    Returns True if they were created now (-> the first refresh must cover all months).
+    The file is not re-run on every load: CREATE OR REPLACE VIEW would lock out readers.
+    """
+    cur.execute("SELECT to_regclass(%s), to_regclass(%s);", (FLAT_TABLE, ROLLUP_TABLE))
+    if all(cur.fetchone()):
+        return False
+    apply_views_sql(cur)
+    return True
+
+
+def _view_over(cur, facts: str) -> str:
+    """Temp copy of the monthly view that reads the fact rows of the query `facts` instead."""
+    cur.execute("SELECT pg_get_viewdef(%s::regclass, true);", (VIEW,))
+    definition, n = re.subn(r"\bfakt_erkrankungen\b", lambda _: f"({facts})", cur.fetchone()[0])
+    if n != 1:
+        raise RuntimeError(f"{VIEW}: expected one reference to fakt_erkrankungen, found {n}")
+    cur.execute(f"CREATE OR REPLACE TEMP VIEW _bi_source AS {definition}")
+    return "_bi_source"
+
+
+def _collect_groups(cur):
+    """Rollup groups touched by the flat rows of the months in _bi_months."""
+    cur.execute(f"""
+        INSERT INTO _bi_groups
+        SELECT DISTINCT b.rollup_dim, b.bucket, f.syndrome, f.age_group, f.ed_type
+        FROM {FLAT_TABLE} f
+        JOIN _bi_months m ON m.datum_key = f.datum_key
+        {ROLLUP_BUCKETS}
+        WHERE b.bucket IS NOT NULL
+        ON CONFLICT DO NOTHING;
+    """)
+
+
+def refresh(cur, datum_keys=None, facts: str | None = None) -> tuple[int, int]:
+    """
+    Replaces the flat rows of the given months (None = all months) and recomputes
+    the rollup groups they belong to, before and after the change.
+    Runs inside the caller's transaction: dashboards see either the old or the new state.
+    `facts`: query for the fact rows to read instead of fakt_erkrankungen (the version
+    ETL_PUBLISH_MODE=swap is about to publish).
+    Returns (flat rows written, rollup groups recomputed).
+    """
+    cur.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS _bi_months (datum_key BIGINT PRIMARY KEY) ON COMMIT DROP;
+        CREATE TEMP TABLE IF NOT EXISTS _bi_groups (
+          rollup_dim TEXT, bucket TEXT, syndrome TEXT, age_group TEXT, ed_type TEXT,
+          PRIMARY KEY (rollup_dim, bucket, syndrome, age_group, ed_type)
+        ) ON COMMIT DROP;
+        TRUNCATE _bi_months, _bi_groups;
+    """)
+    if datum_keys is None:
+        cur.execute("INSERT INTO _bi_months SELECT datum_key FROM dim_datum;")
+    else:
+        cur.execute("INSERT INTO _bi_months SELECT DISTINCT unnest(%s::bigint[]);",
+                    ([int(k) for k in datum_keys],))
+    cur.execute("ANALYZE _bi_months;")
+
+    # old classes of the changed months (a month can move to another bucket)
+    _collect_groups(cur)
+
+    cur.execute(f"DELETE FROM {FLAT_TABLE} f USING _bi_months m WHERE f.datum_key = m.datum_key;")
+    source = VIEW if facts is None else _view_over(cur, facts)
+    cols = ", ".join(MEASURE_COLUMNS)
+    cur.execute(f"""
+        INSERT INTO {FLAT_TABLE} (
+          datum_key, year, month, month_date, season, syndrome, age_group, ed_type, {cols},
+          temperature_class, precipitation_class, precipitation_category, sunshine_class
+        )
+        SELECT
+          v.datum_key, v.year, v.month, v.month_date, v.season, v.syndrome, v.age_group, v.ed_type, {cols},
+          {CLASS_COLUMNS}
+        FROM {source} v
+        WHERE v.datum_key IN (SELECT datum_key FROM _bi_months);
+    """)
+    n_rows = cur.rowcount
+    if facts is not None:
+        cur.execute("DROP VIEW _bi_source;")  # must not depend on the table the swap renames
+
+    # new classes
+    _collect_groups(cur)
+
+    cur.execute(f"""
+        DELETE FROM {ROLLUP_TABLE} a USING _bi_groups g
+        WHERE (a.rollup_dim, a.bucket, a.syndrome, a.age_group, a.ed_type)
+            = (g.rollup_dim, g.bucket, g.syndrome, g.age_group, g.ed_type);
+    """)
+    cur.execute(f"""
+        INSERT INTO {ROLLUP_TABLE} (
+          rollup_dim, bucket, syndrome, age_group, ed_type,
+          n_months, sum_relative_cases, avg_relative_cases, avg_ed_count
+        )
+        SELECT b.rollup_dim, b.bucket, f.syndrome, f.age_group, f.ed_type,
+               count(f.relative_cases), sum(f.relative_cases), avg(f.relative_cases), avg(f.ed_count)
+        FROM {FLAT_TABLE} f
+        JOIN _bi_groups g
+          ON g.syndrome = f.syndrome AND g.age_group = f.age_group AND g.ed_type = f.ed_type
+        {ROLLUP_BUCKETS}
+        WHERE b.rollup_dim = g.rollup_dim AND b.bucket = g.bucket
+        GROUP BY b.rollup_dim, b.bucket, f.syndrome, f.age_group, f.ed_type;
+    """)
+    cur.execute("SELECT count(*) FROM _bi_groups;")
+    n_groups = cur.fetchone()[0]
+    return n_rows, n_groups
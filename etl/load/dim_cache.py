@@ -0,0 +1,125 @@
+import json
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../DWH
+
+CACHE_PATH = PROJECT_ROOT / "data/state/dim_keys.json"
+
+# dim_tag exists only once the daily mart was loaded (etl/load/load_daily.py)
+DIM_TABLES = ["dim_syndrom", "dim_altersgruppe", "dim_edtype", "dim_datum", "dim_tag"]
+
+
+def ensure_dim_versions(cur):
+    """
+    Version counter per dimension table, bumped by a statement trigger on every write.
+    `epoch` is random per row, so a recreated database never matches an old cache.
+    Same DDL as in db/init/01_schema.sql.
+    """
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS etl_dim_version (
+      table_name TEXT PRIMARY KEY,
+      epoch UUID NOT NULL DEFAULT gen_random_uuid(),
+      version BIGINT NOT NULL DEFAULT 0
+    );
+    """)
+
+    cur.execute("""
+    CREATE OR REPLACE FUNCTION etl_bump_dim_version() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO etl_dim_version (table_name, version) VALUES (TG_TABLE_NAME, 1)
+        ON CONFLICT (table_name) DO UPDATE SET version = etl_dim_version.version + 1;
+        RETURN NULL;
+    END$$;
+    """)
+
+    for table in DIM_TABLES:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (table,))
+        if not cur.fetchone()[0]:
+            continue
+        cur.execute(f"""
+        CREATE OR REPLACE TRIGGER trg_{table}_version
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION etl_bump_dim_version();
+        """)
+
+    cur.execute(
+        "INSERT INTO etl_dim_version (table_name) SELECT unnest(%s::text[]) ON CONFLICT DO NOTHING;",
+        (DIM_TABLES,),
+    )
+
+
+class DimKeyCache:
+    """
+    value -> surrogate key per dimension table, kept in data/state/dim_keys.json.
+
+    An entry is valid as long as the table's (epoch, version) in etl_dim_version is
+    the one stored with it; any other write to the table invalidates it. The cache may
+    hold only a subset of a table (the values the ETL has needed so far).
+    """
+
+    def __init__(self, path: Path = CACHE_PATH, tables: dict | None = None):
+        self.path = path
+        self.tables = tables or {}   # table -> {"epoch", "version", "keys": {value: key}}
+        self.invalidated: list[str] = []
+
+    @classmethod
+    def load(cls, path: Path = CACHE_PATH) -> "DimKeyCache":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(path, json.load(f).get("tables", {}))
+        except FileNotFoundError:
+            return cls(path)
+        except (OSError, ValueError) as exc:
+            print(f"WARN: ignoring unreadable dimension key cache {path}: {exc}")
+            return cls(path)
+
+    def save(self):
+        """Only call after the load transaction committed (keys of a rolled back insert are gone)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tables": self.tables}, f)
+        os.replace(tmp, self.path)
+
+    def _versions(self, cur, lock: bool) -> dict[str, tuple[str, int]]:
+        cur.execute(
+            "SELECT table_name, epoch::text, version FROM etl_dim_version "
+            "WHERE table_name = ANY(%s)" + (" FOR UPDATE" if lock else "") + ";",
+            (DIM_TABLES,),
+        )
+        return {t: (e, int(v)) for t, e, v in cur.fetchall()}
+
+    def sync(self, cur):
+        """
+        Checks every table's version (one small query) and drops stale entries.
+        FOR UPDATE on the version rows keeps other dimension writers out until commit,
+        so nothing can change behind the cache during this load.
+        """
+        versions = self._versions(cur, lock=True)
+        self.invalidated = []
+        for table in DIM_TABLES:
+            entry = self.tables.get(table)
+            current = versions.get(table)
+            if entry is None or current is None or (entry["epoch"], entry["version"]) != current:
+                if entry is not None:
+                    self.invalidated.append(table)
+                epoch, version = current or (None, None)
+                self.tables[table] = {"epoch": epoch, "version": version, "keys": {}}
+
+    def stamp(self, cur):
+        """Takes over the versions after this load's own dimension writes."""
+        for table, (epoch, version) in self._versions(cur, lock=False).items():
+            entry = self.tables.setdefault(table, {"keys": {}})
+            entry["epoch"], entry["version"] = epoch, version
+
+    def keys(self, table: str) -> dict:
+        return self.tables.setdefault(table, {"epoch": None, "version": None, "keys": {}})["keys"]
+
+    def missing(self, table: str, values) -> list:
+        known = self.keys(table)
+        return [v for v in values if v not in known]
+
+    def update(self, table: str, mapping: dict):
+        self.keys(table).update(mapping)
@@ -1,19 +1,83 @@
+import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import date
 
+import numpy as np
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
 
+from etl import manifest as source_manifest
+from etl import metrics, processed, profiling, quality
+from etl.load import bi_layer, publish, superset_cache
+from etl.load.dim_cache import DimKeyCache, ensure_dim_versions
+from etl.load.partitioning import FACT_TABLE, ensure_fact_layout, ensure_partitions
+from etl.manifest import SourceManifest
+from etl.transform.transform_aktin_monthly import clear_pending, read_pending
+from etl.transform.transform_weather_monthly_de import clear_pending as clear_weather_pending
+from etl.transform.transform_weather_monthly_de import read_pending as read_weather_pending
+
 
 # =========================
 # Paths / Inputs
 # =========================
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../DWH
 
-AKTIN_CSV = PROJECT_ROOT / "data/processed/aktin_monthly.csv"
-WEATHER_CSV = PROJECT_ROOT / "data/processed/weather_monthly_de.csv"
+AKTIN_NAME = "aktin_monthly"
+WEATHER_NAME = "weather_monthly_de"
+
+AKTIN_COLUMNS = [
+    "year", "month", "syndrome", "age_group", "ed_type",
+    "relative_cases_avg", "relative_cases_7day_ma_avg",
+    "expected_value_avg", "expected_lowerbound_avg", "expected_upperbound_avg",
+    "ed_count_avg",
+]
+WEATHER_COLUMNS = ["year", "month", "temperature_mean", "precipitation", "sunshine_duration"]
+
+# "upsert": execute_values + ON CONFLICT directly into the target tables (default)
+# "copy":   COPY FROM STDIN into unlogged staging tables, then one set-based merge
+LOAD_MODE = os.getenv("ETL_LOAD_MODE", "upsert").strip().lower()
+
+# ETL_PUBLISH_MODE=swap: blue/green publication of the fact table (see publish.py)
+PUBLISH_SWAP = publish.PUBLISH_MODE == "swap"
+
+STAGE = "load"
+SOURCE_GROUPS = ["aktin", "dwd"]
+
+FACT_COLUMNS = [
+    "datum_key", "syndrom_key", "altersgruppe_key", "edtype_key",
+    "relative_cases", "relative_cases_7day_ma",
+    "expected_value", "expected_lowerbound", "expected_upperbound",
+    "ed_count",
+    "temperature_mean", "precipitation", "sunshine_duration",
+]
+
+# grain of fakt_erkrankungen; a partitioned table has jahr (its partition key) in front
+FACT_GRAIN = ["datum_key", "syndrom_key", "altersgruppe_key", "edtype_key"]
+
+# processed column -> fact measure column
+FACT_MEASURES = {
+    "relative_cases_avg": "relative_cases",
+    "relative_cases_7day_ma_avg": "relative_cases_7day_ma",
+    "expected_value_avg": "expected_value",
+    "expected_lowerbound_avg": "expected_lowerbound",
+    "expected_upperbound_avg": "expected_upperbound",
+    "ed_count_avg": "ed_count",
+    "temperature_mean": "temperature_mean",
+    "precipitation": "precipitation",
+    "sunshine_duration": "sunshine_duration",
+}
+
+# Rows per batch when fact rows are converted for the database
+# (bounds the temporary object/text copies independent of the total size)
+FACT_BATCH_ROWS = int(os.getenv("ETL_FACT_BATCH_ROWS", "50000"))
+
+# > 1: facts are sharded by month range and COPYed into staging over this many
+# connections in parallel; one merge in the main transaction publishes them atomically
+LOAD_WORKERS = int(os.getenv("ETL_LOAD_WORKERS", "1"))
 
 
 # =========================
@@ -44,11 +108,12 @@ def connect():
     )
 
 
-def ensure_constraints(cur):
+def ensure_constraints(cur) -> bool:
     """
     PostgreSQL supports CREATE INDEX IF NOT EXISTS,
     but NOT: ALTER TABLE ... ADD CONSTRAINT IF NOT EXISTS
     -> Use DO blocks for idempotent constraint creation.
+    Also applies ETL_FACT_LAYOUT (see partitioning.py); returns True if the fact table is partitioned.
     """
     cur.execute("""
     DO $$
@@ -100,9 +165,125 @@ def ensure_constraints(cur):
     END$$;
     """)
 
+    return ensure_fact_layout(cur)
+
+
+def ensure_staging(cur):
+    """
+    Unlogged staging tables for the COPY load mode.
+    UNLOGGED skips the WAL; the content is truncated before every use anyway.
+    """
+    cur.execute("""
+    CREATE UNLOGGED TABLE IF NOT EXISTS stg_dim_value (
+      val TEXT NOT NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE UNLOGGED TABLE IF NOT EXISTS stg_dim_datum (
+      datum DATE NOT NULL,
+      jahr INT NOT NULL,
+      monat INT NOT NULL,
+      woche INT NOT NULL,
+      saison TEXT NOT NULL
+    );
+    """)
+
+    cur.execute("""
+    CREATE UNLOGGED TABLE IF NOT EXISTS stg_fakt_erkrankungen (
+      jahr INT NULL,
+      datum_key BIGINT NOT NULL,
+      syndrom_key BIGINT NOT NULL,
+      altersgruppe_key BIGINT NOT NULL,
+      edtype_key BIGINT NOT NULL,
+
+      relative_cases DOUBLE PRECISION NULL,
+      relative_cases_7day_ma DOUBLE PRECISION NULL,
+      expected_value DOUBLE PRECISION NULL,
+      expected_lowerbound DOUBLE PRECISION NULL,
+      expected_upperbound DOUBLE PRECISION NULL,
+      ed_count DOUBLE PRECISION NULL,
+
+      temperature_mean DOUBLE PRECISION NULL,
+      precipitation DOUBLE PRECISION NULL,
+      sunshine_duration DOUBLE PRECISION NULL
+    );
+    """)
+    # staging tables from before the partitioned layout
+    cur.execute("ALTER TABLE stg_fakt_erkrankungen ADD COLUMN IF NOT EXISTS jahr INT NULL;")
+
+
+# =========================
+# COPY helpers
+# =========================
+def _copy_value(v) -> str:
+    """Single value in PostgreSQL COPY text format (NULL = \\N)."""
+    if v is None:
+        return "\\N"
+    if isinstance(v, float):
+        return "\\N" if v != v else repr(v)
+    s = str(v)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
 
-def upsert_dim_text(cur, table: str, col: str, values: list[str]):
-    """Insert unique string values into a dimension table."""
+def _copy_lines(rows):
+    for row in rows:
+        yield "\t".join(_copy_value(v) for v in row) + "\n"
+
+
+class _CopyStream(io.TextIOBase):
+    """
+    File-like object over an iterator of COPY text chunks,
+    so copy_expert() streams them without building one big buffer.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts = [self._buf]
+        n = len(self._buf)
+        for chunk in self._chunks:
+            parts.append(chunk)
+            n += len(chunk)
+            if size is not None and 0 <= size <= n:
+                break
+        data = "".join(parts)
+        if size is None or size < 0:
+            self._buf = ""
+            return data
+        self._buf = data[size:]
+        return data[:size]
+
+
+def copy_rows(cur, table: str, columns: list[str], rows) -> int:
+    """TRUNCATE + COPY FROM STDIN into a staging table. Returns the number of rows sent."""
+    rows = list(rows)
+    cur.execute(f"TRUNCATE {table};")
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", _CopyStream(_copy_lines(rows)))
+    return len(rows)
+
+
+def _frame_chunks(df: pd.DataFrame, batch_rows: int):
+    """Renders a DataFrame batch-wise as COPY text; NaN -> \\N."""
+    for start in range(0, len(df), batch_rows):
+        yield df.iloc[start:start + batch_rows].to_csv(
+            sep="\t", na_rep="\\N", header=False, index=False
+        )
+
+
+def copy_frame(cur, table: str, df: pd.DataFrame, batch_rows: int = FACT_BATCH_ROWS) -> int:
+    """Like copy_rows(), but renders whole column batches instead of single values."""
+    cur.execute(f"TRUNCATE {table};")
+    cur.copy_expert(f"COPY {table} ({', '.join(df.columns)}) FROM STDIN", _CopyStream(_frame_chunks(df, batch_rows)))
+    return len(df)
+
+
+def _clean_dim_values(values) -> list[str]:
     cleaned = []
     for v in values:
         if pd.isna(v):
@@ -111,34 +292,69 @@ def upsert_dim_text(cur, table: str, col: str, values: list[str]):
         if s == "" or s.lower() == "nan":
             continue
         cleaned.append(s)
+    return sorted(set(cleaned))
+
 
-    unique_vals = sorted(set(cleaned))
+def upsert_dim_text(cur, table: str, col: str, values: list[str], key_col: str) -> dict[str, int]:
+    """Insert unique string values into a dimension table; returns value -> key of the new rows."""
+    unique_vals = _clean_dim_values(values)
     if not unique_vals:
-        return 0
+        return {}
+
+    if LOAD_MODE == "copy":
+        copy_rows(cur, "stg_dim_value", ["val"], ((v,) for v in unique_vals))
+        cur.execute(f"""
+            INSERT INTO {table} ({col})
+            SELECT val FROM stg_dim_value
+            ON CONFLICT ({col}) DO NOTHING
+            RETURNING {key_col}, {col};
+        """)
+        return {v: int(k) for k, v in cur.fetchall()}
 
     sql = f"""
         INSERT INTO {table} ({col})
         VALUES %s
-        ON CONFLICT ({col}) DO NOTHING;
+        ON CONFLICT ({col}) DO NOTHING
+        RETURNING {key_col}, {col};
     """
-    execute_values(cur, sql, [(v,) for v in unique_vals], page_size=1000)
-    return len(unique_vals)
+    rows = execute_values(cur, sql, [(v,) for v in unique_vals], page_size=1000, fetch=True)
+    return {v: int(k) for k, v in rows}
 
 
-def load_dim_datum(cur, year_month_pairs: list[tuple[int, int]]):
-    """
-    Loads dim_datum using the first day of the month as datum (YYYY-MM-01).
-    This matches your monthly grain while keeping your existing dim_datum table.
-    """
+def _datum_rows(year_month_pairs) -> list[tuple]:
     unique = sorted({(int(y), int(m)) for (y, m) in year_month_pairs if pd.notna(y) and pd.notna(m)})
-    if not unique:
-        return 0
-
     rows = []
     for y, m in unique:
         d = date(y, m, 1)
         iso_week = int(d.isocalendar().week)
         rows.append((d, y, m, iso_week, season_from_month(m)))
+    return rows
+
+
+def load_dim_datum(cur, year_month_pairs: list[tuple[int, int]]) -> dict[tuple[int, int], int]:
+    """
+    Loads dim_datum using the first day of the month as datum (YYYY-MM-01).
+    This matches your monthly grain while keeping your existing dim_datum table.
+    Returns (jahr, monat) -> datum_key of the sent months.
+    """
+    rows = _datum_rows(year_month_pairs)
+    if not rows:
+        return {}
+
+    if LOAD_MODE == "copy":
+        copy_rows(cur, "stg_dim_datum", ["datum", "jahr", "monat", "woche", "saison"], rows)
+        cur.execute("""
+            INSERT INTO dim_datum (datum, jahr, monat, woche, saison)
+            SELECT datum, jahr, monat, woche, saison FROM stg_dim_datum
+            ON CONFLICT (datum)
+            DO UPDATE SET
+              jahr = EXCLUDED.jahr,
+              monat = EXCLUDED.monat,
+              woche = EXCLUDED.woche,
+              saison = EXCLUDED.saison
+            RETURNING datum_key, jahr, monat;
+        """)
+        return {(int(y), int(m)): int(k) for k, y, m in cur.fetchall()}
 
     sql = """
         INSERT INTO dim_datum (datum, jahr, monat, woche, saison)
@@ -148,34 +364,323 @@ def load_dim_datum(cur, year_month_pairs: list[tuple[int, int]]):
           jahr = EXCLUDED.jahr,
           monat = EXCLUDED.monat,
           woche = EXCLUDED.woche,
-          saison = EXCLUDED.saison;
+          saison = EXCLUDED.saison
+        RETURNING datum_key, jahr, monat;
     """
-    execute_values(cur, sql, rows, page_size=1000)
-    return len(rows)
+    out = execute_values(cur, sql, rows, page_size=1000, fetch=True)
+    return {(int(y), int(m)): int(k) for k, y, m in out}
 
 
-def fetch_dim_map(cur, table: str, key_col: str, val_col: str) -> dict:
+def resolve_dim_keys(cur, cache: DimKeyCache, table: str, key_col: str, col: str, values) -> tuple[dict, int]:
     """
-    Returns mapping: value -> surrogate_key
+    value -> key for `values`, asking Postgres only for values the cache doesn't know:
+    existing ones with one indexed lookup, the rest inserted (keys come back via RETURNING).
+    Returns (mapping, number of values inserted).
     """
-    cur.execute(f"SELECT {key_col}, {val_col} FROM {table};")
-    out = {}
-    for k, v in cur.fetchall():
-        out[v] = int(k)
-    return out
+    missing = cache.missing(table, _clean_dim_values(values))
+    inserted = {}
+    if missing:
+        cur.execute(f"SELECT {key_col}, {col} FROM {table} WHERE {col} = ANY(%s);", (missing,))
+        cache.update(table, {v: int(k) for k, v in cur.fetchall()})
+        new_vals = cache.missing(table, missing)
+        if new_vals:
+            inserted = upsert_dim_text(cur, table, col, new_vals, key_col)
+            cache.update(table, inserted)
+    return cache.keys(table), len(inserted)
+
+
+def resolve_datum_keys(cur, cache: DimKeyCache, year_month_pairs) -> tuple[dict[tuple[int, int], int], int]:
+    """Like resolve_dim_keys() for dim_datum; cached as "YYYYMM" -> datum_key."""
+    rows = _datum_rows(year_month_pairs)
+    missing = [r for r in rows if str(r[1] * 100 + r[2]) not in cache.keys("dim_datum")]
+    inserted = {}
+    if missing:
+        cur.execute("SELECT datum_key, jahr, monat FROM dim_datum WHERE datum = ANY(%s);",
+                    ([r[0] for r in missing],))
+        cache.update("dim_datum", {str(int(y) * 100 + int(m)): int(k) for k, y, m in cur.fetchall()})
+        new_rows = [r for r in missing if str(r[1] * 100 + r[2]) not in cache.keys("dim_datum")]
+        if new_rows:
+            inserted = load_dim_datum(cur, [(r[1], r[2]) for r in new_rows])
+            cache.update("dim_datum", {str(y * 100 + m): k for (y, m), k in inserted.items()})
+    mapping = {(int(ym) // 100, int(ym) % 100): k for ym, k in cache.keys("dim_datum").items()}
+    return mapping, len(inserted)
+
+
+FACT_UPDATE_SET = """
+                  relative_cases = EXCLUDED.relative_cases,
+                  relative_cases_7day_ma = EXCLUDED.relative_cases_7day_ma,
+                  expected_value = EXCLUDED.expected_value,
+                  expected_lowerbound = EXCLUDED.expected_lowerbound,
+                  expected_upperbound = EXCLUDED.expected_upperbound,
+                  ed_count = EXCLUDED.ed_count,
+                  temperature_mean = EXCLUDED.temperature_mean,
+                  precipitation = EXCLUDED.precipitation,
+                  sunshine_duration = EXCLUDED.sunshine_duration"""
+
+
+def iter_fact_rows(fact: pd.DataFrame, batch_rows: int = FACT_BATCH_ROWS):
+    """Yields plain Python tuples (NaN -> None), converting one batch at a time."""
+    for start in range(0, len(fact), batch_rows):
+        chunk = fact.iloc[start:start + batch_rows].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def fact_layout_columns(partitioned: bool) -> tuple[list[str], list[str]]:
+    """(columns sent, conflict target) for the heap or the partitioned fact table."""
+    if partitioned:
+        return ["jahr"] + FACT_COLUMNS, ["jahr"] + FACT_GRAIN
+    return FACT_COLUMNS, FACT_GRAIN
+
+
+def changed_condition(old: str, new: str, measures: list[str]) -> str:
+    """SQL: true if any measure differs (NULL-safe; floats are sent with full precision)."""
+    return (f"({', '.join(f'{old}.{m}' for m in measures)}) "
+            f"IS DISTINCT FROM ({', '.join(f'{new}.{m}' for m in measures)})")
+
+
+def upsert_facts(cur, fact: pd.DataFrame, partitioned: bool = False,
+                 target: str = FACT_TABLE) -> tuple[int, int, list[int]]:
+    """
+    Row-wise upsert via execute_values (default mode). Existing rows are only rewritten
+    if a measure changed. Returns (inserted, updated, datum_keys of changed rows).
+    (Unchanged conflicting rows are still row-locked; the copy mode avoids even that.)
+    """
+    cols, grain = fact_layout_columns(partitioned)
+    sql_fact = f"""
+        INSERT INTO {target} AS f ({", ".join(cols)})
+        VALUES %s
+        ON CONFLICT ({", ".join(grain)})
+        DO UPDATE SET{FACT_UPDATE_SET}
+        WHERE {changed_condition("f", "EXCLUDED", list(FACT_MEASURES.values()))}
+        RETURNING f.datum_key, (f.xmax = 0);
+    """
+    rows = execute_values(cur, sql_fact, iter_fact_rows(fact[cols]), page_size=2000, fetch=True)
+    inserted = sum(1 for _, is_new in rows if is_new)
+    return inserted, len(rows) - inserted, sorted({int(k) for k, _ in rows})
+
+
+def merge_staging(cur, target: str, staging: str, cols: list[str], grain: list[str],
+                  measures: list[str], date_key: str = "datum_key") -> tuple[int, int, list[int]]:
+    """
+    Staging -> target in one statement that writes only new rows and rows whose measures
+    changed; unchanged rows are not touched at all (no new tuple, no lock, no WAL).
+    Returns (inserted, updated, date keys of changed rows).
+    """
+    on = " AND ".join(f"t.{c} = s.{c}" for c in grain)
+    cur.execute(f"""
+        WITH upd AS (
+          UPDATE {target} t
+          SET {", ".join(f"{m} = s.{m}" for m in measures)}
+          FROM {staging} s
+          WHERE {on} AND {changed_condition("t", "s", measures)}
+          RETURNING t.{date_key}
+        ), ins AS (
+          INSERT INTO {target} ({", ".join(cols)})
+          SELECT {", ".join(f"s.{c}" for c in cols)} FROM {staging} s
+          WHERE NOT EXISTS (SELECT 1 FROM {target} t WHERE {on})
+          ON CONFLICT ({", ".join(grain)}) DO NOTHING
+          RETURNING {date_key}
+        )
+        SELECT
+          (SELECT count(*) FROM ins),
+          (SELECT count(*) FROM upd),
+          ARRAY(SELECT {date_key} FROM upd UNION SELECT {date_key} FROM ins);
+    """)
+    inserted, updated, keys = cur.fetchone()
+    return int(inserted), int(updated), sorted(int(k) for k in keys)
+
+
+def copy_facts(cur, fact: pd.DataFrame, partitioned: bool = False,
+               target: str = FACT_TABLE) -> tuple[int, int, list[int]]:
+    """COPY into stg_fakt_erkrankungen, then merge only new/changed rows into the fact table."""
+    cols, grain = fact_layout_columns(partitioned)
+    copy_frame(cur, "stg_fakt_erkrankungen", fact[cols])
+    return merge_staging(cur, target, "stg_fakt_erkrankungen", cols, grain,
+                         list(FACT_MEASURES.values()))
+
+
+def changed_years(cur, fact: pd.DataFrame, partitioned: bool = False) -> list[int]:
+    """
+    Years (jahr) with fact rows that are new or differ from the live table, compared on a
+    temp copy of the rows. Swap mode runs it before building the shadow table: empty ->
+    nothing to publish, otherwise only these years have to be copied (partitioned layout).
+    """
+    measures = list(FACT_MEASURES.values())
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS _fact_check (
+          jahr INT NOT NULL,
+          {", ".join(f"{c} BIGINT NOT NULL" for c in FACT_GRAIN)},
+          {", ".join(f"{m} DOUBLE PRECISION NULL" for m in measures)}
+        ) ON COMMIT DROP;
+    """)
+    copy_frame(cur, "_fact_check", fact[["jahr"] + FACT_COLUMNS])
+    cur.execute("ANALYZE _fact_check;")
+    _, grain = fact_layout_columns(partitioned)
+    cur.execute(f"""
+        SELECT DISTINCT c.jahr FROM _fact_check c
+        LEFT JOIN {FACT_TABLE} t ON {" AND ".join(f"t.{g} = c.{g}" for g in grain)}
+        WHERE t.datum_key IS NULL OR {changed_condition("t", "c", measures)}
+        ORDER BY 1;
+    """)
+    return [int(y) for (y,) in cur.fetchall()]
 
 
-def fetch_datum_map(cur) -> dict[tuple[int, int], int]:
+def prepare_publish():
     """
-    Returns mapping: (jahr, monat) -> datum_key
+    Swap mode, before the load transaction: range CHECKs on older fact partitions
+    (publish.ensure_range_checks), on an own autocommit connection.
     """
-    cur.execute("SELECT datum_key, jahr, monat FROM dim_datum;")
-    out = {}
-    for datum_key, jahr, monat in cur.fetchall():
-        out[(int(jahr), int(monat))] = int(datum_key)
+    conn = connect()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            years = publish.ensure_range_checks(cur)
+            if years:
+                print(f"Range CHECK added to fact partitions: {years}")
+    finally:
+        conn.close()
+
+
+# =========================
+# Parallel fact load
+# =========================
+def prepare_parallel_staging():
+    """
+    Creates and empties the staging tables on an own autocommit connection: the
+    worker connections must see an empty, committed stg_fakt_erkrankungen, and the
+    main transaction must not hold a lock on it while they COPY.
+    """
+    conn = connect()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            ensure_staging(cur)
+            cur.execute("TRUNCATE stg_fakt_erkrankungen;")
+    finally:
+        conn.close()
+
+
+def shard_by_month(fact: pd.DataFrame, datum_map: dict, shards: int) -> list[tuple[int, int, pd.DataFrame]]:
+    """
+    Splits the fact rows into up to `shards` contiguous month ranges of similar size.
+    Returns [(first YYYYMM, last YYYYMM, rows), ...]; a month is never split.
+    """
+    ym_of_key = pd.Series({k: y * 100 + m for (y, m), k in datum_map.items()}, dtype="int64")
+    ym = fact["datum_key"].map(ym_of_key).to_numpy()
+    months, counts = np.unique(ym, return_counts=True)
+    if len(months) == 0:
+        return []
+
+    # shard number per month from the cumulative row count
+    bounds = np.cumsum(counts) - counts  # rows before each month
+    shard_of_month = np.minimum((bounds * shards) // max(len(fact), 1), shards - 1)
+
+    out = []
+    for sid in np.unique(shard_of_month):
+        ms = months[shard_of_month == sid]
+        rows = fact[(ym >= ms[0]) & (ym <= ms[-1])]
+        out.append((int(ms[0]), int(ms[-1]), rows))
     return out
 
 
+def _copy_shard(worker: int, first_ym: int, last_ym: int, rows: pd.DataFrame) -> dict:
+    """One worker: own connection, COPY its shard into stg_fakt_erkrankungen, commit."""
+    t0, cpu0 = time.perf_counter(), time.thread_time()
+    conn = connect()
+    try:
+        with conn, conn.cursor() as cur:
+            cur.copy_expert(
+                f"COPY stg_fakt_erkrankungen ({', '.join(rows.columns)}) FROM STDIN",
+                _CopyStream(_frame_chunks(rows, FACT_BATCH_ROWS)),
+            )
+    finally:
+        conn.close()
+    return {"worker": worker, "first": first_ym, "last": last_ym, "rows": len(rows),
+            "seconds": time.perf_counter() - t0, "cpu_seconds": time.thread_time() - cpu0}
+
+
+def parallel_copy_facts(cur, fact: pd.DataFrame, datum_map: dict, partitioned: bool = False,
+                        workers: int = LOAD_WORKERS, target: str = FACT_TABLE) -> tuple[int, int, list[int]]:
+    """
+    Sharded COPY over `workers` connections into the (committed, unlogged) staging table,
+    then one merge on `cur`. Nothing is visible in fakt_erkrankungen before the caller
+    commits, so all shards are published at once. Staging must be prepared with
+    prepare_parallel_staging() before the caller's transaction touches it.
+    """
+    cols, grain = fact_layout_columns(partitioned)
+    shards = shard_by_month(fact[cols], datum_map, workers)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(shards))) as pool:
+        futures = [pool.submit(_copy_shard, i, first, last, rows)
+                   for i, (first, last, rows) in enumerate(shards)]
+        stats = [f.result() for f in futures]
+    metrics.add_cpu(sum(st["cpu_seconds"] for st in stats))
+
+    for st in stats:
+        rate = st["rows"] / st["seconds"] if st["seconds"] > 0 else float("inf")
+        print(f"  - worker {st['worker']}: {st['first'] // 100}-{st['first'] % 100:02d}.."
+              f"{st['last'] // 100}-{st['last'] % 100:02d}, {st['rows']} rows in {st['seconds']:.2f}s "
+              f"({rate:,.0f} rows/s)")
+
+    t0 = time.perf_counter()
+    result = merge_staging(cur, target, "stg_fakt_erkrankungen", cols, grain,
+                           list(FACT_MEASURES.values()))
+    print(f"  - merge of {len(fact)} staged rows: {time.perf_counter() - t0:.2f}s")
+    return result
+
+
+def _map_keys(col: pd.Series, mapping: dict) -> pd.Series:
+    """value -> surrogate key for a whole column; categoricals map only their categories."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        cat_keys = pd.Series(col.cat.categories).map(mapping).to_numpy(dtype="float64")
+        codes = col.cat.codes.to_numpy()
+        out = np.where(codes >= 0, cat_keys[codes], np.nan)
+        return pd.Series(out, index=col.index)
+    return col.map(mapping)
+
+
+def build_fact_frame(merged: pd.DataFrame, syndrom_map: dict, alters_map: dict,
+                     edtype_map: dict, datum_map: dict) -> tuple[pd.DataFrame, int]:
+    """
+    Resolves the surrogate keys column-wise (Series.map = hash join on the whole column)
+    and returns (fact frame: jahr + FACT_COLUMNS, number of rows skipped for missing keys).
+    Measures stay float64, NaN is turned into NULL only when the rows are sent.
+    """
+    ym = merged["year"].astype("int64") * 100 + merged["month"].astype("int64")
+    datum_codes = pd.Series(
+        list(datum_map.values()),
+        index=[y * 100 + m for (y, m) in datum_map.keys()],
+        dtype="int64",
+    )
+
+    keys = pd.DataFrame({
+        "datum_key": ym.map(datum_codes),
+        "syndrom_key": _map_keys(merged["syndrome"], syndrom_map),
+        "altersgruppe_key": _map_keys(merged["age_group"], alters_map),
+        "edtype_key": _map_keys(merged["ed_type"], edtype_map),
+    }, index=merged.index)
+
+    valid = keys.notna().all(axis=1).to_numpy()
+    skipped = int(len(valid) - valid.sum())
+
+    fact = keys.loc[valid].astype("int64")
+    fact.insert(0, "jahr", (ym.to_numpy()[valid] // 100).astype("int32"))
+    for src, dst in FACT_MEASURES.items():
+        fact[dst] = pd.to_numeric(merged[src].to_numpy()[valid], errors="coerce").astype("float64")
+
+    return fact.reset_index(drop=True)[["jahr"] + FACT_COLUMNS], skipped
+
+
+def pending_months(pending: dict | None, changed: bool) -> list[int] | None:
+    """Months one source branch still has to load: [] if unchanged since the last load, None = all."""
+    if not changed:
+        return []
+    if pending is None or pending["full"]:
+        return None
+    return pending["months"]
+
+
 def require_columns(df: pd.DataFrame, cols: list[str], name: str):
     missing = [c for c in cols if c not in df.columns]
     if missing:
@@ -185,129 +690,183 @@ def require_columns(df: pd.DataFrame, cols: list[str], name: str):
 # =========================
 # Main
 # =========================
-def main():
-    # ---- Files exist? ----
-    if not AKTIN_CSV.exists():
-        raise FileNotFoundError(f"AKTIN CSV not found: {AKTIN_CSV}")
-    if not WEATHER_CSV.exists():
-        raise FileNotFoundError(f"Weather CSV not found: {WEATHER_CSV}")
-
-    aktin = pd.read_csv(AKTIN_CSV)
-    weather = pd.read_csv(WEATHER_CSV)
+def main(aktin: pd.DataFrame | None = None, weather: pd.DataFrame | None = None, validated: bool = False):
+    """
+    aktin / weather: processed frames handed over in memory by the pipeline runner;
+    missing ones are read from data/processed/. validated: they come from the validate
+    stage; otherwise the data-quality checks run here. Their findings are written to the
+    quarantine in the load transaction only if the validate stage has not checked these
+    sources yet (it is the writer; the load then counts as that check).
+    """
+    if publish.PUBLISH_MODE not in ("inplace", "swap"):
+        raise ValueError(f"Unknown ETL_PUBLISH_MODE '{publish.PUBLISH_MODE}' (inplace | swap)")
+
+    # ---- Anything new upstream? ----
+    manifest = SourceManifest.load()
+    if not manifest.has_changes(STAGE, SOURCE_GROUPS):
+        print("LOAD SKIPPED: no source changed since the last successful load")
+        return
+
+    # ---- Read processed tables (Parquet: typed, only the needed columns) ----
+    aktin_typed = weather_typed = True
+    if aktin is None:
+        aktin, aktin_typed = processed.read(AKTIN_NAME, AKTIN_COLUMNS + quality.RANGE_COLUMNS)
+    if weather is None:
+        weather, weather_typed = processed.read(WEATHER_NAME, WEATHER_COLUMNS)
 
     # ---- Validate columns ----
-    require_columns(
-        aktin,
-        [
-            "year", "month", "syndrome", "age_group", "ed_type",
-            "relative_cases_avg", "relative_cases_7day_ma_avg",
-            "expected_value_avg", "expected_lowerbound_avg", "expected_upperbound_avg",
-            "ed_count_avg", "ed_count_min", "ed_count_max",
-        ],
-        "aktin_monthly.csv"
-    )
-    require_columns(
-        weather,
-        ["year", "month", "temperature_mean", "precipitation", "sunshine_duration"],
-        "weather_monthly_de.csv"
-    )
-
-    # ---- Normalize & types ----
-    for c in ["syndrome", "age_group", "ed_type"]:
-        aktin[c] = aktin[c].astype(str).str.strip()
-
-    aktin["year"] = pd.to_numeric(aktin["year"], errors="coerce").astype("Int64")
-    aktin["month"] = pd.to_numeric(aktin["month"], errors="coerce").astype("Int64")
-    aktin = aktin.dropna(subset=["year", "month"])
-
-    weather["year"] = pd.to_numeric(weather["year"], errors="coerce").astype("Int64")
-    weather["month"] = pd.to_numeric(weather["month"], errors="coerce").astype("Int64")
-    weather = weather.dropna(subset=["year", "month"])
+    require_columns(aktin, AKTIN_COLUMNS if validated else AKTIN_COLUMNS + quality.RANGE_COLUMNS, AKTIN_NAME)
+    require_columns(weather, WEATHER_COLUMNS, WEATHER_NAME)
+    aktin = aktin[AKTIN_COLUMNS if validated else AKTIN_COLUMNS + quality.RANGE_COLUMNS]
+    weather = weather[WEATHER_COLUMNS]
+
+    # ---- Normalize & types (only needed for the CSV export format) ----
+    if not aktin_typed:
+        for c in ["syndrome", "age_group", "ed_type"]:
+            aktin[c] = aktin[c].astype(str).str.strip()
+
+        aktin["year"] = pd.to_numeric(aktin["year"], errors="coerce").astype("Int64")
+        aktin["month"] = pd.to_numeric(aktin["month"], errors="coerce").astype("Int64")
+        aktin = aktin.dropna(subset=["year", "month"])
+
+    if not weather_typed:
+        weather["year"] = pd.to_numeric(weather["year"], errors="coerce").astype("Int64")
+        weather["month"] = pd.to_numeric(weather["month"], errors="coerce").astype("Int64")
+        weather = weather.dropna(subset=["year", "month"])
+
+    # ---- Data quality (docs/data_quality.md), unless the validate stage already did it ----
+    rejected, n_rejected = None, 0
+    if not validated:
+        t0 = time.perf_counter()
+        aktin, weather, rejected, report = quality.validate(aktin, weather)
+        n_rejected = int((rejected["action"] == "rejected").sum())
+        print(f"Data-quality checks: {len(aktin)} AKTIN rows kept, {n_rejected} row(s) rejected "
+              f"({time.perf_counter() - t0:.3f}s)")
+        quality.print_report(report, rejected)
+        aktin = aktin[AKTIN_COLUMNS]
+
+    # ---- Only the months the AKTIN transform re-aggregated or whose weather changed ----
+    # (ETL_FORCE / replay: everything)
+    aktin_months = pending_months(read_pending(), manifest.has_changes(STAGE, ["aktin"]))
+    weather_months = pending_months(read_weather_pending(), manifest.has_changes(STAGE, ["dwd"]))
+    if not source_manifest.FORCE and aktin_months is not None and weather_months is not None:
+        months = sorted(set(aktin_months) | set(weather_months))
+        ym = aktin["year"] * 100 + aktin["month"]
+        aktin = aktin[ym.isin(months).to_numpy()]
+        print(f"Incremental load: {len(months)} month(s) "
+              f"({len(aktin_months)} AKTIN, {len(weather_months)} weather), {len(aktin)} AKTIN rows")
 
     # ---- Join weather to aktin (month-level) ----
     merged = aktin.merge(weather, on=["year", "month"], how="left")
 
     # ---- DB load ----
+    if LOAD_WORKERS > 1:
+        prepare_parallel_staging()
+    if PUBLISH_SWAP:
+        prepare_publish()
+
     conn = connect()
     conn.autocommit = False
+    dim_cache = DimKeyCache.load()
 
     try:
         with conn.cursor() as cur:
-            ensure_constraints(cur)
-
-            # 1) Upsert dimensions
-            n_syn = upsert_dim_text(cur, "dim_syndrom", "bezeichnung", merged["syndrome"].tolist())
-            n_age = upsert_dim_text(cur, "dim_altersgruppe", "altersgruppe", merged["age_group"].tolist())
-            n_ed  = upsert_dim_text(cur, "dim_edtype", "typ", merged["ed_type"].tolist())
-            n_dt  = load_dim_datum(cur, merged[["year", "month"]].itertuples(index=False, name=None))
-
-            # 2) Build key maps
-            syndrom_map = fetch_dim_map(cur, "dim_syndrom", "syndrom_key", "bezeichnung")
-            alters_map = fetch_dim_map(cur, "dim_altersgruppe", "altersgruppe_key", "altersgruppe")
-            edtype_map = fetch_dim_map(cur, "dim_edtype", "edtype_key", "typ")
-            datum_map = fetch_datum_map(cur)
+            partitioned = ensure_constraints(cur)
+            ensure_dim_versions(cur)
+            quarantine = (rejected is not None and quality.MODE != "off"
+                          and manifest.has_changes(quality.STAGE, quality.SOURCE_GROUPS))
+            n_quarantined = quality.write_quarantine(cur, rejected) if quarantine else 0
+            if LOAD_MODE == "copy" and LOAD_WORKERS <= 1:
+                ensure_staging(cur)  # parallel mode: done by prepare_parallel_staging()
+
+            # 1+2) Dimension keys: cached ones locally, only unknown values go to Postgres
+            dim_cache.sync(cur)
+            syndrom_map, n_syn = resolve_dim_keys(cur, dim_cache, "dim_syndrom", "syndrom_key", "bezeichnung",
+                                                  merged["syndrome"].unique())
+            alters_map, n_age = resolve_dim_keys(cur, dim_cache, "dim_altersgruppe", "altersgruppe_key",
+                                                 "altersgruppe", merged["age_group"].unique())
+            edtype_map, n_ed = resolve_dim_keys(cur, dim_cache, "dim_edtype", "edtype_key", "typ",
+                                                merged["ed_type"].unique())
+            datum_map, n_dt = resolve_datum_keys(
+                cur, dim_cache, merged[["year", "month"]].drop_duplicates().itertuples(index=False, name=None))
+            dim_cache.stamp(cur)
 
             # 3) Prepare fact rows (skip rows with missing keys)
-            fact_rows = []
-            skipped = 0
-
-            for _, r in merged.iterrows():
-                y = int(r["year"])
-                m = int(r["month"])
-
-                datum_key = datum_map.get((y, m))
-                syndrom_key = syndrom_map.get(r["syndrome"])
-                alters_key = alters_map.get(r["age_group"])
-                edtype_key = edtype_map.get(r["ed_type"])
-
-                if datum_key is None or syndrom_key is None or alters_key is None or edtype_key is None:
-                    skipped += 1
-                    continue
-
-                fact_rows.append((
-                    datum_key,
-                    syndrom_key,
-                    alters_key,
-                    edtype_key,
-                    float(r["relative_cases_avg"]) if pd.notna(r["relative_cases_avg"]) else None,
-                    float(r["relative_cases_7day_ma_avg"]) if pd.notna(r["relative_cases_7day_ma_avg"]) else None,
-                    float(r["expected_value_avg"]) if pd.notna(r["expected_value_avg"]) else None,
-                    float(r["expected_lowerbound_avg"]) if pd.notna(r["expected_lowerbound_avg"]) else None,
-                    float(r["expected_upperbound_avg"]) if pd.notna(r["expected_upperbound_avg"]) else None,
-                    float(r["ed_count_avg"]) if pd.notna(r["ed_count_avg"]) else None,
-                    float(r["temperature_mean"]) if pd.notna(r["temperature_mean"]) else None,
-                    float(r["precipitation"]) if pd.notna(r["precipitation"]) else None,
-                    float(r["sunshine_duration"]) if pd.notna(r["sunshine_duration"]) else None,
-                ))
-
-            # 4) Upsert facts
-            sql_fact = """
-                INSERT INTO fakt_erkrankungen (
-                  datum_key, syndrom_key, altersgruppe_key, edtype_key,
-                  relative_cases, relative_cases_7day_ma,
-                  expected_value, expected_lowerbound, expected_upperbound,
-                  ed_count,
-                  temperature_mean, precipitation, sunshine_duration
-                ) VALUES %s
-                ON CONFLICT (datum_key, syndrom_key, altersgruppe_key, edtype_key)
-                DO UPDATE SET
-                  relative_cases = EXCLUDED.relative_cases,
-                  relative_cases_7day_ma = EXCLUDED.relative_cases_7day_ma,
-                  expected_value = EXCLUDED.expected_value,
-                  expected_lowerbound = EXCLUDED.expected_lowerbound,
-                  expected_upperbound = EXCLUDED.expected_upperbound,
-                  ed_count = EXCLUDED.ed_count,
-                  temperature_mean = EXCLUDED.temperature_mean,
-                  precipitation = EXCLUDED.precipitation,
-                  sunshine_duration = EXCLUDED.sunshine_duration;
-            """
-            execute_values(cur, sql_fact, fact_rows, page_size=2000)
+            fact, skipped = build_fact_frame(merged, syndrom_map, alters_map, edtype_map, datum_map)
+
+            # 4) Upsert facts (swap mode: only if a row changed, into a copy of the live table
+            #    that holds just the years with changes if partitioned; published below)
+            t0 = time.perf_counter()
+            target, rows = FACT_TABLE, fact
+            if PUBLISH_SWAP:
+                years = changed_years(cur, fact, partitioned)
+                if partitioned:
+                    rows = fact[fact["jahr"].isin(years).to_numpy()]
+                if years:
+                    n_live = publish.build_shadow(cur, partitioned, years)
+                    target = publish.SHADOW_TABLE
+                    print(f"Shadow fact table {target}: {n_live} rows copied"
+                          f"{f' (years {years})' if partitioned else ''} ({time.perf_counter() - t0:.2f}s)")
+                else:
+                    print("No fact row changed: no shadow table, nothing to publish")
+            elif partitioned:
+                new_years = ensure_partitions(cur, fact["jahr"].unique())
+                if new_years:
+                    print(f"Created fact partitions for: {new_years}")
+            if PUBLISH_SWAP and not years:
+                n_ins, n_upd, changed_keys = 0, 0, []
+            elif LOAD_WORKERS > 1:
+                n_ins, n_upd, changed_keys = parallel_copy_facts(cur, rows, datum_map, partitioned, target=target)
+            elif LOAD_MODE == "copy":
+                n_ins, n_upd, changed_keys = copy_facts(cur, rows, partitioned, target)
+            else:
+                n_ins, n_upd, changed_keys = upsert_facts(cur, rows, partitioned, target)
+            fact_secs = time.perf_counter() - t0
+            n_unchanged = len(fact) - n_ins - n_upd
+
+            publishing = PUBLISH_SWAP and bool(changed_keys)
+            if publishing:
+                publish.validate(cur, n_live + n_ins)
+            elif PUBLISH_SWAP:
+                publish.discard(cur)
+
+            # 5) BI layer: only the months with new/changed facts (everything right after creating it);
+            #    swap mode: read from the version about to go live, before the swap takes its lock
+            created = bi_layer.ensure_bi_layer(cur)
+            n_bi_rows, n_bi_groups = 0, 0
+            if created or changed_keys:
+                # the changed months are all in the shadow table; a first refresh reads everything
+                facts = publish.incoming_facts(cur, whole=created) if publishing else None
+                n_bi_rows, n_bi_groups = bi_layer.refresh(cur, None if created else changed_keys, facts)
+
+            # 6) Swap mode: the new version goes live; the last statement, its lock ends with the commit
+            if publishing:
+                t1 = time.perf_counter()
+                publish.publish(cur)
+                print(f"Published new fact version, previous one kept as {publish.PREVIOUS_TABLE} "
+                      f"({time.perf_counter() - t1:.2f}s)")
 
         conn.commit()
+        dim_cache.save()
+        metrics.count(rows_in=len(merged), rows_out=n_ins + n_upd, rows_skipped=skipped + n_rejected,
+                      rows_inserted=n_ins, rows_updated=n_upd, rows_unchanged=n_unchanged)
+        manifest.mark_consumed(STAGE, SOURCE_GROUPS)
+        if quarantine:
+            manifest.mark_consumed(quality.STAGE, quality.SOURCE_GROUPS)
+        manifest.save()
+        clear_pending()
+        clear_weather_pending()
         print("LOAD DONE")
-        print(f"  - dim inserts attempted (unique values): syndrom={n_syn}, altersgruppe={n_age}, edtype={n_ed}, datum(months)={n_dt}")
-        print(f"  - facts upserted: {len(fact_rows)}")
+        print(f"  - new dim rows: syndrom={n_syn}, altersgruppe={n_age}, edtype={n_ed}, datum(months)={n_dt}")
+        if dim_cache.invalidated:
+            print(f"  - dim key cache invalidated (table changed): {', '.join(dim_cache.invalidated)}")
+        rate = len(fact) / fact_secs if fact_secs > 0 else float("inf")
+        print(f"  - facts: {n_ins} inserted, {n_upd} updated, {n_unchanged} unchanged "
+              f"({len(fact)} compared, {rate:,.0f} rows/s, mode={LOAD_MODE}, workers={LOAD_WORKERS})")
         print(f"  - rows skipped (missing keys): {skipped}")
+        if n_quarantined:
+            print(f"  - rows quarantined by the data-quality checks: {n_quarantined}")
+        print(f"  - BI layer refreshed: {n_bi_rows} rows, {n_bi_groups} rollup groups")
 
     except Exception:
         conn.rollback()
@@ -315,7 +874,12 @@ def main():
     finally:
         conn.close()
 
+    # 7) Dashboards: drop the cached chart results and recompute them with the new data
+    if created or changed_keys:
+        superset_cache.refresh_dashboard_cache()
+
 
 if __name__ == "__main__":
-    main()
+    with metrics.stage(STAGE), profiling.profiled(STAGE):
+        main()
 
@@ -0,0 +1,229 @@
+import time
+from datetime import date
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from etl import metrics, processed, profiling
+from etl.load.dim_cache import DimKeyCache, ensure_dim_versions
+from etl.load.load import (
+    _map_keys, connect, copy_frame, ensure_constraints, merge_staging, require_columns, resolve_dim_keys,
+    season_from_month,
+)
+from etl.load.partitioning import ensure_partitions
+from etl.manifest import SourceManifest
+from etl.transform.transform_aktin_daily import OUT_COLUMNS, OUT_NAME, read_loaded, write_loaded
+from etl.transform.transform_aktin_monthly import MEANS
+
+STAGE = "load_daily"
+
+DAILY_TABLE = "fakt_erkrankungen_taeglich"
+
+# day dimension; dim_datum stays month-grain (one row per month, written by the monthly load only)
+DAY_TABLE = "dim_tag"
+
+DAILY_MEASURES = list(MEANS)  # relative_cases ... ed_count (no weather: that is monthly)
+DAILY_GRAIN = ["jahr", "tag_key", "syndrom_key", "altersgruppe_key", "edtype_key"]
+DAILY_COLUMNS = DAILY_GRAIN + DAILY_MEASURES
+
+
+def ensure_daily_schema(cur):
+    """
+    The day dimension, the daily fact table (partitioned by jahr from the start) and its
+    staging table. Same DDL as in db/init/01_schema.sql.
+    """
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {DAY_TABLE} (
+      tag_key BIGSERIAL PRIMARY KEY,
+      datum DATE NOT NULL,
+      jahr INT NOT NULL,
+      monat INT NOT NULL,
+      woche INT NOT NULL,
+      saison TEXT NOT NULL,
+      tag INT NOT NULL,
+      wochentag INT NOT NULL,
+      CONSTRAINT uq_dim_tag_datum UNIQUE (datum)
+    );
+    """)
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {DAILY_TABLE} (
+      jahr INT NOT NULL,
+      tag_key BIGINT NOT NULL,
+      syndrom_key BIGINT NOT NULL,
+      altersgruppe_key BIGINT NOT NULL,
+      edtype_key BIGINT NOT NULL,
+
+      relative_cases DOUBLE PRECISION NULL,
+      relative_cases_7day_ma DOUBLE PRECISION NULL,
+      expected_value DOUBLE PRECISION NULL,
+      expected_lowerbound DOUBLE PRECISION NULL,
+      expected_upperbound DOUBLE PRECISION NULL,
+      ed_count DOUBLE PRECISION NULL,
+
+      PRIMARY KEY (jahr, tag_key, syndrom_key, altersgruppe_key, edtype_key)
+    ) PARTITION BY RANGE (jahr);
+    """)
+    cur.execute(f"CREATE INDEX IF NOT EXISTS ix_fakt_taeglich_alter_edtype_syndrom "
+                f"ON {DAILY_TABLE} (altersgruppe_key, edtype_key, syndrom_key);")
+
+    cur.execute(f"""
+    CREATE UNLOGGED TABLE IF NOT EXISTS stg_fakt_taeglich
+    (LIKE {DAILY_TABLE} INCLUDING DEFAULTS);
+    """)
+
+
+def _day_rows(days) -> list[tuple]:
+    rows = []
+    for d in sorted(set(days)):
+        rows.append((d, d.year, d.month, int(d.isocalendar().week), season_from_month(d.month),
+                     d.day, d.isoweekday()))
+    return rows
+
+
+def load_dim_days(cur, days) -> dict[date, int]:
+    """Upserts day rows into dim_tag (real ISO week, weekday 1=Mo); returns datum -> tag_key."""
+    rows = _day_rows(days)
+    if not rows:
+        return {}
+    out = execute_values(cur, f"""
+        INSERT INTO {DAY_TABLE} (datum, jahr, monat, woche, saison, tag, wochentag)
+        VALUES %s
+        ON CONFLICT (datum)
+        DO UPDATE SET
+          jahr = EXCLUDED.jahr,
+          monat = EXCLUDED.monat,
+          woche = EXCLUDED.woche,
+          saison = EXCLUDED.saison,
+          tag = EXCLUDED.tag,
+          wochentag = EXCLUDED.wochentag
+        RETURNING tag_key, datum;
+    """, rows, page_size=1000, fetch=True)
+    return {d: int(k) for k, d in out}
+
+
+def resolve_day_keys(cur, cache: DimKeyCache, days) -> tuple[dict[date, int], int]:
+    """Like load.resolve_datum_keys() for days in dim_tag; cached as "YYYY-MM-DD" -> tag_key."""
+    known = cache.keys(DAY_TABLE)
+    missing = [d for d in sorted(set(days)) if d.isoformat() not in known]
+    inserted = {}
+    if missing:
+        cur.execute(f"SELECT tag_key, datum FROM {DAY_TABLE} WHERE datum = ANY(%s);", (missing,))
+        cache.update(DAY_TABLE, {d.isoformat(): int(k) for k, d in cur.fetchall()})
+        new_days = [d for d in missing if d.isoformat() not in known]
+        if new_days:
+            inserted = load_dim_days(cur, new_days)
+            cache.update(DAY_TABLE, {d.isoformat(): k for d, k in inserted.items()})
+    mapping = {date.fromisoformat(d): k for d, k in known.items()}
+    return mapping, len(inserted)
+
+
+def build_daily_frame(daily: pd.DataFrame, syndrom_map: dict, alters_map: dict,
+                      edtype_map: dict, day_map: dict) -> tuple[pd.DataFrame, int]:
+    """Column-wise key mapping as in load.build_fact_frame(); returns (frame in DAILY_COLUMNS, skipped)."""
+    day_codes = pd.Series(list(day_map.values()), index=pd.DatetimeIndex(list(day_map.keys())), dtype="int64")
+    days = pd.DatetimeIndex(daily["date"]).normalize()
+
+    keys = pd.DataFrame({
+        "tag_key": pd.Series(day_codes.reindex(days).to_numpy(), index=daily.index),
+        "syndrom_key": _map_keys(daily["syndrome"], syndrom_map),
+        "altersgruppe_key": _map_keys(daily["age_group"], alters_map),
+        "edtype_key": _map_keys(daily["ed_type"], edtype_map),
+    }, index=daily.index)
+
+    valid = keys.notna().all(axis=1).to_numpy()
+    skipped = int(len(valid) - valid.sum())
+
+    fact = keys.loc[valid].astype("int64")
+    fact.insert(0, "jahr", days.year.to_numpy()[valid].astype("int32"))
+    for c in DAILY_MEASURES:
+        fact[c] = pd.to_numeric(daily[c].to_numpy()[valid], errors="coerce").astype("float64")
+    return fact.reset_index(drop=True)[DAILY_COLUMNS], skipped
+
+
+def copy_daily(cur, fact: pd.DataFrame) -> tuple[int, int, list[int]]:
+    """
+    COPY into the unlogged staging table, then one set-based merge that writes only
+    new and changed days. Returns (inserted, updated, tag_keys of changed rows).
+    """
+    copy_frame(cur, "stg_fakt_taeglich", fact)
+    return merge_staging(cur, DAILY_TABLE, "stg_fakt_taeglich", DAILY_COLUMNS, DAILY_GRAIN, DAILY_MEASURES,
+                         date_key="tag_key")
+
+
+def main(daily: pd.DataFrame | None = None):
+    """
+    Loads the daily window written by transform_aktin_daily (or handed over in memory).
+    Only the days of that window are sent; older days stay as they are.
+    """
+    manifest = SourceManifest.load()
+    if not manifest.has_changes(STAGE, ["aktin"]):
+        print("DAILY LOAD SKIPPED: AKTIN unchanged since the last successful daily load")
+        return
+
+    typed = True
+    if daily is None:
+        daily, typed = processed.read(OUT_NAME, OUT_COLUMNS)
+    require_columns(daily, OUT_COLUMNS, OUT_NAME)
+    if not typed:
+        daily["date"] = pd.to_datetime(daily["date"])
+        for c in ("syndrome", "age_group", "ed_type"):
+            daily[c] = daily[c].astype(str).str.strip().astype("category")
+
+    days = [ts.date() for ts in pd.DatetimeIndex(daily["date"].unique())]
+
+    conn = connect()
+    conn.autocommit = False
+    dim_cache = DimKeyCache.load()
+
+    try:
+        with conn.cursor() as cur:
+            ensure_constraints(cur)
+            ensure_daily_schema(cur)
+            ensure_dim_versions(cur)
+
+            dim_cache.sync(cur)
+            syndrom_map, n_syn = resolve_dim_keys(cur, dim_cache, "dim_syndrom", "syndrom_key", "bezeichnung",
+                                                  daily["syndrome"].unique())
+            alters_map, n_age = resolve_dim_keys(cur, dim_cache, "dim_altersgruppe", "altersgruppe_key",
+                                                 "altersgruppe", daily["age_group"].unique())
+            edtype_map, n_ed = resolve_dim_keys(cur, dim_cache, "dim_edtype", "edtype_key", "typ",
+                                                daily["ed_type"].unique())
+            day_map, n_days = resolve_day_keys(cur, dim_cache, days)
+            dim_cache.stamp(cur)
+
+            fact, skipped = build_daily_frame(daily, syndrom_map, alters_map, edtype_map, day_map)
+
+            t0 = time.perf_counter()
+            new_years = ensure_partitions(cur, fact["jahr"].unique(), DAILY_TABLE)
+            if new_years:
+                print(f"Created daily fact partitions for: {new_years}")
+            n_ins, n_upd, _ = copy_daily(cur, fact)
+            fact_secs = time.perf_counter() - t0
+            n_unchanged = len(fact) - n_ins - n_upd
+
+        conn.commit()
+        dim_cache.save()
+        if days:
+            last = read_loaded()
+            write_loaded(max(days) if last is None else max(last, max(days)))
+        metrics.count(rows_in=len(daily), rows_out=n_ins + n_upd, rows_skipped=skipped,
+                      rows_inserted=n_ins, rows_updated=n_upd, rows_unchanged=n_unchanged)
+        manifest.mark_consumed(STAGE, ["aktin"])
+        manifest.save()
+        print("DAILY LOAD DONE")
+        print(f"  - window: {min(days) if days else '-'} .. {max(days) if days else '-'}")
+        print(f"  - new dim rows: syndrom={n_syn}, altersgruppe={n_age}, edtype={n_ed}, datum(days)={n_days}")
+        rate = len(fact) / fact_secs if fact_secs > 0 else float("inf")
+        print(f"  - daily facts: {n_ins} inserted, {n_upd} updated, {n_unchanged} unchanged ({rate:,.0f} rows/s)")
+        print(f"  - rows skipped (missing keys): {skipped}")
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    with metrics.stage(STAGE), profiling.profiled(STAGE):
+        main()
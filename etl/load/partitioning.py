@@ -0,0 +1,173 @@
+import os
+
+from etl.load.bi_layer import apply_views_sql
+
+# heap (default): fakt_erkrankungen as one table, as created by db/init/01_schema.sql
+# partitioned:    RANGE-partitioned by jahr, one partition per year; an existing heap
+#                 table is migrated on the next schema init / load
+FACT_LAYOUT = os.getenv("ETL_FACT_LAYOUT", "heap").strip().lower()
+
+FACT_TABLE = "fakt_erkrankungen"
+
+# CHECK constraint of every yearly partition, same bounds as the partition
+RANGE_CHECK = "jahr_range"
+
+# rest of the fact row after the key columns (same as db/init/01_schema.sql)
+_FACT_BODY = """
+  datum_key BIGINT NOT NULL,
+  syndrom_key BIGINT NOT NULL,
+  altersgruppe_key BIGINT NOT NULL,
+  edtype_key BIGINT NOT NULL,
+
+  relative_cases DOUBLE PRECISION NULL,
+  relative_cases_7day_ma DOUBLE PRECISION NULL,
+  expected_value DOUBLE PRECISION NULL,
+  expected_lowerbound DOUBLE PRECISION NULL,
+  expected_upperbound DOUBLE PRECISION NULL,
+  ed_count DOUBLE PRECISION NULL,
+
+  temperature_mean DOUBLE PRECISION NULL,
+  precipitation DOUBLE PRECISION NULL,
+  sunshine_duration DOUBLE PRECISION NULL"""
+
+_COPY_COLUMNS = """
+  fakt_key, datum_key, syndrom_key, altersgruppe_key, edtype_key,
+  relative_cases, relative_cases_7day_ma, expected_value, expected_lowerbound, expected_upperbound,
+  ed_count, temperature_mean, precipitation, sunshine_duration"""
+
+
+def is_partitioned(cur) -> bool:
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s);", (FACT_TABLE,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def partition_name(year: int, table: str = FACT_TABLE) -> str:
+    return f"{table}_y{int(year)}"
+
+
+def ensure_partitions(cur, years, table: str = FACT_TABLE) -> list[int]:
+    """Creates the missing yearly partitions of `table` (partitioned by jahr); returns the years created."""
+    years = sorted({int(y) for y in years})
+    if not years:
+        return []
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s);
+    """, (table,))
+    existing = {r[0] for r in cur.fetchall()}
+    created = []
+    for y in years:
+        if partition_name(y, table) in existing:
+            continue
+        # the CHECK repeats the bounds: a detached partition can be attached again without a
+        # validation scan (publish.py moves unchanged partitions to the new fact version)
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(y, table)} PARTITION OF {table} "
+            f"(CONSTRAINT {RANGE_CHECK} CHECK (jahr >= {y} AND jahr < {y + 1})) "
+            f"FOR VALUES FROM ({y}) TO ({y + 1});"
+        )
+        created.append(y)
+    return created
+
+
+def ensure_fact_indexes(cur):
+    """
+    Indexes for the BI joins/filters: the dashboards filter on altersgruppe + edtype
+    and group by syndrom; datum is covered by the grain constraint.
+    On a partitioned table they are created on every partition automatically.
+    """
+    cur.execute(f"CREATE INDEX IF NOT EXISTS ix_fakt_alter_edtype_syndrom "
+                f"ON {FACT_TABLE} (altersgruppe_key, edtype_key, syndrom_key);")
+    cur.execute(f"CREATE INDEX IF NOT EXISTS ix_fakt_syndrom ON {FACT_TABLE} (syndrom_key);")
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_dim_datum_jahr_monat ON dim_datum (jahr, monat);")
+
+
+def migrate_to_partitioned(cur) -> int:
+    """
+    Heap fakt_erkrankungen -> partitioned by jahr, in the caller's transaction.
+    Keeps fakt_key and its sequence. The BI view depends on the table and is recreated
+    from postgres/02_views.sql. Returns the number of rows moved.
+
+    The partitioned table has no foreign keys to the dimensions: the load resolves every
+    key from the dimension tables itself (rows with unknown keys are skipped), and the
+    per-row FK checks were a large part of the insert cost.
+    """
+    print(f"Migrating {FACT_TABLE} to a partitioned table (by jahr)...")
+    cur.execute(f"LOCK TABLE {FACT_TABLE} IN ACCESS EXCLUSIVE MODE;")
+    cur.execute("DROP VIEW IF EXISTS bi.vw_erkrankungen_monatlich;")
+    cur.execute(f"ALTER TABLE {FACT_TABLE} RENAME TO {FACT_TABLE}_heap;")
+    # free the constraint / index names for the new table
+    cur.execute(f"""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = to_regclass('{FACT_TABLE}_heap') AND contype IN ('p', 'u');
+    """)
+    for (conname,) in cur.fetchall():
+        cur.execute(f"ALTER TABLE {FACT_TABLE}_heap RENAME CONSTRAINT {conname} TO {conname}_heap;")
+    for ix in ("ix_fakt_alter_edtype_syndrom", "ix_fakt_syndrom"):
+        cur.execute(f"ALTER INDEX IF EXISTS {ix} RENAME TO {ix}_heap;")
+
+    cur.execute(f"""
+        CREATE TABLE {FACT_TABLE} (
+          fakt_key BIGINT NOT NULL DEFAULT nextval('{FACT_TABLE}_fakt_key_seq'),
+          jahr INT NOT NULL,
+          {_FACT_BODY},
+          PRIMARY KEY (jahr, fakt_key),
+          CONSTRAINT uq_fact_grain UNIQUE (jahr, datum_key, syndrom_key, altersgruppe_key, edtype_key)
+        ) PARTITION BY RANGE (jahr);
+    """)
+    cur.execute(f"ALTER SEQUENCE {FACT_TABLE}_fakt_key_seq OWNED BY {FACT_TABLE}.fakt_key;")
+
+    cur.execute(f"""
+        SELECT DISTINCT d.jahr FROM {FACT_TABLE}_heap f JOIN dim_datum d ON d.datum_key = f.datum_key;
+    """)
+    ensure_partitions(cur, [r[0] for r in cur.fetchall()])
+
+    cur.execute(f"""
+        INSERT INTO {FACT_TABLE} (jahr, {_COPY_COLUMNS})
+        SELECT d.jahr, {", ".join("f." + c.strip() for c in _COPY_COLUMNS.split(","))}
+        FROM {FACT_TABLE}_heap f
+        JOIN dim_datum d ON d.datum_key = f.datum_key;
+    """)
+    moved = cur.rowcount
+    cur.execute(f"SELECT count(*) FROM {FACT_TABLE}_heap;")
+    total = cur.fetchone()[0]
+    if moved != total:
+        raise RuntimeError(f"Migration aborted: {total - moved} fact rows without dim_datum entry.")
+
+    # no CASCADE: anything else depending on the old table should stop the migration
+    cur.execute(f"DROP TABLE {FACT_TABLE}_heap;")
+    apply_views_sql(cur)
+    cur.execute(f"ANALYZE {FACT_TABLE};")
+    print(f"  - moved {moved} rows")
+    return moved
+
+
+def ensure_fact_layout(cur) -> bool:
+    """
+    Brings fakt_erkrankungen into the configured layout (a partitioned table is never
+    turned back into a heap) and creates the supporting indexes.
+    Returns True if the table is partitioned.
+    """
+    partitioned = is_partitioned(cur)
+    if FACT_LAYOUT == "partitioned" and not partitioned:
+        migrate_to_partitioned(cur)
+        partitioned = True
+    elif FACT_LAYOUT not in ("heap", "partitioned"):
+        raise ValueError(f"Unknown ETL_FACT_LAYOUT '{FACT_LAYOUT}' (heap | partitioned)")
+    ensure_fact_indexes(cur)
+    return partitioned
+
+
+if __name__ == "__main__":
+    # schema init (etl/entrypoint.sh): migrate before the first load
+    from etl.load.load import connect, ensure_constraints
+
+    conn = connect()
+    try:
+        with conn, conn.cursor() as cur:
+            ensure_constraints(cur)
+            print(f"{FACT_TABLE}: {'partitioned' if is_partitioned(cur) else 'heap'}")
+    finally:
+        conn.close()
@@ -0,0 +1,297 @@
+import argparse
+import os
+import re
+
+import psycopg2
+
+from etl.load.partitioning import FACT_TABLE, RANGE_CHECK, ensure_partitions, partition_name
+
+# inplace (default): the load writes into fakt_erkrankungen directly
+# swap:            the load writes into a copy (fakt_erkrankungen_next), validates it and
+#                  swaps it in by renaming; the replaced version stays as fakt_erkrankungen_prev.
+#                  No copy at all if no fact row changed; a partitioned table is only copied
+#                  for the years with changed rows, its other partitions are moved over
+PUBLISH_MODE = os.getenv("ETL_PUBLISH_MODE", "inplace").strip().lower()
+
+# readers are only blocked while the renames run; give up instead of queueing behind a long query
+LOCK_TIMEOUT = os.getenv("ETL_PUBLISH_LOCK_TIMEOUT", "10s")
+
+# table (and constraint/index name) suffix of each version
+NEXT, LIVE, PREV = "_next", "", "_prev"
+SHADOW_TABLE = FACT_TABLE + NEXT
+PREVIOUS_TABLE = FACT_TABLE + PREV
+
+FACT_SEQUENCE = f"{FACT_TABLE}_fakt_key_seq"
+
+_INDEX_DEF = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON (?:ONLY )?\S+ ")
+
+
+def _exists(cur, table: str) -> bool:
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (table,))
+    return cur.fetchone()[0]
+
+
+def _partition_years(cur, table: str) -> list[int]:
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s);
+    """, (table,))
+    pattern = re.compile(rf"^{re.escape(table)}_y(\d+)$")
+    return sorted(int(m.group(1)) for (name,) in cur.fetchall() if (m := pattern.match(name)))
+
+
+def _constraints(cur, table: str) -> list[tuple[str, str]]:
+    """(name, definition) of the table's own PK / unique / FK / check constraints, PK first."""
+    cur.execute("""
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c') AND conislocal
+        ORDER BY position(contype::text IN 'pufc'), conname;
+    """, (table,))
+    return cur.fetchall()
+
+
+def _indexes(cur, table: str) -> list[tuple[str, str]]:
+    """(name, CREATE INDEX statement) of the indexes that do not belong to a constraint."""
+    cur.execute("""
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c
+                          WHERE c.conindid = x.indexrelid AND c.conrelid = x.indrelid)
+        ORDER BY i.relname;
+    """, (table,))
+    return cur.fetchall()
+
+
+def _rename(name: str, old_suffix: str, new_suffix: str) -> str:
+    base = name[:len(name) - len(old_suffix)] if old_suffix and name.endswith(old_suffix) else name
+    return base + new_suffix
+
+
+# =========================
+# Build
+# =========================
+def ensure_range_checks(cur) -> list[int]:
+    """
+    Adds the CHECK constraint of ensure_partitions() to live partitions created before it
+    had one, so that _swap() can attach them to the new version without a validation scan.
+    Needs an autocommit cursor: ADD ... NOT VALID locks the partition only for a moment,
+    VALIDATE scans it without blocking readers. A partition that stays locked is skipped
+    (its move is then validated by a scan). Returns the years checked now.
+    """
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint k
+                          WHERE k.conrelid = c.oid AND k.conname = %s AND k.convalidated);
+    """, (FACT_TABLE, RANGE_CHECK))
+    missing = {name for (name,) in cur.fetchall()}
+    done = []
+    cur.execute("SET lock_timeout = %s;", (LOCK_TIMEOUT,))
+    for y in _partition_years(cur, FACT_TABLE):
+        part = partition_name(y)
+        if part not in missing:
+            continue
+        try:
+            cur.execute(f"ALTER TABLE {part} DROP CONSTRAINT IF EXISTS {RANGE_CHECK};")
+            cur.execute(f"ALTER TABLE {part} ADD CONSTRAINT {RANGE_CHECK} "
+                        f"CHECK (jahr >= {y} AND jahr < {y + 1}) NOT VALID;")
+        except psycopg2.errors.LockNotAvailable:
+            print(f"WARN: {part} is locked, its CHECK constraint is added by a later load")
+            continue
+        cur.execute(f"ALTER TABLE {part} VALIDATE CONSTRAINT {RANGE_CHECK};")
+        done.append(y)
+    cur.execute("SET lock_timeout = DEFAULT;")
+    return done
+
+
+def build_shadow(cur, partitioned: bool, years=()) -> int:
+    """
+    fakt_erkrankungen_next as a copy of the live table (same columns, defaults,
+    constraints and indexes). A partitioned table is only copied for `years` (the years
+    with changed rows); its other partitions are moved over by the swap. The live table
+    is only read. Returns the number of rows copied.
+    """
+    cur.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE};")  # left over by a failed load
+    cur.execute(f"""
+        CREATE TABLE {SHADOW_TABLE} (LIKE {FACT_TABLE} INCLUDING DEFAULTS INCLUDING STORAGE)
+        {"PARTITION BY RANGE (jahr)" if partitioned else ""};
+    """)
+
+    # bulk copy first, constraints and indexes afterwards (one sort per index)
+    if partitioned:
+        years = sorted({int(y) for y in years})
+        ensure_partitions(cur, years, SHADOW_TABLE)
+        cur.execute(f"INSERT INTO {SHADOW_TABLE} SELECT * FROM {FACT_TABLE} WHERE jahr = ANY(%s);", (years,))
+    else:
+        cur.execute(f"INSERT INTO {SHADOW_TABLE} SELECT * FROM {FACT_TABLE};")
+    copied = cur.rowcount
+    for name, definition in _constraints(cur, FACT_TABLE):
+        cur.execute(f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {_rename(name, LIVE, NEXT)} {definition};")
+    for name, definition in _indexes(cur, FACT_TABLE):
+        cur.execute(_INDEX_DEF.sub(rf"CREATE \1INDEX {_rename(name, LIVE, NEXT)} ON {SHADOW_TABLE} ", definition))
+    return copied
+
+
+def incoming_facts(cur, whole: bool = True) -> str:
+    """
+    SQL for the fact rows that are live after publish(): the shadow table plus the live
+    partitions the swap moves over (years without changed rows). whole=False: the shadow
+    table only, which holds every month with changed rows.
+    """
+    years = _partition_years(cur, SHADOW_TABLE)
+    if not (whole and years):
+        return f"SELECT * FROM {SHADOW_TABLE}"
+    return (f"SELECT * FROM {SHADOW_TABLE} UNION ALL "
+            f"SELECT * FROM {FACT_TABLE} WHERE jahr <> ALL (ARRAY[{', '.join(str(y) for y in years)}])")
+
+
+def validate(cur, expected_rows: int):
+    """
+    Checks the shadow table before it goes live; raises instead of publishing a broken state.
+    Then gathers its statistics, so the BI refresh reading it next and the first dashboard
+    queries after the swap get good plans.
+    """
+    cur.execute(f"SELECT count(*) FROM {SHADOW_TABLE};")
+    n = cur.fetchone()[0]
+    if n != expected_rows:
+        raise RuntimeError(f"{SHADOW_TABLE}: {n} rows, expected {expected_rows} - not published")
+
+    # the partitioned layout has no foreign keys, so check the keys here for both layouts
+    cur.execute(f"""
+        SELECT count(*) FROM {SHADOW_TABLE} f
+        WHERE NOT EXISTS (SELECT 1 FROM dim_datum d WHERE d.datum_key = f.datum_key)
+           OR NOT EXISTS (SELECT 1 FROM dim_syndrom s WHERE s.syndrom_key = f.syndrom_key)
+           OR NOT EXISTS (SELECT 1 FROM dim_altersgruppe a WHERE a.altersgruppe_key = f.altersgruppe_key)
+           OR NOT EXISTS (SELECT 1 FROM dim_edtype e WHERE e.edtype_key = f.edtype_key);
+    """)
+    orphans = cur.fetchone()[0]
+    if orphans:
+        raise RuntimeError(f"{SHADOW_TABLE}: {orphans} rows with unknown dimension keys - not published")
+    cur.execute(f"ANALYZE {SHADOW_TABLE};")
+
+
+# =========================
+# Swap
+# =========================
+def _dependent_views(cur) -> list[tuple[str, str]]:
+    """Views reading the live table; they are bound to the table itself, not to its name."""
+    cur.execute("""
+        SELECT DISTINCT v.oid::regclass::text, pg_get_viewdef(v.oid, true)
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.classid = 'pg_rewrite'::regclass
+          AND d.refobjid = to_regclass(%s)
+          AND v.oid <> d.refobjid;
+    """, (FACT_TABLE,))
+    return cur.fetchall()
+
+
+def _rename_version(cur, old_suffix: str, new_suffix: str):
+    """Renames one version of the fact table with its constraints, indexes and partitions."""
+    old, new = FACT_TABLE + old_suffix, FACT_TABLE + new_suffix
+    for name, _ in _constraints(cur, old):
+        cur.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {name} TO {_rename(name, old_suffix, new_suffix)};")
+    for name, _ in _indexes(cur, old):
+        cur.execute(f"ALTER INDEX {name} RENAME TO {_rename(name, old_suffix, new_suffix)};")
+    for y in _partition_years(cur, old):
+        cur.execute(f"ALTER TABLE {partition_name(y, old)} RENAME TO {partition_name(y, new)};")
+    cur.execute(f"ALTER TABLE {old} RENAME TO {new};")
+
+
+def _take_over_partitions(cur, incoming: str) -> list[int]:
+    """
+    Moves the live partitions of the years version `incoming` has no partition for to it
+    (a version built for the changed years only). They keep their name, which is the live
+    one again after the renames; their CHECK constraint spares ATTACH the validation scan.
+    """
+    target = FACT_TABLE + incoming
+    have = _partition_years(cur, target)
+    if not have:  # heap, or a copy of the whole table
+        return []
+    moved = [y for y in _partition_years(cur, FACT_TABLE) if y not in have]
+    for y in moved:
+        cur.execute(f"ALTER TABLE {FACT_TABLE} DETACH PARTITION {partition_name(y)};")
+        cur.execute(f"ALTER TABLE {target} ATTACH PARTITION {partition_name(y)} FOR VALUES FROM ({y}) TO ({y + 1});")
+    return moved
+
+
+def _swap(cur, incoming: str, outgoing: str):
+    """
+    fakt_erkrankungen -> version `outgoing`, version `incoming` -> fakt_erkrankungen,
+    in the caller's transaction. Only catalog changes: readers wait for the commit at most,
+    so the caller commits right after it.
+    """
+    views = _dependent_views(cur)
+    cur.execute("SET LOCAL lock_timeout = %s;", (LOCK_TIMEOUT,))
+    cur.execute(f"LOCK TABLE {FACT_TABLE} IN ACCESS EXCLUSIVE MODE;")
+    _take_over_partitions(cur, incoming)
+    _rename_version(cur, LIVE, "_swap")
+    _rename_version(cur, incoming, LIVE)
+    _rename_version(cur, "_swap", outgoing)
+    # the sequence must not go away with an old version
+    cur.execute(f"ALTER SEQUENCE {FACT_SEQUENCE} OWNED BY {FACT_TABLE}.fakt_key;")
+    for name, definition in views:
+        cur.execute(f"CREATE OR REPLACE VIEW {name} AS {definition}")
+    cur.execute("SET LOCAL lock_timeout = DEFAULT;")
+
+
+def publish(cur):
+    """
+    Makes the validated shadow table live; the replaced version becomes
+    fakt_erkrankungen_prev (an older one is dropped; partitioned: only the replaced years).
+    Meant as the last step before the commit: the lock of the swap is held until then.
+    """
+    cur.execute(f"DROP TABLE IF EXISTS {PREVIOUS_TABLE};")
+    _swap(cur, NEXT, PREV)
+
+
+def discard(cur):
+    """Nothing changed: no new version (drops a shadow table left over by a failed load)."""
+    cur.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE};")
+
+
+def rollback(cur) -> bool:
+    """Previous version <-> live version (again: a second rollback restores the newer one)."""
+    if not _exists(cur, PREVIOUS_TABLE):
+        return False
+    _swap(cur, PREV, PREV)
+    return True
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m etl.load.publish",
+                                     description="Fact table versions of ETL_PUBLISH_MODE=swap")
+    parser.add_argument("cmd", choices=["status", "rollback"])
+    args = parser.parse_args(argv)
+
+    from etl.load import bi_layer
+    from etl.load.load import connect
+
+    conn = connect()
+    try:
+        if args.cmd == "rollback":
+            with conn, conn.cursor() as cur:
+                if not rollback(cur):
+                    raise SystemExit(f"No previous version ({PREVIOUS_TABLE} does not exist)")
+            # the BI tables are derived from the facts; rebuilt in an own transaction so
+            # that the swap above holds its lock only for the renames
+            with conn, conn.cursor() as cur:
+                n_rows, n_groups = bi_layer.refresh(cur)
+            print(f"Rolled back: the previous version is live again, the replaced one is now {PREVIOUS_TABLE} "
+                  f"(BI layer rebuilt: {n_rows} rows, {n_groups} rollup groups)")
+        with conn, conn.cursor() as cur:
+            for table in (FACT_TABLE, PREVIOUS_TABLE):
+                if _exists(cur, table):
+                    cur.execute(f"SELECT count(*) FROM {table};")
+                    print(f"  {table}: {cur.fetchone()[0]} rows")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import time
+
+import requests
+
+# Superset caches chart results for SUPERSET_CACHE_TTL (superset/superset_config.py);
+# after a load that changed data the cached results of the dashboard are dropped and
+# recomputed right away, so the first user after the load does not wait for a cold query.
+# Empty SUPERSET_URL -> nothing to do (e.g. running the ETL outside docker compose).
+SUPERSET_URL = os.getenv("SUPERSET_URL", "").rstrip("/")
+SUPERSET_USER = os.getenv("SUPERSET_USER", "admin")
+SUPERSET_PASSWORD = os.getenv("SUPERSET_PASSWORD", "admin")
+# title of the imported dashboard (superset/assets/dashboards/my_dashboard.zip)
+SUPERSET_DASHBOARD = os.getenv("SUPERSET_DASHBOARD", "Syndrome bei unterschiedlichem Wetter")
+TIMEOUT = int(os.getenv("SUPERSET_TIMEOUT", "120"))
+
+
+def _login(session: requests.Session):
+    """JWT for the REST API plus CSRF token (POST/PUT need both)."""
+    r = session.post(f"{SUPERSET_URL}/api/v1/security/login", timeout=TIMEOUT, json={
+        "username": SUPERSET_USER, "password": SUPERSET_PASSWORD, "provider": "db", "refresh": False,
+    })
+    r.raise_for_status()
+    session.headers["Authorization"] = f"Bearer {r.json()['access_token']}"
+    r = session.get(f"{SUPERSET_URL}/api/v1/security/csrf_token/", timeout=TIMEOUT)
+    r.raise_for_status()
+    session.headers["X-CSRFToken"] = r.json()["result"]
+    session.headers["Referer"] = SUPERSET_URL
+
+
+def _dashboard_id(session: requests.Session) -> int | None:
+    q = f"(filters:!((col:dashboard_title,opr:eq,value:'{SUPERSET_DASHBOARD}')))"
+    r = session.get(f"{SUPERSET_URL}/api/v1/dashboard/", params={"q": q}, timeout=TIMEOUT)
+    r.raise_for_status()
+    ids = r.json().get("ids") or []
+    return ids[0] if ids else None
+
+
+def invalidate(session: requests.Session, dashboard_id: int) -> int:
+    """Drops the cached results of all datasets of the dashboard; returns the number of datasets."""
+    r = session.get(f"{SUPERSET_URL}/api/v1/dashboard/{dashboard_id}/datasets", timeout=TIMEOUT)
+    r.raise_for_status()
+    uids = [f"{ds['id']}__table" for ds in r.json()["result"]]
+    if uids:
+        r = session.post(f"{SUPERSET_URL}/api/v1/cachekey/invalidate", json={"datasource_uids": uids},
+                         timeout=TIMEOUT)
+        r.raise_for_status()
+    return len(uids)
+
+
+def _warm_chart(session: requests.Session, dashboard_id: int, chart_id: int):
+    # with the dashboard's default filters (Superset >= 3.1) ...
+    r = session.put(f"{SUPERSET_URL}/api/v1/chart/warm_up_cache", timeout=TIMEOUT,
+                    json={"chart_id": chart_id, "dashboard_id": dashboard_id})
+    if r.status_code in (404, 405):
+        # ... older versions: recompute the saved query context of the chart
+        r = session.get(f"{SUPERSET_URL}/api/v1/chart/{chart_id}/data/", params={"force": "true"},
+                        timeout=TIMEOUT)
+    r.raise_for_status()
+
+
+def warm(session: requests.Session, dashboard_id: int) -> tuple[int, int]:
+    """Runs every chart of the dashboard once so its result lands in the cache. Returns (ok, failed)."""
+    r = session.get(f"{SUPERSET_URL}/api/v1/dashboard/{dashboard_id}/charts", timeout=TIMEOUT)
+    r.raise_for_status()
+    ok = failed = 0
+    for chart in r.json()["result"]:
+        try:
+            _warm_chart(session, dashboard_id, chart["id"])
+            ok += 1
+        except requests.RequestException as exc:
+            print(f"WARN: could not warm chart {chart['id']} ({chart.get('slice_name')}): {exc}")
+            failed += 1
+    return ok, failed
+
+
+def refresh_dashboard_cache() -> bool:
+    """
+    Invalidate + re-warm after a load that changed data.
+    Best effort: Superset being down or not yet imported never fails the ETL run.
+    """
+    if not SUPERSET_URL:
+        return False
+    t0 = time.perf_counter()
+    try:
+        with requests.Session() as session:
+            _login(session)
+            dashboard_id = _dashboard_id(session)
+            if dashboard_id is None:
+                print(f"WARN: Superset dashboard '{SUPERSET_DASHBOARD}' not found, cache not refreshed")
+                return False
+            n_ds = invalidate(session, dashboard_id)
+            ok, failed = warm(session, dashboard_id)
+    except (requests.RequestException, KeyError, ValueError) as exc:
+        print(f"WARN: could not refresh the Superset cache: {type(exc).__name__}: {exc}")
+        return False
+    print(f"Superset cache refreshed: {n_ds} dataset(s) invalidated, {ok} chart(s) warmed"
+          f"{f', {failed} failed' if failed else ''} ({time.perf_counter() - t0:.2f}s)")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    # manual refresh, e.g. after changing data outside the ETL
+    refresh_dashboard_cache()
@@ -0,0 +1,282 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+import requests
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+MANIFEST_PATH = PROJECT_ROOT / "data/raw/manifest.json"
+
+# ETL_FORCE=1 -> ignore the manifest, always download / transform / load
+FORCE = os.getenv("ETL_FORCE", "0").strip().lower() in ("1", "true", "yes")
+
+
+def force(on: bool = True):
+    """Same as ETL_FORCE=1, for callers that decide at runtime (replay)."""
+    global FORCE
+    FORCE = on
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class SourceManifest:
+    """
+    Persistent record of every downloaded source file (data/raw/manifest.json).
+
+    sources:   url -> {group, path, etag, last_modified, size, sha256, fetched_at, changed_at}
+    consumers: stage name -> {url: sha256 the stage last processed}
+
+    Extract updates `sources`, downstream stages compare them against their
+    own `consumers` entry to answer "did any input change since my last run?".
+
+    Several stages may hold their own instance at the same time (threads of the
+    pipeline runner or separate processes): save() only writes back the entries
+    this instance changed, merged into the current file under a file lock.
+    """
+
+    def __init__(self, path: Path = MANIFEST_PATH, data: dict | None = None):
+        self.path = path
+        data = data or {}
+        self.sources: dict = data.get("sources", {})
+        self.consumers: dict = data.get("consumers", {})
+        self._dirty_sources: set = set()
+        self._dirty_consumers: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _read(path: Path) -> dict:
+        if path.exists():
+            return json.loads(path.read_text(encoding="utf-8"))
+        return {}
+
+    @classmethod
+    def load(cls, path: Path = MANIFEST_PATH) -> "SourceManifest":
+        return cls(path, cls._read(path))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_suffix(".lock")
+        tmp = self.path.with_suffix(f".json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with self._lock, open(lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            current = self._read(self.path)
+            sources = current.get("sources", {})
+            consumers = current.get("consumers", {})
+            sources.update({u: self.sources[u] for u in self._dirty_sources})
+            consumers.update({c: self.consumers[c] for c in self._dirty_consumers})
+
+            payload = {"sources": sources, "consumers": consumers}
+            tmp.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+            os.replace(tmp, self.path)
+
+            self.sources, self.consumers = sources, consumers
+            self._dirty_sources.clear()
+            self._dirty_consumers.clear()
+
+    # ---- extract side ----
+    def conditional_headers(self, url: str, out_path: Path) -> dict:
+        """If-None-Match / If-Modified-Since, but only if the local copy is still intact."""
+        entry = self.sources.get(url)
+        if FORCE or not entry or not out_path.exists():
+            return {}
+        if out_path.stat().st_size != entry.get("stored_size", entry.get("size")):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url: str, group: str, out_path: Path, response, sha256: str, size: int,
+               stored_size: int | None = None) -> bool:
+        """Stores the metadata of a 200 response. Returns True if the content changed."""
+        with self._lock:
+            old = self.sources.get(url, {})
+            changed = old.get("sha256") != sha256
+            self.sources[url] = {
+                "group": group,
+                "path": str(out_path.relative_to(PROJECT_ROOT)) if out_path.is_relative_to(PROJECT_ROOT) else str(out_path),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": size,
+                "stored_size": stored_size if stored_size is not None else size,
+                "sha256": sha256,
+                "fetched_at": _now(),
+                "changed_at": _now() if changed else old.get("changed_at"),
+            }
+            self._dirty_sources.add(url)
+            return changed
+
+    def restore(self, url: str, entry: dict, out_path: Path):
+        """
+        A raw file was put back from the archive (etl.archive.restore): record its content,
+        but without validators - the next extract must not get a 304 for an old file.
+        """
+        with self._lock:
+            self.sources[url] = {
+                "group": entry["group"],
+                "path": entry["path"],
+                "etag": None,
+                "last_modified": None,
+                "size": entry["size"],
+                "stored_size": out_path.stat().st_size,
+                "sha256": entry["sha256"],
+                "fetched_at": self.sources.get(url, {}).get("fetched_at"),
+                "changed_at": _now(),
+            }
+            self._dirty_sources.add(url)
+
+    def touch(self, url: str):
+        """304: only remember when we last checked."""
+        with self._lock:
+            self.sources[url]["fetched_at"] = _now()
+            self._dirty_sources.add(url)
+
+    # ---- downstream side ----
+    def urls(self, groups: list[str]) -> list[str]:
+        return sorted(u for u, e in self.sources.items() if e.get("group") in groups)
+
+    def has_changes(self, consumer: str, groups: list[str]) -> bool:
+        """True if any source of `groups` differs from what `consumer` last processed."""
+        if FORCE:
+            return True
+        urls = self.urls(groups)
+        if not urls:
+            # nothing recorded (yet) -> we cannot prove that nothing changed
+            return True
+        seen = self.consumers.get(consumer, {})
+        return any(seen.get(u) != self.sources[u]["sha256"] for u in urls)
+
+    def mark_consumed(self, consumer: str, groups: list[str]):
+        with self._lock:
+            self.consumers[consumer] = {u: self.sources[u]["sha256"] for u in self.urls(groups)}
+            self._dirty_consumers.add(consumer)
+
+
+def stored_path(out_path: Path, compress: bool) -> Path:
+    """Where a source ends up on disk: as is, or gzip-compressed with an extra .gz suffix."""
+    return out_path.with_name(out_path.name + ".gz") if compress else out_path
+
+
+def _part_paths(out_path: Path) -> tuple[Path, Path]:
+    part = out_path.with_name(out_path.name + ".part")
+    return part, part.with_name(part.name + ".json")
+
+
+def _resume_validator(response) -> str | None:
+    """Strong ETag or Last-Modified, usable in If-Range."""
+    etag = response.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def _content_range_start(response) -> int | None:
+    # "bytes 1000-1999/2000"
+    cr = response.headers.get("Content-Range", "")
+    try:
+        return int(cr.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def _stream_to_part(http, url: str, out_path: Path, headers: dict, timeout: int, chunk_size: int):
+    """
+    One streaming GET into <out>.part. Resumes an existing .part with Range/If-Range
+    if its validator is known. Returns (response, sha256 object, total size, bytes transferred)
+    or (response, None, 0, 0) for a 304.
+    """
+    part, part_meta = _part_paths(out_path)
+    resume_from = 0
+    if part.exists() and part_meta.exists():
+        validator = json.loads(part_meta.read_text(encoding="utf-8")).get("validator")
+        if validator:
+            resume_from = part.stat().st_size
+            # Ranges refer to the encoded body -> no content-encoding while resuming
+            headers = {"Range": f"bytes={resume_from}-", "If-Range": validator, "Accept-Encoding": "identity"}
+
+    with http.get(url, headers=headers, timeout=timeout, stream=True) as r:
+        if r.status_code == 304:
+            return r, None, 0, 0
+        r.raise_for_status()
+
+        h = hashlib.sha256()
+        if r.status_code == 206 and resume_from and _content_range_start(r) == resume_from:
+            mode = "ab"
+            with open(part, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        else:
+            mode, resume_from = "wb", 0
+            part_meta.write_text(json.dumps({"url": url, "validator": _resume_validator(r)}), encoding="utf-8")
+
+        n = 0
+        with open(part, mode) as f:
+            # iter_content transparently decodes gzip/deflate content-encoding
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                h.update(chunk)
+                n += len(chunk)
+        return r, h, resume_from + n, n
+
+
+def fetch(url: str, out_path: Path, group: str, manifest: SourceManifest,
+          session=None, timeout: int = 60, compress: bool = False,
+          resume_attempts: int = 3, chunk_size: int = 1 << 16) -> tuple[bool, int]:
+    """
+    Conditional, streaming GET of `url` into `out_path` (or `out_path`.gz if `compress`).
+
+    The body goes chunk-wise into a .part file that is renamed atomically when complete.
+    A dropped connection leaves the .part behind and the next attempt (here or in a
+    later run) continues it with an HTTP Range request.
+    Returns (changed, bytes_downloaded); an unchanged file costs only a 304.
+    """
+    http = session or requests
+    target = stored_path(out_path, compress)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part, part_meta = _part_paths(out_path)
+
+    n_transferred = 0
+    for attempt in range(1, resume_attempts + 1):
+        try:
+            r, h, size, n = _stream_to_part(
+                http, url, out_path, manifest.conditional_headers(url, target), timeout, chunk_size
+            )
+            n_transferred += n
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            # nothing received yet -> the session's own connect retries already gave up
+            if attempt == resume_attempts or not part.exists():
+                raise
+            print(f"  connection lost on {url}, resuming (attempt {attempt + 1}/{resume_attempts})")
+
+    if h is None:
+        manifest.touch(url)
+        return False, 0
+
+    if compress:
+        tmp = target.with_name(target.name + ".tmp")
+        with open(part, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp, target)
+        part.unlink()
+    else:
+        os.replace(part, target)
+    part_meta.unlink(missing_ok=True)
+
+    # only one representation on disk, so readers never pick up a stale one
+    other = stored_path(out_path, not compress)
+    other.unlink(missing_ok=True)
+
+    changed = manifest.record(url, group, target, r, h.hexdigest(), size, target.stat().st_size)
+    return changed, n_transferred
@@ -0,0 +1,233 @@
+import contextvars
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+METRICS_LOG = PROJECT_ROOT / "logs/etl_metrics.jsonl"
+
+# one id for all stages of a run (the pipeline runner is one process)
+RUN_ID = os.getenv("ETL_RUN_ID") or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + f"-{os.getpid()}"
+
+# rows_out = rows written; the load splits it into inserted / updated (+ unchanged, not written)
+COUNTERS = ("bytes_downloaded", "rows_in", "rows_out", "rows_skipped", "rows_inserted", "rows_updated", "rows_unchanged")
+
+_current: contextvars.ContextVar = contextvars.ContextVar("etl_stage_metrics", default=None)
+_records: list[dict] = []
+_records_lock = threading.Lock()
+
+# records of the stages running right now (the runner runs independent stages in parallel threads)
+_active: list[dict] = []
+
+
+def _rss_bytes() -> int | None:
+    """Current resident set size (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _PeakRss(threading.Thread):
+    """
+    Samples the process RSS while a stage runs (ru_maxrss can only grow, never reset).
+    Process-wide: includes stages running at the same time, not the pool worker processes.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_bytes() or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = _rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        rss = _rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+        if self.peak == 0:
+            # no /proc: fall back to the process high-water mark (KiB on Linux)
+            self.peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return self.peak
+
+
+def count(**counters):
+    """Adds to the counters of the stage running in this context (no-op outside a stage)."""
+    rec = _current.get()
+    if rec is None:
+        return
+    for k, v in counters.items():
+        if k not in COUNTERS:
+            raise KeyError(f"Unknown metric '{k}'. Known: {COUNTERS}")
+        rec[k] = (rec[k] or 0) + int(v)
+
+
+def add_cpu(seconds: float):
+    """
+    CPU time the current stage spent outside its own thread: pool threads measure their
+    time.thread_time(), worker processes their time.process_time(), and the stage's
+    thread adds it up here (no-op outside a stage).
+    """
+    rec = _current.get()
+    if rec is not None and "cpu_seconds" in rec:
+        rec["cpu_seconds"] += seconds
+
+
+@contextmanager
+def counting():
+    """
+    Collects the count() calls of a block into a plain dict instead of a stage record,
+    e.g. in a worker process; the caller hands them to its stage: count(**collected(d)).
+    """
+    rec = {k: None for k in COUNTERS}
+    token = _current.set(rec)
+    try:
+        yield rec
+    finally:
+        _current.reset(token)
+
+
+def collected(rec: dict) -> dict:
+    """The counters of a counting() dict that were actually reported."""
+    return {k: v for k, v in rec.items() if v is not None}
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Measures one stage: wall time, CPU time (the stage's thread plus what its pool
+    threads / worker processes report via add_cpu()), peak RSS of the whole process
+    while it ran, plus whatever the stage reports via count().
+    RSS cannot be split between threads: rss_shared_with names the stages that ran at
+    the same time (None = the stage ran alone, the peak is its own).
+    The record is appended to logs/etl_metrics.jsonl, also when the stage fails.
+    """
+    rec = {
+        "run_id": RUN_ID,
+        "stage": name,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "status": "running",
+        "wall_seconds": None,
+        "cpu_seconds": 0.0,
+        **{k: None for k in COUNTERS},
+        "peak_rss_mb": None,
+        "rss_shared_with": None,
+        "error": None,
+    }
+    shared = set()
+    rec["_shared"] = shared
+    with _records_lock:
+        for other in _active:
+            other["_shared"].add(name)
+            shared.add(other["stage"])
+        _active.append(rec)
+    token = _current.set(rec)
+    sampler = _PeakRss()
+    sampler.start()
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    try:
+        yield rec
+        rec["status"] = "ok"
+    except BaseException as exc:
+        rec["status"] = "failed"
+        rec["error"] = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        rec["wall_seconds"] = round(time.perf_counter() - wall0, 4)
+        rec["cpu_seconds"] = round(rec["cpu_seconds"] + time.thread_time() - cpu0, 4)
+        rec["peak_rss_mb"] = round(sampler.stop() / (1024 * 1024), 1)
+        _current.reset(token)
+        with _records_lock:
+            _active.remove(rec)
+            rec["rss_shared_with"] = ",".join(sorted(rec.pop("_shared"))) or None
+        _write_jsonl(rec)
+        with _records_lock:
+            _records.append(rec)
+
+
+def _write_jsonl(rec: dict):
+    try:
+        METRICS_LOG.parent.mkdir(parents=True, exist_ok=True)
+        with open(METRICS_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+    except OSError as exc:
+        print(f"WARN: could not write metrics log {METRICS_LOG}: {exc}")
+
+
+def records() -> list[dict]:
+    """All stage records of this process."""
+    with _records_lock:
+        return list(_records)
+
+
+def ensure_metrics_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS etl_run_metrics (
+      run_id TEXT NOT NULL,
+      stage TEXT NOT NULL,
+      started_at TIMESTAMPTZ NOT NULL,
+      status TEXT NOT NULL,
+      wall_seconds DOUBLE PRECISION NULL,
+      cpu_seconds DOUBLE PRECISION NULL,
+      bytes_downloaded BIGINT NULL,
+      rows_in BIGINT NULL,
+      rows_out BIGINT NULL,
+      rows_skipped BIGINT NULL,
+      peak_rss_mb DOUBLE PRECISION NULL,
+      rss_shared_with TEXT NULL,
+      error TEXT NULL,
+      PRIMARY KEY (run_id, stage)
+    );
+    """)
+    cur.execute("""
+    ALTER TABLE etl_run_metrics
+      ADD COLUMN IF NOT EXISTS rows_inserted BIGINT NULL,
+      ADD COLUMN IF NOT EXISTS rows_updated BIGINT NULL,
+      ADD COLUMN IF NOT EXISTS rows_unchanged BIGINT NULL;
+    """)
+
+
+def write_db(recs: list[dict] | None = None) -> int:
+    """
+    Stores stage records in etl_run_metrics (own connection and transaction).
+    Best effort: a metrics problem never fails the ETL run.
+    """
+    from psycopg2.extras import execute_values
+
+    from etl.load.load import connect
+
+    recs = records() if recs is None else recs
+    if not recs:
+        return 0
+    cols = ["run_id", "stage", "started_at", "status", "wall_seconds", "cpu_seconds",
+            *COUNTERS, "peak_rss_mb", "rss_shared_with", "error"]
+    try:
+        conn = connect()
+        try:
+            with conn, conn.cursor() as cur:
+                ensure_metrics_table(cur)
+                execute_values(cur, f"""
+                    INSERT INTO etl_run_metrics ({", ".join(cols)}) VALUES %s
+                    ON CONFLICT (run_id, stage) DO UPDATE SET
+                      {", ".join(f"{c} = EXCLUDED.{c}" for c in cols[2:])};
+                """, [tuple(r[c] for c in cols) for r in recs])
+        finally:
+            conn.close()
+    except Exception as exc:
+        print(f"WARN: could not store run metrics in the DWH: {type(exc).__name__}: {exc}")
+        return 0
+    return len(recs)
@@ -0,0 +1,224 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable
+
+from etl import metrics, profiling
+
+
+# =========================
+# Stage graph
+# =========================
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    deps: tuple[str, ...]
+    run: Callable[[dict, argparse.Namespace], object]  # (results of finished stages, CLI args) -> result
+
+
+def _extract_aktin(results, args):
+    from etl.extract.fetcher import aktin_sources, fetch_all
+    return fetch_all(aktin_sources())
+
+
+def _extract_dwd(results, args):
+    from etl.extract.fetcher import DWD_PARAMETERS, dwd_sources, fetch_all
+    return fetch_all([s for p in DWD_PARAMETERS for s in dwd_sources(p)])
+
+
+def _transform_aktin(results, args):
+    from etl.transform import transform_aktin_monthly
+    argv = ["--full-rebuild"] if args.full_rebuild else []
+    return transform_aktin_monthly.main(argv)
+
+
+def _transform_weather(results, args):
+    from etl.transform import transform_weather_monthly_de
+    return transform_weather_monthly_de.main()
+
+
+def _transform_aktin_daily(results, args):
+    from etl.transform import transform_aktin_daily
+    argv = ["--full-rebuild"] if args.full_rebuild else []
+    return transform_aktin_daily.main(argv)
+
+
+def _load_daily(results, args):
+    from etl.load import load_daily
+    return load_daily.main(daily=results.get("transform_aktin_daily"))
+
+
+def _validate(results, args):
+    from etl import quality
+    return quality.main(aktin=results.get("transform_aktin"), weather=results.get("transform_weather"))
+
+
+def _load(results, args):
+    from etl.load import load
+    checked = results.get("validate")
+    if checked is not None:
+        return load.main(aktin=checked["aktin"], weather=checked["weather"], validated=True)
+    # DataFrames of transforms that ran in this process; None -> read from data/processed
+    return load.main(aktin=results.get("transform_aktin"), weather=results.get("transform_weather"))
+
+
+STAGES = {
+    s.name: s
+    for s in [
+        Stage("extract_aktin", (), _extract_aktin),
+        Stage("extract_dwd", (), _extract_dwd),
+        Stage("transform_aktin", ("extract_aktin",), _transform_aktin),
+        Stage("transform_weather", ("extract_dwd",), _transform_weather),
+        Stage("validate", ("transform_aktin", "transform_weather"), _validate),
+        Stage("load", ("transform_aktin", "transform_weather", "validate"), _load),
+        Stage("transform_aktin_daily", ("extract_aktin",), _transform_aktin_daily),
+        # after the monthly load: both write the shared dimensions and create the schema
+        Stage("load_daily", ("transform_aktin_daily", "load"), _load_daily),
+    ]
+}
+
+# daily-grain mart: only part of a default run with ETL_DAILY=1 (or when named explicitly)
+DAILY_STAGES = ["transform_aktin_daily", "load_daily"]
+DAILY = os.getenv("ETL_DAILY", "0").strip().lower() in ("1", "true", "yes")
+
+# shortcuts for the two independent branches
+ALIASES = {
+    "aktin": ["extract_aktin", "transform_aktin"],
+    "dwd": ["extract_dwd", "transform_weather"],
+    "extract": ["extract_aktin", "extract_dwd"],
+    "transform": ["transform_aktin", "transform_weather"],
+    "daily": DAILY_STAGES,
+}
+
+
+def resolve(names: list[str]) -> list[str]:
+    """Stage names / aliases -> stage names in graph order (empty = all stages, daily ones only with ETL_DAILY)."""
+    if not names:
+        return [n for n in STAGES if DAILY or n not in DAILY_STAGES]
+    wanted = set()
+    for n in names:
+        if n in ALIASES:
+            wanted.update(ALIASES[n])
+        elif n in STAGES:
+            wanted.add(n)
+        else:
+            raise SystemExit(f"Unknown stage '{n}'. Stages: {list(STAGES)}, aliases: {list(ALIASES)}")
+    return [n for n in STAGES if n in wanted]
+
+
+# =========================
+# Runner
+# =========================
+def run(selected: list[str], args: argparse.Namespace, workers: int = 2) -> dict:
+    """
+    Runs the selected stages in dependency order; independent ones in parallel threads.
+    Dependencies outside the selection count as satisfied (their output is on disk).
+    Fails fast: after the first failure nothing new is started.
+    Returns {stage: {"status", "seconds", "error"}}.
+    """
+    status = {n: {"status": "pending", "seconds": 0.0, "error": None} for n in selected}
+    results: dict = {}
+    running = {}
+    failed = False
+
+    def _ready(name):
+        return all(d not in status or status[d]["status"] == "ok" for d in STAGES[name].deps)
+
+    def _timed(name):
+        t0 = time.perf_counter()
+        try:
+            with metrics.stage(name), profiling.profiled(name):
+                return STAGES[name].run(results, args)
+        finally:
+            status[name]["seconds"] = time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while True:
+            if not failed:
+                for name in selected:
+                    if status[name]["status"] == "pending" and _ready(name):
+                        print(f"--> [{name}] start", flush=True)
+                        status[name]["status"] = "running"
+                        running[pool.submit(_timed, name)] = name
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                exc = fut.exception()
+                if exc is None:
+                    results[name] = fut.result()
+                    status[name]["status"] = "ok"
+                    print(f"<-- [{name}] ok ({status[name]['seconds']:.2f}s)", flush=True)
+                else:
+                    failed = True
+                    status[name]["status"] = "failed"
+                    status[name]["error"] = f"{type(exc).__name__}: {exc}"
+                    print(f"<-- [{name}] FAILED ({status[name]['seconds']:.2f}s): {status[name]['error']}", flush=True)
+
+    for name in selected:
+        if status[name]["status"] == "pending":
+            status[name]["status"] = "not run"
+    return status
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m etl",
+        description="Runs the ETL stages in one process (AKTIN and DWD branches in parallel).",
+    )
+    parser.add_argument("stages", nargs="*",
+                        help=f"stages or aliases to run (default: all). Stages: {', '.join(STAGES)}; "
+                             f"aliases: {', '.join(ALIASES)}")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="AKTIN transforms: ignore the incremental state / last loaded day")
+    parser.add_argument("--workers", type=int, default=2, help="stages running at the same time")
+    parser.add_argument("--profile", nargs="?", const="all", default=None, metavar="STAGES",
+                        help="profile stages (comma-separated, default all) -> logs/profile/ "
+                             "(same as ETL_PROFILE)")
+    parser.add_argument("--replay", metavar="SNAPSHOT", default=None,
+                        help="offline: restore the raw files of an archived snapshot (id, prefix or 'latest', "
+                             "see python -m etl.archive list) and rebuild transform + load from them")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        profiling.enable(args.profile.split(","))
+
+    if args.replay:
+        selected = resolve(args.stages or ["transform", "validate", "load", *(["daily"] if DAILY else [])])
+        extracts = [n for n in selected if n.startswith("extract_")]
+        if extracts:
+            raise SystemExit(f"--replay works offline, remove {', '.join(extracts)}")
+        from etl import archive, manifest
+        archive.restore(args.replay)
+        # everything downstream of the restored files, whatever the manifest says
+        manifest.force(True)
+        args.full_rebuild = True
+    else:
+        selected = resolve(args.stages)
+    t0 = time.perf_counter()
+    status = run(selected, args, workers=args.workers)
+
+    print(f"=== ETL stage status ({time.perf_counter() - t0:.2f}s total) ===")
+    for name in selected:
+        st = status[name]
+        line = f"  {name:<22} {st['status']:<8} {st['seconds']:8.2f}s"
+        if st["error"]:
+            line += f"  {st['error']}"
+        print(line)
+
+    # per-stage metrics: logs/etl_metrics.jsonl (always) + etl_run_metrics in the DWH
+    if os.getenv("ETL_METRICS_DB", "1").strip().lower() not in ("0", "false", "no"):
+        n = metrics.write_db()
+        if n:
+            print(f"Stored {n} stage metric rows in etl_run_metrics (run_id={metrics.RUN_ID})")
+
+    return 1 if any(st["status"] != "ok" for st in status.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
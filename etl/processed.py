@@ -0,0 +1,95 @@
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+PROCESSED_DIR = PROJECT_ROOT / "data/processed"
+
+# parquet (default) | csv | both   (csv = export / legacy format)
+FORMAT = os.getenv("ETL_PROCESSED_FORMAT", "parquet").strip().lower()
+
+# ETL_PARTITION_BY_YEAR=1 -> <name>/year=YYYY/*.parquet instead of one file
+PARTITION_BY_YEAR = os.getenv("ETL_PARTITION_BY_YEAR", "0").strip().lower() in ("1", "true", "yes")
+
+
+def csv_path(name: str) -> Path:
+    return PROCESSED_DIR / f"{name}.csv"
+
+
+def parquet_path(name: str) -> Path:
+    """File (<name>.parquet) or, partitioned, directory (<name>/)."""
+    return PROCESSED_DIR / name if PARTITION_BY_YEAR else PROCESSED_DIR / f"{name}.parquet"
+
+
+def _remove(path: Path):
+    if path.is_dir():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def _parquet_candidates(name: str) -> list[Path]:
+    return [PROCESSED_DIR / f"{name}.parquet", PROCESSED_DIR / name]
+
+
+def exists(name: str) -> bool:
+    return csv_path(name).exists() or any(p.exists() for p in _parquet_candidates(name))
+
+
+def write(df: pd.DataFrame, name: str) -> list[Path]:
+    """
+    Writes a processed table in the configured format(s), atomically per file.
+    Representations that are not written anymore are removed, so readers never
+    see a stale copy. Returns the written paths.
+    """
+    PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    if FORMAT in ("parquet", "both"):
+        target = parquet_path(name)
+        tmp = target.with_name(target.name + ".tmp")
+        _remove(tmp)
+        if PARTITION_BY_YEAR:
+            df.to_parquet(tmp, index=False, partition_cols=["year"])
+        else:
+            df.to_parquet(tmp, index=False)
+        for p in _parquet_candidates(name):
+            _remove(p)
+        os.replace(tmp, target)
+        written.append(target)
+    else:
+        for p in _parquet_candidates(name):
+            _remove(p)
+
+    if FORMAT in ("csv", "both"):
+        tmp = csv_path(name).with_suffix(".csv.tmp")
+        df.to_csv(tmp, index=False)
+        os.replace(tmp, csv_path(name))
+        written.append(csv_path(name))
+    else:
+        csv_path(name).unlink(missing_ok=True)
+
+    return written
+
+
+def read(name: str, columns: list[str] | None = None) -> tuple[pd.DataFrame, bool]:
+    """
+    Reads a processed table, preferring Parquet (memory-mapped, only `columns`).
+    Returns (frame, typed): typed=False means it came from CSV and still needs
+    the usual dtype fixups.
+    """
+    for p in _parquet_candidates(name):
+        if p.exists():
+            df = pd.read_parquet(p, columns=columns, memory_map=True)
+            if p.is_dir() and "year" in df.columns:
+                # partition keys come back as categoricals
+                df["year"] = df["year"].astype("int64")
+            return df, True
+
+    if csv_path(name).exists():
+        return pd.read_csv(csv_path(name), usecols=columns), False
+
+    raise FileNotFoundError(f"Processed table '{name}' not found in {PROCESSED_DIR}")
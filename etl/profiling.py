@@ -0,0 +1,103 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from etl import metrics
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+PROFILE_DIR = PROJECT_ROOT / "logs/profile"
+
+# ETL_PROFILE: empty = off, "all" / "1" = every stage, otherwise comma-separated stage names
+_targets = {s.strip() for s in os.getenv("ETL_PROFILE", "").split(",") if s.strip()}
+
+TOP_N = int(os.getenv("ETL_PROFILE_TOP", "20"))
+SAMPLE_INTERVAL = float(os.getenv("ETL_PROFILE_INTERVAL", "0.005"))
+
+
+def enable(stages: list[str]):
+    """Profiles these stages from now on (the runner's --profile switch)."""
+    _targets.update(stages or ["all"])
+
+
+def enabled(stage: str) -> bool:
+    return bool(_targets) and (stage in _targets or "all" in _targets or "1" in _targets)
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples the Python stack of one thread at a fixed interval and counts
+    identical stacks -> collapsed-stack format ("a;b;c <count>") for flamegraph tools.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def profiled(stage: str):
+    """
+    Runs the block under cProfile plus a stack sampler if `stage` is selected, and
+    writes logs/profile/<run_id>_<stage>.prof / .collapsed / .txt (top functions).
+    When profiling is off this is a plain pass-through.
+    """
+    if not enabled(stage):
+        yield
+        return
+
+    prof = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), SAMPLE_INTERVAL)
+    sampler.start()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        sampler.stop()
+        _write_artifacts(stage, prof, sampler.stacks)
+
+
+def _write_artifacts(stage: str, prof: cProfile.Profile, stacks: Counter):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    base = PROFILE_DIR / f"{metrics.RUN_ID}_{stage}"
+
+    prof.dump_stats(base.with_suffix(".prof"))
+
+    with open(base.with_suffix(".collapsed"), "w", encoding="utf-8") as f:
+        for stack, n in stacks.most_common():
+            f.write(f"{stack} {n}\n")
+
+    buf = io.StringIO()
+    pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(TOP_N)
+    base.with_suffix(".txt").write_text(buf.getvalue(), encoding="utf-8")
+
+    print(f"PROFILE [{stage}] -> {base}.prof / .collapsed / .txt")
+    # the "function calls ... in N seconds" summary plus the top-N table
+    for line in buf.getvalue().strip().splitlines():
+        if line.strip():
+            print(f"  {line}")
@@ -0,0 +1,363 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from etl import metrics, processed, profiling
+from etl.manifest import SourceManifest
+
+# Rules of docs/data_quality.md, checked on the processed tables between transform and load.
+# Every rule is one vectorized pass over whole columns; only rejected rows are touched row-wise.
+
+STAGE = "validate"
+SOURCE_GROUPS = ["aktin", "dwd"]
+
+AKTIN_NAME = "aktin_monthly"
+WEATHER_NAME = "weather_monthly_de"
+
+DIMENSIONS = ["syndrome", "age_group", "ed_type"]
+KEYS = ["year", "month", *DIMENSIONS]
+WEATHER_MEASURES = ["temperature_mean", "precipitation", "sunshine_duration"]
+
+# read by the checks in addition to what the load needs
+RANGE_COLUMNS = ["ed_count_min", "ed_count_max"]
+
+# Prozentwerte 0-100 (docs/data_quality.md 3.2); the model's lower bound may legitimately be
+# below 0 and is only checked against the expected value
+PERCENT_COLUMNS = ["relative_cases_avg", "relative_cases_7day_ma_avg", "expected_value_avg", "expected_upperbound_avg"]
+
+# reject (default): rejected rows go to etl_quarantine and are not loaded
+# warn:             rejected rows go to etl_quarantine but are loaded anyway
+# off:              no checks
+# Rules in WARNING_RULES never reject a row, in any mode (see below).
+MODE = os.getenv("ETL_QUALITY_MODE", "reject").strip().lower()
+
+# monthly means are float sums: allow their rounding error when comparing them
+TOLERANCE = 1e-9
+
+RULES = {
+    # aktin_monthly
+    "key_missing": "year, month or a dimension value missing (dimension keys are NOT NULL)",
+    "month_invalid": "month outside 1..12",
+    "duplicate_key": "more than one row for month x syndrome x age group x ED type",
+    "expected_bounds": "expected_lowerbound_avg <= expected_value_avg <= expected_upperbound_avg violated",
+    "ed_count_range": "ed_count_min <= ed_count_avg <= ed_count_max violated",
+    "percent_range": "relative value outside 0..100",
+    "weather_missing": "no valid weather row for the month",
+    # weather_monthly_de
+    "weather_null": "weather measure missing",
+    "weather_range": "negative precipitation or sunshine duration",
+}
+
+# only reported (and quarantined as "warned"), the row is loaded: DWD publishes a month
+# after AKTIN has it, so the current month is normally loaded with NULL weather and
+# completed once the weather file has it (the weather transform marks the month as changed)
+WARNING_RULES = {"weather_missing"}
+
+QUARANTINE_COLUMNS = ["run_id", "source", "action", "rules", "reason",
+                      "year", "month", "syndrome", "age_group", "ed_type", "row_data"]
+
+
+# =========================
+# Column checks
+# =========================
+def _floats(col: pd.Series) -> np.ndarray:
+    """Any numeric column (numpy, nullable Int64, ints) as float64 with NaN for NULL."""
+    return pd.to_numeric(col, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _greater(a, b) -> np.ndarray:
+    """a > b beyond float rounding; NULL on either side is no violation."""
+    a, b = np.asarray(a, dtype="float64"), np.asarray(b, dtype="float64")
+    return (a - b) > TOLERANCE * np.maximum(1.0, np.abs(b))
+
+
+def _blank(col: pd.Series) -> np.ndarray:
+    """NULL or empty string; categoricals are checked per category, not per row."""
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        col = col.astype("category")
+    codes = col.cat.codes.to_numpy()
+    bad_cat = (pd.Series(col.cat.categories, dtype=object).astype(str).str.strip() == "").to_numpy()
+    if len(bad_cat) == 0:
+        return np.ones(len(col), dtype=bool)
+    return (codes < 0) | bad_cat[np.maximum(codes, 0)]
+
+
+def _month_keys(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(year, month, YYYYMM) as float arrays, NaN where year or month is missing."""
+    y, m = _floats(df["year"]), _floats(df["month"])
+    return y, m, y * 100 + m
+
+
+def check_weather(weather: pd.DataFrame) -> dict[str, np.ndarray]:
+    """rule -> boolean mask of violating rows of weather_monthly_de."""
+    y, m, _ = _month_keys(weather)
+    missing = np.isnan(y) | np.isnan(m)
+    return {
+        "key_missing": missing,
+        "month_invalid": ~missing & ((m < 1) | (m > 12)),
+        "duplicate_key": weather.duplicated(["year", "month"], keep=False).to_numpy(),
+        "weather_null": weather[WEATHER_MEASURES].isna().any(axis=1).to_numpy(),
+        "weather_range": _greater(0, _floats(weather["precipitation"]))
+                         | _greater(0, _floats(weather["sunshine_duration"])),
+    }
+
+
+def check_aktin(aktin: pd.DataFrame, weather_months: np.ndarray) -> dict[str, np.ndarray]:
+    """rule -> boolean mask of violating rows of aktin_monthly; weather_months = valid YYYYMM."""
+    y, m, ym = _month_keys(aktin)
+    missing = np.isnan(y) | np.isnan(m)
+    for c in DIMENSIONS:
+        missing |= _blank(aktin[c])
+
+    lower, expected, upper = (_floats(aktin[c]) for c in
+                              ("expected_lowerbound_avg", "expected_value_avg", "expected_upperbound_avg"))
+    ed_min, ed_avg, ed_max = (_floats(aktin[c]) for c in ("ed_count_min", "ed_count_avg", "ed_count_max"))
+
+    percent = np.zeros(len(aktin), dtype=bool)
+    for c in PERCENT_COLUMNS:
+        v = _floats(aktin[c])
+        percent |= _greater(0, v) | _greater(v, 100)
+
+    return {
+        "key_missing": missing,
+        "month_invalid": ~missing & ((m < 1) | (m > 12)),
+        "duplicate_key": aktin.duplicated(KEYS, keep=False).to_numpy(),
+        "expected_bounds": _greater(lower, expected) | _greater(expected, upper),
+        "ed_count_range": _greater(ed_min, ed_avg) | _greater(ed_avg, ed_max),
+        "percent_range": percent,
+        "weather_missing": ~missing & ~np.isin(ym, weather_months),
+    }
+
+
+def month_findings(aktin: pd.DataFrame) -> list[str]:
+    """
+    Completeness of the month series (reported, not rejected - there is no row to reject):
+    months without any row between the first and the last one, and months with fewer
+    syndrome x age group x ED type series than the month before.
+    """
+    _, m, ym = _month_keys(aktin)
+    valid = (m >= 1) & (m <= 12)  # NaN compares False
+    months, series = np.unique(ym[valid].astype("int64"), return_counts=True)
+    if len(months) == 0:
+        return []
+    findings = []
+
+    idx = np.arange(months[0] // 100 * 12 + months[0] % 100 - 1, months[-1] // 100 * 12 + months[-1] % 100)
+    expected = idx // 12 * 100 + idx % 12 + 1
+    gaps = np.setdiff1d(expected, months)
+    if len(gaps):
+        findings.append(f"{len(gaps)} month(s) without any row: {_fmt_months(gaps)}")
+
+    drops = np.flatnonzero(series[1:] < series[:-1]) + 1
+    for i in drops:
+        findings.append(f"{_fmt_month(months[i])}: {series[i]} series, {_fmt_month(months[i - 1])} had {series[i - 1]}")
+    return findings
+
+
+def _fmt_month(ym) -> str:
+    return f"{int(ym) // 100}-{int(ym) % 100:02d}"
+
+
+def _fmt_months(yms, limit: int = 12) -> str:
+    shown = ", ".join(_fmt_month(v) for v in yms[:limit])
+    return shown + (f" (+{len(yms) - limit} more)" if len(yms) > limit else "")
+
+
+# =========================
+# Rejected rows
+# =========================
+def _rejected(df: pd.DataFrame, rules: dict[str, np.ndarray], source: str) -> tuple[np.ndarray, pd.DataFrame]:
+    """(mask of rejected rows, quarantine rows for every row that violates a rule)."""
+    bad = np.zeros(len(df), dtype=bool)
+    found = np.zeros(len(df), dtype=bool)
+    for name, mask in rules.items():
+        found |= mask
+        if name not in WARNING_RULES:
+            bad |= mask
+    idx = np.flatnonzero(found)
+    if len(idx) == 0:
+        return bad, pd.DataFrame(columns=QUARANTINE_COLUMNS)
+
+    names = list(rules)
+    hits = np.column_stack([rules[n][idx] for n in names])
+    rule_lists = [[n for n, hit in zip(names, row) if hit] for row in hits]
+
+    rows = df.iloc[idx]
+    out = pd.DataFrame({
+        "run_id": metrics.RUN_ID,
+        "source": source,
+        "action": np.where(bad[idx] & (MODE == "reject"), "rejected", "warned"),
+        "rules": rule_lists,
+        "reason": ["; ".join(RULES[n] for n in r) for r in rule_lists],
+        # to_json turns NaN into null and numpy scalars into plain numbers
+        "row_data": [json.dumps(r) for r in json.loads(rows.to_json(orient="records"))],
+    })
+    for c in KEYS:
+        out[c] = rows[c].astype(object).where(rows[c].notna(), None).to_numpy() if c in rows else None
+    for c in ("year", "month"):
+        out[c] = [int(v) if v is not None and v == v else None for v in out[c]]
+    return bad, out[QUARANTINE_COLUMNS]
+
+
+def validate(aktin: pd.DataFrame, weather: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Checks both processed tables. Returns (AKTIN rows to load, weather rows to load,
+    quarantine rows, report). With ETL_QUALITY_MODE=warn nothing is removed, with off
+    nothing is checked.
+    """
+    if MODE not in ("reject", "warn", "off"):
+        raise ValueError(f"Unknown ETL_QUALITY_MODE '{MODE}' (reject | warn | off)")
+    if MODE == "off":
+        return aktin, weather, pd.DataFrame(columns=QUARANTINE_COLUMNS), {"rules": {}, "months": []}
+
+    w_rules = check_weather(weather)
+    w_bad, w_rejected = _rejected(weather, w_rules, WEATHER_NAME)
+    weather_months = _month_keys(weather)[2][~w_bad]
+
+    a_rules = check_aktin(aktin, weather_months)
+    a_bad, a_rejected = _rejected(aktin, a_rules, AKTIN_NAME)
+
+    _, _, ym = _month_keys(aktin)
+    report = {
+        "rules": {f"{AKTIN_NAME}.{n}": int(m.sum()) for n, m in a_rules.items()}
+                 | {f"{WEATHER_NAME}.{n}": int(m.sum()) for n, m in w_rules.items()},
+        "weather_missing_months": np.unique(ym[a_rules["weather_missing"]]).astype("int64"),
+        "months": month_findings(aktin),
+    }
+    parts = [r for r in (w_rejected, a_rejected) if len(r)]
+    rejected = pd.concat(parts, ignore_index=True) if parts else a_rejected
+    if MODE == "reject":
+        aktin, weather = aktin[~a_bad], weather[~w_bad]
+    return aktin, weather, rejected, report
+
+
+def print_report(report: dict, rejected: pd.DataFrame):
+    for name, n in report["rules"].items():
+        if n:
+            rule = name.split(".", 1)[1]
+            line = f"  - {name}: {n} row(s) ({RULES[rule]})"
+            if rule == "weather_missing":
+                line += f", months: {_fmt_months(report['weather_missing_months'])}"
+            print(line)
+    for finding in report["months"]:
+        print(f"  - WARN month completeness: {finding}")
+    if len(rejected):
+        n_rejected = int((rejected["action"] == "rejected").sum())
+        n_warned = len(rejected) - n_rejected
+        what = [f"{n_rejected} not loaded"] if n_rejected else []
+        if n_warned:
+            what.append(f"{n_warned} loaded anyway" + (" (ETL_QUALITY_MODE=warn)" if MODE == "warn" else ""))
+        print(f"  - {len(rejected)} row(s) -> etl_quarantine (run_id={metrics.RUN_ID}): {', '.join(what)}")
+
+
+# =========================
+# Quarantine table
+# =========================
+def ensure_quarantine_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS etl_quarantine (
+      quarantine_key BIGSERIAL PRIMARY KEY,
+      run_id TEXT NOT NULL,
+      checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+      source TEXT NOT NULL,
+      action TEXT NOT NULL,
+      rules TEXT[] NOT NULL,
+      reason TEXT NOT NULL,
+      year INT NULL,
+      month INT NULL,
+      syndrome TEXT NULL,
+      age_group TEXT NULL,
+      ed_type TEXT NULL,
+      row_data JSONB NOT NULL
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS ix_etl_quarantine_run ON etl_quarantine (run_id);")
+
+
+def write_quarantine(cur, rejected: pd.DataFrame) -> int:
+    """
+    Replaces the quarantine rows of both checked tables with the findings of this check:
+    the table holds the current findings (run_id = the run that found them), so a rerun
+    or replay of the same data does not add them again and fixed rows disappear.
+    """
+    from psycopg2.extras import execute_values
+
+    ensure_quarantine_table(cur)
+    cur.execute("DELETE FROM etl_quarantine WHERE source IN (%s, %s);", (AKTIN_NAME, WEATHER_NAME))
+    if rejected.empty:
+        return 0
+    execute_values(cur, f"""
+        INSERT INTO etl_quarantine ({", ".join(QUARANTINE_COLUMNS)}) VALUES %s;
+    """, list(rejected[QUARANTINE_COLUMNS].itertuples(index=False, name=None)),
+        template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)", page_size=1000)
+    return len(rejected)
+
+
+# =========================
+# Main
+# =========================
+def _read(name: str) -> pd.DataFrame:
+    df, typed = processed.read(name)
+    if not typed:
+        # CSV export format: same fixups as the load, but rows without year/month stay (key_missing)
+        for c in DIMENSIONS:
+            if c in df.columns:
+                df[c] = df[c].astype(str).str.strip().replace("nan", "")
+        df["year"] = pd.to_numeric(df["year"], errors="coerce").astype("Int64")
+        df["month"] = pd.to_numeric(df["month"], errors="coerce").astype("Int64")
+    return df
+
+
+def main(aktin: pd.DataFrame | None = None, weather: pd.DataFrame | None = None) -> dict | None:
+    """
+    aktin / weather: frames of transforms that ran in this process, missing ones are read
+    from data/processed/. Returns {"aktin", "weather"} (the rows to load) or None if the
+    checks were skipped.
+    """
+    if MODE == "off":
+        print("VALIDATE SKIPPED: ETL_QUALITY_MODE=off")
+        return None
+
+    manifest = SourceManifest.load()
+    if not manifest.has_changes(STAGE, SOURCE_GROUPS):
+        print("VALIDATE SKIPPED: no source changed since the last check")
+        return None
+
+    if aktin is None:
+        aktin = _read(AKTIN_NAME)
+    if weather is None:
+        weather = _read(WEATHER_NAME)
+
+    t0 = time.perf_counter()
+    aktin_ok, weather_ok, rejected, report = validate(aktin, weather)
+    secs = time.perf_counter() - t0
+
+    # also without findings: clears those of the previous check
+    from etl.load.load import connect
+
+    conn = connect()
+    try:
+        with conn, conn.cursor() as cur:
+            write_quarantine(cur, rejected)
+    finally:
+        conn.close()
+
+    n_in = len(aktin) + len(weather)
+    metrics.count(rows_in=n_in, rows_out=len(aktin_ok) + len(weather_ok),
+                  rows_skipped=n_in - len(aktin_ok) - len(weather_ok))
+    manifest.mark_consumed(STAGE, SOURCE_GROUPS)
+    manifest.save()
+
+    rate = n_in / secs if secs > 0 else float("inf")
+    print(f"VALIDATE DONE: {len(aktin)} AKTIN + {len(weather)} weather rows checked in {secs:.3f}s "
+          f"({rate:,.0f} rows/s), {n_in - len(aktin_ok) - len(weather_ok)} rejected")
+    print_report(report, rejected)
+    return {"aktin": aktin_ok, "weather": weather_ok}
+
+
+if __name__ == "__main__":
+    with metrics.stage(STAGE), profiling.profiled(STAGE):
+        main()
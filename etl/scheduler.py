@@ -0,0 +1,210 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import requests
+
+from etl import pipeline
+from etl.extract.fetcher import TIMEOUT, Source, all_sources, make_session
+from etl.manifest import SourceManifest, stored_path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]  # .../DWH
+
+RUN_SCRIPT = PROJECT_ROOT / "scripts/run_etl.sh"
+
+# seconds between two freshness checks (python -m etl.scheduler without --once)
+POLL_INTERVAL = int(os.getenv("ETL_POLL_INTERVAL", "3600"))
+
+# bytes read from the end of the (date-ordered) AKTIN file to find its latest day
+TAIL_BYTES = 64 * 1024
+
+_DATE = re.compile(rb"^(?:[^\t]*\t)*?(\d{4}-\d{2}-\d{2})(?:\t|$)")
+
+# stage to run -> (manifest consumer, source groups) it works off
+CONSUMERS = {
+    "transform_aktin": ("transform_aktin_monthly", ["aktin"]),
+    "transform_weather": ("transform_weather_monthly_de", ["dwd"]),
+    "load": ("load", ["aktin", "dwd"]),
+    "transform_aktin_daily": ("transform_aktin_daily", ["aktin"]),
+    "load_daily": ("load_daily", ["aktin"]),
+}
+
+
+def _log(msg: str):
+    print(f"[{datetime.now().isoformat(timespec='seconds')}] {msg}", flush=True)
+
+
+# =========================
+# Upstream
+# =========================
+def probe(session: requests.Session, src: Source, manifest: SourceManifest) -> tuple[str | None, requests.Response]:
+    """
+    HEAD with the same conditional headers the extract would send: 304 -> the extract
+    would not download anything. Returns (why the source would be fetched or None, response).
+    """
+    headers = manifest.conditional_headers(src.url, stored_path(src.out_path, src.compress))
+    r = session.head(src.url, headers={"Accept-Encoding": "identity", **headers},
+                     timeout=TIMEOUT, allow_redirects=True)
+    if r.status_code == 304:
+        return None, r
+    r.raise_for_status()
+    if not headers:
+        return ("not downloaded yet" if src.url not in manifest.sources else "no intact local copy"), r
+    return "changed upstream", r
+
+
+def latest_date(session: requests.Session, url: str, size: int | None) -> date | None:
+    """
+    Latest day in the AKTIN file, from a range request for its last TAIL_BYTES.
+    None if the server ignores the range (nothing is downloaded then) or no date is found.
+    """
+    headers = {"Accept-Encoding": "identity"}
+    if size:
+        # explicit start offset: also works where suffix ranges (bytes=-N) are not supported
+        headers["Range"] = f"bytes={max(size - TAIL_BYTES, 0)}-"
+    with session.get(url, headers=headers, timeout=TIMEOUT, stream=True) as r:
+        if r.status_code != 206 and not (size and size <= TAIL_BYTES and r.status_code == 200):
+            return None
+        tail = r.raw.read(TAIL_BYTES + 1, decode_content=True)
+    lines = tail.splitlines()
+    if size and size > TAIL_BYTES:
+        lines = lines[1:]  # the first line is cut
+    days = [m.group(1).decode() for line in lines if (m := _DATE.match(line))]
+    return date.fromisoformat(max(days)) if days else None
+
+
+def _months(first: date, last: date) -> list[str]:
+    out, y, m = [], first.year, first.month
+    while (y, m) <= (last.year, last.month):
+        out.append(f"{y}-{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def _aktin_watermark() -> date | None:
+    from etl.transform.transform_aktin_monthly import load_state
+    prev = load_state()
+    return prev["watermark"] if prev else None
+
+
+# =========================
+# Plan
+# =========================
+def check(session: requests.Session | None = None) -> list[str]:
+    """
+    One freshness check: which stages have to run to bring the DWH up to date.
+    Empty list = everything current.
+    """
+    from etl.transform.transform_aktin_monthly import REVISION_DAYS
+
+    session = session or make_session(pool_size=4)
+    manifest = SourceManifest.load()
+    fetch = {"aktin": [], "dwd": []}
+    unreachable = set()
+    aktin_head = None
+    for src in all_sources():
+        try:
+            reason, r = probe(session, src, manifest)
+        except requests.RequestException as exc:
+            _log(f"WARN: {src.url}: {type(exc).__name__}: {exc}")
+            unreachable.add(src.group)
+            continue
+        if src.group == "aktin":
+            aktin_head = r
+        if reason:
+            fetch[src.group].append((src, reason))
+
+    # nothing is started for a branch whose sources could not all be checked
+    for group in unreachable:
+        _log(f"{group}: upstream not reachable, checked again next time")
+        fetch[group] = []
+
+    def pending(stage: str) -> bool:
+        return manifest.has_changes(*CONSUMERS[stage])
+
+    stages = []
+
+    if fetch["aktin"]:
+        src, reason = fetch["aktin"][0]
+        watermark = _aktin_watermark()
+        size = aktin_head.headers.get("Content-Length") if aktin_head is not None else None
+        try:
+            latest = latest_date(session, src.url, int(size) if size else None)
+        except requests.RequestException as exc:
+            _log(f"WARN: latest AKTIN day not readable: {type(exc).__name__}: {exc}")
+            latest = None
+        if latest and watermark:
+            months = _months(watermark - timedelta(days=REVISION_DAYS), latest)
+            news = f"up to {latest} (transformed up to {watermark})" if latest > watermark else \
+                f"no new days after {watermark}, revisions only"
+            _log(f"aktin: {reason}, {news} -> months {months[0]}..{months[-1]}")
+        else:
+            _log(f"aktin: {reason}" + (f", data up to {latest}" if latest else "") + " -> all months")
+        stages += ["extract_aktin", "transform_aktin"]
+    elif pending("transform_aktin"):
+        _log("aktin: upstream unchanged, raw data not transformed yet")
+        stages.append("transform_aktin")
+
+    if fetch["dwd"]:
+        files = [s.out_path.name for s, _ in fetch["dwd"]]
+        calendar = sorted({int(f.rsplit("_", 1)[1][:2]) for f in files})
+        _log(f"dwd: {len(files)} file(s) {fetch['dwd'][0][1]} -> calendar month(s) "
+             f"{', '.join(f'{m:02d}' for m in calendar)}")
+        stages += ["extract_dwd", "transform_weather"]
+    elif pending("transform_weather"):
+        _log("dwd: upstream unchanged, raw data not transformed yet")
+        stages.append("transform_weather")
+
+    if stages or pending("load"):
+        stages += ["validate", "load"]
+    if pipeline.DAILY:
+        if fetch["aktin"] or pending("transform_aktin_daily"):
+            stages += pipeline.DAILY_STAGES
+        elif pending("load_daily"):
+            stages.append("load_daily")
+    return [n for n in pipeline.STAGES if n in stages]
+
+
+def run(stages: list[str]) -> int:
+    """One ETL run of the given stages (own process -> own run id, log via run_etl.sh)."""
+    _log(f"starting ETL: {' '.join(stages)}")
+    rc = subprocess.run(["bash", str(RUN_SCRIPT), *stages], cwd=PROJECT_ROOT).returncode
+    _log(f"ETL finished with exit code {rc}")
+    return rc
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m etl.scheduler",
+        description="Polls the upstream sources (HEAD / range requests) and runs only the ETL stages "
+                    "whose inputs changed.",
+    )
+    parser.add_argument("--once", action="store_true", help="one check (and run), then exit")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would run")
+    parser.add_argument("--interval", type=int, default=POLL_INTERVAL,
+                        help=f"seconds between two checks (default ETL_POLL_INTERVAL={POLL_INTERVAL})")
+    args = parser.parse_args(argv)
+
+    session = make_session(pool_size=4)
+    rc = 0
+    while True:
+        stages = check(session)
+        if not stages:
+            watermark = _aktin_watermark()
+            _log("DWH is current" + (f" (AKTIN up to {watermark})" if watermark else "") + ", nothing to run")
+        elif args.dry_run:
+            _log(f"would run: {' '.join(stages)}")
+        else:
+            rc = run(stages)
+        if args.once:
+            return rc
+        time.sleep(max(args.interval, 1))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
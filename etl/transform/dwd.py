@@ -0,0 +1,84 @@
+import re
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+
+# DWD regional_averages_*: a few free-text lines, then the ';'-table starting with "Jahr;Monat"
+_HEADER_RE = re.compile(rb"(?m)^[ \t]*Jahr;Monat")
+
+LONG_COLUMNS = ["year", "month", "region", "parameter", "value"]
+
+
+def _split(data: bytes, name: str) -> tuple[bytes, bytes]:
+    """(header line, body) of one file; the header offset is found without splitting lines."""
+    m = _HEADER_RE.search(data)
+    if m is None:
+        raise ValueError(f"Header 'Jahr;Monat' nicht gefunden in {name} (Format evtl. geändert).")
+    start = m.start()
+    eol = data.find(b"\n", start)
+    if eol < 0:
+        return data[start:].strip(), b""
+    return data[start:eol].strip(), data[eol + 1:]
+
+
+def _decimal(body: bytes) -> str:
+    # values are either "3.44" or "3,44"; there is no other ',' in the table body
+    return "," if b"," in body else "."
+
+
+def _read_table(buf: bytes, decimal: str) -> pd.DataFrame:
+    df = pd.read_csv(
+        BytesIO(buf), sep=";", decimal=decimal, skipinitialspace=True,
+        engine="c", encoding="utf-8", encoding_errors="replace",
+    )
+    df.columns = [str(c).strip() for c in df.columns]
+    # Trailing ';' erzeugt eine leere Spalte
+    return df.loc[:, [c for c in df.columns if c and not c.startswith("Unnamed")]]
+
+
+def parse_dwd_table(data: bytes, name: str = "<text>") -> pd.DataFrame:
+    """One DWD file -> wide frame (Jahr, Monat, <Bundesländer...>, Deutschland), numeric values."""
+    header, body = _split(data, name)
+    return _read_table(header + b"\n" + body, _decimal(body))
+
+
+def parse_dwd_files(files: dict[str, list[Path]]) -> pd.DataFrame:
+    """
+    All files of all parameters -> one long table (year, month, region, parameter, value).
+
+    Files with the same header and decimal separator are concatenated into one buffer,
+    every line prefixed with its parameter, and parsed by a single C-engine read_csv;
+    the usual case (36 files, one layout) is exactly one parse. Row order follows the
+    order of `files`, so "keep last" de-duplication behaves like reading file by file.
+    """
+    groups: dict[tuple[bytes, str], list[bytes]] = {}
+    for parameter, paths in files.items():
+        token = parameter.encode() + b";"
+        for p in paths:
+            header, body = _split(p.read_bytes(), p.name)
+            body = body.replace(b"\r\n", b"\n").rstrip(b"\n")
+            if not body:
+                continue
+            groups.setdefault((header, _decimal(body)), []).append(token + body.replace(b"\n", b"\n" + token))
+
+    parts = []
+    for (header, decimal), bodies in groups.items():
+        wide = _read_table(b"parameter;" + header + b"\n" + b"\n".join(bodies), decimal)
+        wide = wide.rename(columns={"Jahr": "year", "Monat": "month"})
+        regions = [c for c in wide.columns if c not in ("parameter", "year", "month")]
+        long = wide.melt(id_vars=["year", "month", "parameter"], value_vars=regions,
+                         var_name="region", value_name="value")
+        parts.append(long)
+
+    if not parts:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+
+    out = pd.concat(parts, ignore_index=True)
+    out["year"] = pd.to_numeric(out["year"], errors="coerce").astype("Int64")
+    out["month"] = pd.to_numeric(out["month"], errors="coerce").astype("Int64")
+    out["value"] = pd.to_numeric(out["value"], errors="coerce")
+    out = out.dropna(subset=["year", "month", "value"])
+    out["region"] = out["region"].astype("category")
+    out["parameter"] = out["parameter"].astype("category")
+    return out[LONG_COLUMNS].reset_index(drop=True)
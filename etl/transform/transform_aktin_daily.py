@@ -0,0 +1,103 @@
+import argparse
+import json
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from etl import metrics, processed, profiling
+from etl.manifest import SourceManifest
+from etl.transform.transform_aktin_monthly import (
+    CHUNK_ROWS, MEANS, REVISION_DAYS, UnorderedInput, _raw_path, read_daily,
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]  # .../DWH
+
+OUT_NAME = "aktin_daily"  # data/processed/aktin_daily.parquet: only the current load window
+
+STAGE = "transform_aktin_daily"
+
+# last day the daily load has committed (written by etl/load/load_daily.py)
+LOADED_PATH = PROJECT_ROOT / "data/state/aktin_daily_loaded.json"
+
+GRAIN = ["date", "syndrome", "age_group", "ed_type"]
+OUT_COLUMNS = ["date", "year", "month", "syndrome", "age_group", "ed_type", *MEANS]
+
+
+def read_loaded() -> date | None:
+    if not LOADED_PATH.exists():
+        return None
+    last = json.loads(LOADED_PATH.read_text(encoding="utf-8")).get("last_date")
+    return date.fromisoformat(last) if last else None
+
+
+def write_loaded(last_date: date):
+    LOADED_PATH.parent.mkdir(parents=True, exist_ok=True)
+    LOADED_PATH.write_text(json.dumps({"last_date": last_date.isoformat()}), encoding="utf-8")
+
+
+def window_start(full_rebuild: bool) -> date | None:
+    """First day to (re)load: revision window before the last loaded day; None = everything."""
+    last = None if full_rebuild else read_loaded()
+    return None if last is None else last - timedelta(days=REVISION_DAYS)
+
+
+def daily_frame(path: Path, chunk_rows: int = 0, since: date | None = None) -> tuple[pd.DataFrame, int]:
+    """
+    Daily AKTIN rows from `since` on in aktin_daily layout, one row per GRAIN
+    (a repeated day keeps its last row, as the load upserts it anyway).
+    Returns (frame, duplicates dropped).
+    """
+    since = since.isoformat() if since else None
+    try:
+        parts = [c.rename(columns={"_date": "date"})[OUT_COLUMNS] for c in read_daily(path, chunk_rows, since)]
+    except UnorderedInput as exc:
+        print(f"  - WARN: {exc}, reading the whole file")
+        parts = [c.rename(columns={"_date": "date"})[OUT_COLUMNS]
+                 for c in read_daily(path, chunk_rows, since, ordered=False)]
+    if not parts:
+        return pd.DataFrame(columns=OUT_COLUMNS), 0
+
+    df = pd.concat(parts, ignore_index=True)
+    for c in ("syndrome", "age_group", "ed_type"):
+        # chunks may have different category sets
+        df[c] = df[c].astype("category")
+    n = len(df)
+    df = df.drop_duplicates(subset=GRAIN, keep="last")
+    df = df.sort_values(GRAIN, kind="stable").reset_index(drop=True)
+    df["year"] = df["year"].astype("int32")
+    df["month"] = df["month"].astype("int32")
+    return df, n - len(df)
+
+
+def main(argv: list[str] | None = None) -> pd.DataFrame | None:
+    """Returns the daily window frame (for in-process callers) or None if the source was unchanged."""
+    parser = argparse.ArgumentParser(description="AKTIN daily rows -> data/processed/aktin_daily (load window)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS,
+                        help="rows per read chunk (0 = whole file at once)")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="ignore the last loaded day and emit the whole history")
+    args = parser.parse_args(argv)
+
+    manifest = SourceManifest.load()
+    if processed.exists(OUT_NAME) and not args.full_rebuild and not manifest.has_changes(STAGE, ["aktin"]):
+        print(f"AKTIN source unchanged since last transform, keeping {OUT_NAME}")
+        return None
+
+    since = window_start(args.full_rebuild)
+    daily, dropped = daily_frame(_raw_path(), args.chunk_size, since)
+
+    paths = processed.write(daily, OUT_NAME)
+    metrics.count(rows_out=len(daily), rows_skipped=dropped)
+    print(f"Saved processed AKTIN daily to {', '.join(str(p) for p in paths)}")
+    print(f"  - window: {since.isoformat() if since else 'full history'} .. "
+          f"{daily['date'].max().date() if len(daily) else '-'} ({len(daily)} rows, {dropped} duplicate(s) dropped)")
+
+    manifest.mark_consumed(STAGE, ["aktin"])
+    manifest.save()
+    return daily
+
+
+if __name__ == "__main__":
+    with metrics.stage(STAGE), profiling.profiled(STAGE):
+        main()
@@ -1,39 +1,514 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
 import pandas as pd
 from pathlib import Path
 
+from etl import metrics, processed, profiling
+from etl.manifest import SourceManifest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # wenn Datei in DWH/etl/transform liegt
 RAW_PATH = PROJECT_ROOT / "data/raw/aktin/Notaufnahmesurveillance_Zeitreihen_Syndrome.tsv"
-OUT_PATH = PROJECT_ROOT / "data/processed/aktin_monthly.csv"
-
-def main():
-    df = pd.read_csv(RAW_PATH, sep="\t")
-
-    df["date"] = pd.to_datetime(df["date"])
-    df["year"] = df["date"].dt.year
-    df["month"] = df["date"].dt.month
-
-    monthly = (
-        df.groupby(["year","month","syndrome","age_group","ed_type"], as_index=False)
-          .agg(
-              relative_cases_avg=("relative_cases","mean"),
-              relative_cases_7day_ma_avg=("relative_cases_7day_ma","mean"),
-              expected_value_avg=("expected_value","mean"),
-              expected_lowerbound_avg=("expected_lowerbound","mean"),
-              expected_upperbound_avg=("expected_upperbound","mean"),
-
-              # B1: ed_count ist "Anzahl eingeschlossener Notaufnahmen pro Tag"
-              # -> Monats-Interpretation sinnvoll als Durchschnitt (optional min/max)
-              ed_count_avg=("ed_count", "mean"),
-              ed_count_min=("ed_count", "min"),
-              ed_count_max=("ed_count", "max"),
-          )
+OUT_NAME = "aktin_monthly"  # data/processed/aktin_monthly.parquet (and/or .csv)
+
+STAGE = "transform_aktin_monthly"  # manifest consumer
+PIPELINE_STAGE = "transform_aktin"  # metrics / profile name, the same as under python -m etl
+
+# Incremental mode: per-group partial state + watermark between runs,
+# and the months the load stage still has to pick up
+STATE_PATH = PROJECT_ROOT / "data/state/aktin_monthly_state.pkl"
+PENDING_PATH = PROJECT_ROOT / "data/processed/aktin_monthly_pending.json"
+
+# How far back (days before the watermark) upstream may still revise daily rows
+REVISION_DAYS = int(os.getenv("ETL_AKTIN_REVISION_DAYS", "56"))
+
+# Rows per read_csv chunk; 0 = read the whole file at once
+CHUNK_ROWS = int(os.getenv("ETL_AKTIN_CHUNK_ROWS", "0"))
+
+# > 1: the daily file is split into this many month ranges that are parsed and
+# aggregated in a process pool (aggregate_parallel); 1 = serial
+WORKERS = int(os.getenv("ETL_AKTIN_WORKERS", "1"))
+
+KEYS = ["year", "month", "syndrome", "age_group", "ed_type"]
+
+# daily column -> monthly mean column
+MEANS = {
+    "relative_cases": "relative_cases_avg",
+    "relative_cases_7day_ma": "relative_cases_7day_ma_avg",
+    "expected_value": "expected_value_avg",
+    "expected_lowerbound": "expected_lowerbound_avg",
+    "expected_upperbound": "expected_upperbound_avg",
+    # B1: ed_count ist "Anzahl eingeschlossener Notaufnahmen pro Tag"
+    # -> Monats-Interpretation sinnvoll als Durchschnitt (optional min/max)
+    "ed_count": "ed_count_avg",
+}
+
+USECOLS = ["date", "syndrome", "age_group", "ed_type", *MEANS]
+DTYPES = {
+    "syndrome": "category",
+    "age_group": "category",
+    "ed_type": "category",
+    **{c: "float64" for c in MEANS},
+}
+DATE_FORMAT = "%Y-%m-%d"
+
+OUT_COLUMNS = KEYS + list(MEANS.values()) + ["ed_count_min", "ed_count_max"]
 
+
+class UnorderedInput(ValueError):
+    """The daily file is not ordered by date: seeking, sharding and the month carry-over do not apply."""
+
+
+def _raw_path() -> Path:
+    """The extract stage keeps either the plain TSV or (ETL_RAW_COMPRESS=1) a .tsv.gz."""
+    gz = RAW_PATH.with_name(RAW_PATH.name + ".gz")
+    return gz if gz.exists() else RAW_PATH
+
+
+def read_daily(path: Path, chunk_rows: int = 0, since: str | None = None, ordered: bool = True):
+    """
+    Yields the daily rows as typed DataFrames (only the needed columns, categorical
+    dimensions, fixed date format) - one frame, or one per chunk if chunk_rows > 0.
+    `since` (YYYY-MM-DD): only rows from that day on. A plain file is not parsed
+    before the first such row (see tail_from); rows are filtered again after parsing.
+    Every row carries a content hash (_row_hash) for change detection.
+
+    ordered=True relies on the file being ordered by date and checks that on every
+    chunk read (UnorderedInput otherwise); ordered=False parses the whole file.
+    """
+    if ordered and since is not None and isinstance(path, Path) and path.suffix != ".gz":
+        header, offset = tail_from(path, since)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            path = io.BytesIO(header + f.read())
+    reader = pd.read_csv(
+        path, sep="\t", usecols=USECOLS, dtype=DTYPES,
+        chunksize=chunk_rows if chunk_rows > 0 else None,
     )
+    prev_date = None
+    for df in ([reader] if chunk_rows <= 0 else reader):
+        if ordered and len(df):
+            # ISO dates compare correctly as strings
+            if not df["date"].is_monotonic_increasing or (prev_date is not None and df["date"].iat[0] < prev_date):
+                raise UnorderedInput(f"{getattr(path, 'name', 'daily AKTIN data')} is not ordered by date")
+            prev_date = df["date"].iat[-1]
+        if since is not None:
+            df = df[df["date"] >= since]
+        metrics.count(rows_in=len(df))
+        df = df.assign(_row_hash=pd.util.hash_pandas_object(df[USECOLS], index=False))
+        dt = pd.to_datetime(df["date"], format=DATE_FORMAT)
+        df = df.drop(columns="date")
+        df["year"] = dt.dt.year
+        df["month"] = dt.dt.month
+        df["_date"] = dt
+        yield df
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    monthly.to_csv(OUT_PATH, index=False)
-    print(f"Saved processed AKTIN monthly to {OUT_PATH}")
 
-if __name__ == "__main__":
-    main()
+def partial_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mergeable per-group state: <col>_sum / <col>_count for every mean,
+    ed_count_min / ed_count_max. Indexed by KEYS (plain strings, not categories).
+    """
+    g = df.groupby(KEYS, observed=True, sort=False)
+    sums = g[list(MEANS)].sum().add_suffix("_sum")
+    counts = g[list(MEANS)].count().add_suffix("_count")
+    state = pd.concat([sums, counts], axis=1)
+    state["ed_count_min"] = g["ed_count"].min()
+    state["ed_count_max"] = g["ed_count"].max()
+
+    state = state.reset_index()
+    for c in ("syndrome", "age_group", "ed_type"):
+        state[c] = state[c].astype(object)
+    return state.set_index(KEYS)
+
+
+def merge_partials(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """Combines partial states; groups that occur in several parts are summed / min-maxed."""
+    state = pd.concat(parts)
+    if not state.index.has_duplicates:
+        return state
+    agg = {c: "sum" for c in state.columns if c.endswith(("_sum", "_count"))}
+    agg["ed_count_min"] = "min"
+    agg["ed_count_max"] = "max"
+    return state.groupby(level=KEYS, sort=False).agg(agg)
+
+
+def finalize(state: pd.DataFrame, ed_count_integral: bool) -> pd.DataFrame:
+    """Partial state -> aktin_monthly layout (same columns, order and dtypes as a plain groupby)."""
+    out = pd.DataFrame(index=state.index)
+    for src, dst in MEANS.items():
+        n = state[f"{src}_count"]
+        out[dst] = (state[f"{src}_sum"] / n).where(n > 0)
+    out["ed_count_min"] = state["ed_count_min"]
+    out["ed_count_max"] = state["ed_count_max"]
+    if ed_count_integral:
+        # read_csv would have inferred int64 for a complete integer column
+        out["ed_count_min"] = out["ed_count_min"].astype("int64")
+        out["ed_count_max"] = out["ed_count_max"].astype("int64")
+
+    out = out.reset_index().sort_values(KEYS, kind="stable").reset_index(drop=True)
+    out["year"] = out["year"].astype("int32")
+    out["month"] = out["month"].astype("int32")
+    return out[OUT_COLUMNS]
+
+
+def aggregate_partials(path: Path, chunk_rows: int = 0, since: str | None = None, ordered: bool = True):
+    """
+    Daily AKTIN rows -> (partial state per group, per-month info, last date) with bounded memory.
+
+    The file is ordered by date, so the rows of the last month in a chunk are carried
+    over into the next one; every group is therefore summed in one piece, in file
+    order, which keeps the means bit-identical to a single groupby. With ordered=False
+    (unsorted input) partial states of a month that shows up again later are merged.
+
+    Per-month info (index year*100+month): fingerprint (sum of row hashes) and
+    ed_count_integral (no NA, only whole numbers -> min/max are written as ints).
+    """
+    parts = []
+    months = []
+    carry = None
+    last_date = None
+
+    for chunk in read_daily(path, chunk_rows, since, ordered):
+        ym = chunk["year"] * 100 + chunk["month"]
+        ed = chunk["ed_count"]
+        months.append(pd.DataFrame({
+            "fingerprint": chunk["_row_hash"],
+            "ed_count_integral": ed.notna() & (ed % 1 == 0),
+        }).groupby(ym).agg({"fingerprint": "sum", "ed_count_integral": "all"}))
+        if not chunk.empty:
+            d = chunk["_date"].max()
+            last_date = d if last_date is None else max(last_date, d)
+
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        ym = chunk["year"] * 100 + chunk["month"]
+        last = ym == ym.iloc[-1]
+        carry = chunk[last]
+        done = chunk[~last]
+        if not done.empty:
+            parts.append(partial_aggregates(done))
+
+    if carry is not None and not carry.empty:
+        parts.append(partial_aggregates(carry))
+
+    month_info = (
+        pd.concat(months).groupby(level=0).agg({"fingerprint": "sum", "ed_count_integral": "all"})
+        if months else pd.DataFrame(columns=["fingerprint", "ed_count_integral"])
+    )
+    state = merge_partials(parts) if parts else None
+    return state, month_info, (last_date.date() if last_date is not None else None)
+
+
+# =========================
+# Byte offsets in the daily file
+# =========================
+def _date_of(line: bytes, date_col: int) -> bytes:
+    return line.split(b"\t", date_col + 1)[date_col][:10]
+
+
+def _month_of(line: bytes, date_col: int) -> bytes:
+    return _date_of(line, date_col)[:7]
+
+
+def _date_column(header: bytes) -> int:
+    return header.rstrip(b"\r\n").split(b"\t").index(b"date")
+
+
+def tail_from(path: Path, since: str) -> tuple[bytes, int]:
+    """
+    Header line and byte offset of the first line dated `since` or later, found by
+    bisecting the (date-ordered) file: a few dozen reads instead of parsing it all.
+    """
+    target = since.encode()
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header = f.readline()
+        date_col = _date_column(header)
+        # lo: start of a line, every line before it is older than `since`
+        lo, hi = len(header), size
+        while hi - lo > 1 << 16:
+            mid = (lo + hi) // 2
+            f.seek(mid)
+            f.readline()  # rest of the line the offset fell into
+            pos, line = f.tell(), f.readline()
+            if line and _date_of(line, date_col) < target:
+                lo = pos + len(line)
+            else:
+                hi = mid
+        f.seek(lo)
+        pos, line = lo, f.readline()
+        while line and _date_of(line, date_col) < target:
+            pos, line = f.tell(), f.readline()
+    return header, pos
+
+
+# =========================
+# Parallel aggregation
+# =========================
+def shard_ranges(path: Path, shards: int, start: int | None = None) -> tuple[bytes, list[tuple[int, int]]]:
+    """
+    Header line and byte ranges [start, end) of up to `shards` parts of similar size,
+    from `start` (default: the first data line) to the end of the file.
+    Every part starts with the first line of a month (the file is ordered by date), so
+    no group is split between parts and each is still summed in one piece, in file order.
+    """
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        header = f.readline()
+        date_col = _date_column(header)
+        first = len(header) if start is None else start
+        starts = [first]
+        for i in range(1, shards):
+            f.seek(max(first + (size - first) * i // shards, starts[-1]))
+            f.readline()  # rest of the line the offset fell into
+            pos, line = f.tell(), f.readline()
+            month = _month_of(line, date_col) if line else None
+            while line and _month_of(line, date_col) == month:
+                pos, line = f.tell(), f.readline()
+            if not line:
+                break
+            starts.append(pos)
+    bounds = starts + [size]
+    return header, [(bounds[i], bounds[i + 1]) for i in range(len(starts)) if bounds[i + 1] > bounds[i]]
 
+
+def _aggregate_shard(path: str, header: bytes, start: int, end: int, chunk_rows: int, since: str | None):
+    """Worker: parses and aggregates one byte range; only the partial state travels back."""
+    t0, cpu0 = time.perf_counter(), time.process_time()
+    with open(path, "rb") as f:
+        f.seek(start)
+        block = io.BytesIO(header + f.read(end - start))
+    with metrics.counting() as counts:
+        state, month_info, last_date = aggregate_partials(block, chunk_rows, since)
+    return (state, month_info, last_date, metrics.collected(counts),
+            time.perf_counter() - t0, time.process_time() - cpu0)
+
+
+def aggregate_parallel(path: Path, workers: int, chunk_rows: int = 0, since: str | None = None):
+    """
+    aggregate_partials() over month-aligned parts of the file in a process pool.
+    Workers read their part straight from the file; the partial states are merged
+    in file order, so the result is identical to the serial one.
+    """
+    # incremental run: only the part of the file from the revision window on
+    header, ranges = shard_ranges(path, workers, tail_from(path, since)[1] if since else None)
+    if not ranges:
+        return aggregate_partials(io.BytesIO(header), chunk_rows, since)
+    # forkserver: the pipeline runner has threads, forking it directly is not safe
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(["pandas"])  # workers start without importing it again
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges)), mp_context=ctx) as pool:
+        futures = [pool.submit(_aggregate_shard, str(path), header, start, end, chunk_rows, since)
+                   for start, end in ranges]
+        results = [f.result() for f in futures]  # part order = file order
+
+    # every part is ordered in itself (checked by the workers); the parts must follow each other
+    spans = [(r[1].index.min(), r[1].index.max()) for r in results if len(r[1])]
+    if any(prev[1] >= nxt[0] for prev, nxt in zip(spans, spans[1:])):
+        raise UnorderedInput(f"{path.name}: months of the parts overlap, file is not ordered by date")
+
+    for i, (state, month_info, _, counts, secs, cpu) in enumerate(results):
+        metrics.count(**counts)
+        metrics.add_cpu(cpu)
+        months = month_info.index
+        span = f"{months.min() // 100}-{months.min() % 100:02d}..{months.max() // 100}-{months.max() % 100:02d}" \
+            if len(months) else "-"
+        print(f"  - part {i}: {span}, {counts.get('rows_in', 0)} rows in {secs:.2f}s")
+
+    parts = [r[0] for r in results if r[0] is not None]
+    infos = [r[1] for r in results if len(r[1])]
+    dates = [r[2] for r in results if r[2] is not None]
+    month_info = (
+        pd.concat(infos).groupby(level=0).agg({"fingerprint": "sum", "ed_count_integral": "all"})
+        if infos else pd.DataFrame(columns=["fingerprint", "ed_count_integral"])
+    )
+    return (merge_partials(parts) if parts else None), month_info, (max(dates) if dates else None)
+
+
+def aggregate(path: Path, chunk_rows: int = 0, since: str | None = None, workers: int = WORKERS):
+    """
+    aggregate_partials(), sharded over `workers` processes if > 1.
+    A file that turns out not to be ordered by date is read again in full, serially.
+    """
+    try:
+        if workers > 1 and path.suffix == ".gz":
+            print("  - compressed raw file cannot be split, aggregating serially")
+        elif workers > 1:
+            return aggregate_parallel(path, workers, chunk_rows, since)
+        return aggregate_partials(path, chunk_rows, since)
+    except UnorderedInput as exc:
+        print(f"  - WARN: {exc}, aggregating the whole file serially")
+        return aggregate_partials(path, chunk_rows, since, ordered=False)
+
+
+def aggregate_monthly(path: Path, chunk_rows: int = 0, workers: int = 1) -> pd.DataFrame:
+    """Full aggregation of the daily file in aktin_monthly layout."""
+    state, month_info, _ = aggregate(path, chunk_rows, workers=workers)
+    if state is None:
+        return pd.DataFrame(columns=OUT_COLUMNS)
+    return finalize(state, bool(month_info["ed_count_integral"].all()))
+
+
+# =========================
+# Incremental state
+# =========================
+def _state_ym(state: pd.DataFrame) -> pd.Series:
+    idx = state.index
+    return pd.Series(
+        idx.get_level_values("year").astype("int64") * 100 + idx.get_level_values("month").astype("int64"),
+        index=idx,
+    )
+
+
+def load_state() -> dict | None:
+    if not STATE_PATH.exists():
+        return None
+    return pd.read_pickle(STATE_PATH)
+
+
+def save_state(state: pd.DataFrame, month_info: pd.DataFrame, watermark: date):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+    pd.to_pickle({"state": state, "months": month_info, "watermark": watermark}, tmp)
+    os.replace(tmp, STATE_PATH)
+
+
+def add_pending(months: list[int], full: bool):
+    """Months the load stage has not picked up yet (accumulates until load clears it)."""
+    pending = read_pending()
+    if pending is None:
+        pending = {"full": False, "months": []}
+    pending["full"] = pending["full"] or full
+    pending["months"] = sorted(set(pending["months"]) | set(int(m) for m in months))
+    PENDING_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PENDING_PATH.write_text(json.dumps(pending), encoding="utf-8")
+
+
+def read_pending() -> dict | None:
+    """{"full": bool, "months": [YYYYMM, ...]} or None if nothing was recorded."""
+    if not PENDING_PATH.exists():
+        return None
+    return json.loads(PENDING_PATH.read_text(encoding="utf-8"))
+
+
+def clear_pending():
+    PENDING_PATH.unlink(missing_ok=True)
+
+
+def run_incremental(path: Path, chunk_rows: int, full_rebuild: bool, workers: int = WORKERS):
+    """
+    Re-aggregates only the months whose daily rows changed since the last run.
+    Returns (monthly frame, touched months as YYYYMM, full rebuild?).
+    """
+    prev = None if full_rebuild else load_state()
+
+    if prev is None or prev["state"] is None or prev["watermark"] is None:
+        state, month_info, watermark = aggregate(path, chunk_rows, workers=workers)
+        touched = [int(m) for m in month_info.index]
+        full = True
+    else:
+        # start of the month that contains (watermark - revision window)
+        since = prev["watermark"] - timedelta(days=REVISION_DAYS)
+        since = since.replace(day=1)
+        new_state, new_info, watermark = aggregate(path, chunk_rows, since.isoformat(), workers)
+        watermark = watermark or prev["watermark"]
+
+        old_info = prev["months"]
+        since_ym = since.year * 100 + since.month
+        window = sorted(set(new_info.index) | set(m for m in old_info.index if m >= since_ym))
+        touched = [
+            int(m) for m in window
+            if m not in new_info.index or m not in old_info.index
+            or old_info.at[m, "fingerprint"] != new_info.at[m, "fingerprint"]
+        ]
+
+        old_state = prev["state"]
+        keep = ~_state_ym(old_state).isin(touched).to_numpy()
+        parts = [old_state[keep]]
+        if new_state is not None:
+            parts.append(new_state[_state_ym(new_state).isin(touched).to_numpy()])
+        state = pd.concat(parts)
+
+        month_info = pd.concat([
+            old_info[~old_info.index.isin(touched)],
+            new_info[new_info.index.isin(touched)],
+        ]).sort_index()
+        full = False
+
+    save_state(state, month_info, watermark)
+    if state is None or state.empty:
+        return pd.DataFrame(columns=OUT_COLUMNS), touched, full
+    return finalize(state, bool(month_info["ed_count_integral"].all())), touched, full
+
+
+def compare_serial(path: Path, chunk_rows: int, workers: int) -> bool:
+    """
+    Aggregates the whole file serially and with `workers` processes, reports the speedup
+    and whether both outputs are byte-identical (as Parquet). Writes nothing.
+    """
+    seconds, outputs = {}, {}
+    for n in (1, workers):
+        t0 = time.perf_counter()
+        monthly = aggregate_monthly(path, chunk_rows, n)
+        seconds[n] = time.perf_counter() - t0
+        buf = io.BytesIO()
+        monthly.to_parquet(buf, index=False)
+        outputs[n] = buf.getvalue()
+    identical = outputs[1] == outputs[workers]
+    print(f"serial: {seconds[1]:.2f}s, {workers} workers: {seconds[workers]:.2f}s "
+          f"-> speedup {seconds[1] / seconds[workers]:.2f}x on {os.cpu_count()} CPU(s); "
+          f"output {'byte-identical' if identical else 'DIFFERENT'}")
+    return identical
+
+
+def main(argv: list[str] | None = None) -> pd.DataFrame | None:
+    """Returns the monthly frame (for in-process callers) or None if the source was unchanged."""
+    parser = argparse.ArgumentParser(description="AKTIN daily -> monthly aggregates")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_ROWS,
+                        help="rows per read chunk (0 = whole file at once)")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="ignore the persisted state and re-aggregate the whole history")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="processes aggregating month ranges of the file in parallel (1 = serial)")
+    parser.add_argument("--compare-serial", action="store_true",
+                        help="only aggregate the file serially and with --workers, report the speedup "
+                             "and check that the outputs are identical (writes nothing)")
+    args = parser.parse_args(argv)
+
+    if args.compare_serial:
+        if not compare_serial(_raw_path(), args.chunk_size, max(2, args.workers)):
+            raise SystemExit("parallel output differs from the serial one")
+        return None
+
+    manifest = SourceManifest.load()
+    if processed.exists(OUT_NAME) and not args.full_rebuild and not manifest.has_changes(STAGE, ["aktin"]):
+        print(f"AKTIN source unchanged since last transform, keeping {OUT_NAME}")
+        return None
+
+    monthly, touched, full = run_incremental(_raw_path(), args.chunk_size, args.full_rebuild, args.workers)
+
+    for c in ("syndrome", "age_group", "ed_type"):
+        monthly[c] = monthly[c].astype("category")
+    paths = processed.write(monthly, OUT_NAME)
+    metrics.count(rows_out=len(monthly))
+    add_pending(touched, full)
+    print(f"Saved processed AKTIN monthly to {', '.join(str(p) for p in paths)}")
+    print(f"  - {'full rebuild' if full else 'incremental'}: {len(touched)} month(s) re-aggregated"
+          + (f" ({', '.join(f'{m // 100}-{m % 100:02d}' for m in touched)})" if not full and touched else ""))
+
+    manifest.mark_consumed(STAGE, ["aktin"])
+    manifest.save()
+    return monthly
+
+if __name__ == "__main__":
+    with metrics.stage(PIPELINE_STAGE), profiling.profiled(PIPELINE_STAGE):
+        main()
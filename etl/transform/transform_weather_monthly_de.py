@@ -1,6 +1,11 @@
+import json
+
 import pandas as pd
 from pathlib import Path
-from io import StringIO
+
+from etl import metrics, processed, profiling
+from etl.manifest import SourceManifest
+from etl.transform.dwd import parse_dwd_files
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
@@ -8,76 +13,113 @@ TEMP_DIR = PROJECT_ROOT / "data/raw/dwd/air_temperature_mean"
 PRECIP_DIR = PROJECT_ROOT / "data/raw/dwd/precipitation"
 SUN_DIR = PROJECT_ROOT / "data/raw/dwd/sunshine_duration"
 
-OUT_PATH = PROJECT_ROOT / "data/processed/weather_monthly_de.csv"
-
-
-def _parse_dwd_table_text(text: str) -> pd.DataFrame:
-    """Findet die Header-Zeile 'Jahr;Monat' und liest ab dort als ';'-CSV."""
-    lines = text.splitlines()
-    header_idx = None
-    for i, line in enumerate(lines):
-        if line.strip().startswith("Jahr;Monat"):
-            header_idx = i
-            break
-    if header_idx is None:
-        raise ValueError("Header 'Jahr;Monat' nicht gefunden (Format evtl. geändert).")
-
-    df = pd.read_csv(StringIO("\n".join(lines[header_idx:])), sep=";", engine="python")
-    df.columns = [c.strip() for c in df.columns]
-
-    # Trailing ';' erzeugt manchmal leere Spalte
-    df = df.loc[:, [c for c in df.columns if c and not c.startswith("Unnamed")]]
-    return df
-
-
-def _load_series(folder: Path, pattern: str, value_col: str) -> pd.DataFrame:
-    files = sorted(folder.glob(pattern))
-    if not files:
-        raise FileNotFoundError(f"Keine Dateien gefunden: {folder} pattern={pattern}")
-
-    parts = []
-    for p in files:
-        text = p.read_text(encoding="utf-8", errors="replace")
-        df = _parse_dwd_table_text(text)
-
-        if "Deutschland" not in df.columns:
-            raise ValueError(f"'Deutschland' nicht gefunden in {p.name}")
-
-        out = df[["Jahr", "Monat", "Deutschland"]].copy()
-        out = out.rename(columns={"Jahr": "year", "Monat": "month", "Deutschland": value_col})
-
-        # Dezimalkomma + Typen
-        out[value_col] = (
-            out[value_col].astype(str).str.strip().str.replace(",", ".", regex=False)
-        )
-        out[value_col] = pd.to_numeric(out[value_col], errors="coerce")
-
-        out["year"] = pd.to_numeric(out["year"], errors="coerce").astype("Int64")
-        out["month"] = pd.to_numeric(out["month"], errors="coerce").astype("Int64")
-
-        out = out.dropna(subset=["year", "month", value_col])
-        parts.append(out)
-
-    df_all = pd.concat(parts, ignore_index=True)
-    df_all = df_all.drop_duplicates(subset=["year", "month"], keep="last")
-    df_all = df_all.sort_values(["year", "month"]).reset_index(drop=True)
-    return df_all
-
-
-def main():
-    temp = _load_series(TEMP_DIR, "regional_averages_tm_*.txt", "temperature_mean")
-    precip = _load_series(PRECIP_DIR, "regional_averages_rr_*.txt", "precipitation")
-    sun = _load_series(SUN_DIR, "regional_averages_sd_*.txt", "sunshine_duration")
-
-    weather = temp.merge(precip, on=["year", "month"], how="inner").merge(sun, on=["year", "month"], how="inner")
-
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    weather.to_csv(OUT_PATH, index=False)
-
-    print(f"Saved processed weather to {OUT_PATH}")
+OUT_NAME = "weather_monthly_de"  # data/processed/weather_monthly_de.parquet (and/or .csv)
+REGIONAL_NAME = "weather_monthly_regional"  # long: year, month, region, parameter, value
+
+# months whose Germany-wide values changed and the load has not picked up yet
+PENDING_PATH = PROJECT_ROOT / "data/processed/weather_monthly_de_pending.json"
+
+# output column -> (folder, file pattern)
+SERIES = {
+    "temperature_mean": (TEMP_DIR, "regional_averages_tm_*.txt"),
+    "precipitation": (PRECIP_DIR, "regional_averages_rr_*.txt"),
+    "sunshine_duration": (SUN_DIR, "regional_averages_sd_*.txt"),
+}
+
+
+def _collect_files() -> dict[str, list[Path]]:
+    files = {}
+    for value_col, (folder, pattern) in SERIES.items():
+        found = sorted(folder.glob(pattern))
+        if not found:
+            raise FileNotFoundError(f"Keine Dateien gefunden: {folder} pattern={pattern}")
+        files[value_col] = found
+    return files
+
+
+def germany_monthly(long: pd.DataFrame) -> pd.DataFrame:
+    """Long regional table -> year, month, temperature_mean, precipitation, sunshine_duration (Deutschland)."""
+    de = long[long["region"] == "Deutschland"]
+    weather = None
+    for value_col in SERIES:
+        s = de.loc[de["parameter"] == value_col, ["year", "month", "value"]]
+        if s.empty:
+            raise ValueError(f"'Deutschland' nicht gefunden für {value_col}")
+        s = s.drop_duplicates(subset=["year", "month"], keep="last")
+        s = s.sort_values(["year", "month"]).reset_index(drop=True).rename(columns={"value": value_col})
+        weather = s if weather is None else weather.merge(s, on=["year", "month"], how="inner")
+    return weather
+
+
+def changed_months(previous: pd.DataFrame | None, weather: pd.DataFrame) -> list[int] | None:
+    """YYYYMM of the rows that are new, gone or different from `previous`; None = unknown (all)."""
+    if previous is None:
+        return None
+    keys = ["year", "month"]
+    both = weather.merge(previous[keys + list(SERIES)], on=keys, how="outer", suffixes=("", "_prev"), indicator=True)
+    diff = both["_merge"] != "both"
+    for c in SERIES:
+        new, old = both[c], both[f"{c}_prev"]
+        diff |= ~((new == old) | (new.isna() & old.isna()))
+    ym = both["year"].astype("int64") * 100 + both["month"].astype("int64")
+    return sorted(int(m) for m in ym[diff].unique())
+
+
+def add_pending(months: list[int] | None):
+    """Like the AKTIN transform's pending months; None = every month (accumulates until load clears it)."""
+    pending = read_pending() or {"full": False, "months": []}
+    pending["full"] = pending["full"] or months is None
+    pending["months"] = sorted(set(pending["months"]) | set(months or []))
+    PENDING_PATH.parent.mkdir(parents=True, exist_ok=True)
+    PENDING_PATH.write_text(json.dumps(pending), encoding="utf-8")
+
+
+def read_pending() -> dict | None:
+    """{"full": bool, "months": [YYYYMM, ...]} or None if nothing was recorded."""
+    if not PENDING_PATH.exists():
+        return None
+    return json.loads(PENDING_PATH.read_text(encoding="utf-8"))
+
+
+def clear_pending():
+    PENDING_PATH.unlink(missing_ok=True)
+
+
+STAGE = "transform_weather_monthly_de"  # manifest consumer
+PIPELINE_STAGE = "transform_weather"  # metrics / profile name, the same as under python -m etl
+
+
+def main() -> pd.DataFrame | None:
+    """Returns the Germany-wide monthly frame, or None if the sources were unchanged."""
+    manifest = SourceManifest.load()
+    if processed.exists(OUT_NAME) and not manifest.has_changes(STAGE, ["dwd"]):
+        print(f"DWD sources unchanged since last transform, keeping {OUT_NAME}")
+        return None
+
+    # alle 36 Dateien, alle Bundesländer, ein Parse-Durchlauf
+    regional = parse_dwd_files(_collect_files())
+    weather = germany_monthly(regional)
+    metrics.count(rows_in=len(regional), rows_out=len(weather))
+
+    previous = processed.read(OUT_NAME, ["year", "month", *SERIES])[0] if processed.exists(OUT_NAME) else None
+    months = changed_months(previous, weather)
+
+    paths = processed.write(weather, OUT_NAME)
+    paths += processed.write(regional, REGIONAL_NAME)
+
+    print(f"Saved processed weather to {', '.join(str(p) for p in paths)}")
     print(weather.head())
     print(f"Rows: {len(weather)} | Years: {int(weather['year'].min())}-{int(weather['year'].max())}")
+    print(f"Regional rows: {len(regional)} | Regions: {regional['region'].nunique()}")
+    print(f"Changed months: {'all' if months is None else len(months)}"
+          + (f" ({', '.join(f'{m // 100}-{m % 100:02d}' for m in months[:12])}{' ...' if len(months) > 12 else ''})"
+             if months else ""))
 
-if __name__ == "__main__":
-    main()
+    add_pending(months)
+    manifest.mark_consumed(STAGE, ["dwd"])
+    manifest.save()
+    return weather
 
+if __name__ == "__main__":
+    with metrics.stage(PIPELINE_STAGE), profiling.profiled(PIPELINE_STAGE):
+        main()
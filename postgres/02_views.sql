@@ -24,7 +24,10 @@ SELECT
   fe.sunshine_duration      AS sunshine_duration,
 
   -- A real date is convenient for time-series charts
-  make_date(dd.jahr, dd.monat, 1) AS month_date
+  make_date(dd.jahr, dd.monat, 1) AS month_date,
+
+  -- month key for the incremental refresh of the BI tables below
+  fe.datum_key              AS datum_key
 
 FROM fakt_erkrankungen fe
 JOIN dim_datum dd
@@ -36,3 +39,97 @@ JOIN dim_altersgruppe da
 JOIN dim_edtype de
   ON de.edtype_key = fe.edtype_key;
 
+
+
+-- Daily grain (only filled with ETL_DAILY=1)
+CREATE OR REPLACE VIEW bi.vw_erkrankungen_taeglich AS
+SELECT
+  dt.datum                  AS date,
+  dt.jahr                   AS year,
+  dt.monat                  AS month,
+  dt.woche                  AS iso_week,
+  dt.wochentag              AS weekday,
+  dt.saison                 AS season,
+
+  ds.bezeichnung            AS syndrome,
+  da.altersgruppe           AS age_group,
+  de.typ                    AS ed_type,
+
+  ft.relative_cases         AS relative_cases,
+  ft.relative_cases_7day_ma AS relative_cases_7day_ma,
+  ft.expected_value         AS expected_value,
+  ft.expected_lowerbound    AS expected_lowerbound,
+  ft.expected_upperbound    AS expected_upperbound,
+  ft.ed_count               AS ed_count
+
+FROM fakt_erkrankungen_taeglich ft
+JOIN dim_tag dt
+  ON dt.tag_key = ft.tag_key
+JOIN dim_syndrom ds
+  ON ds.syndrom_key = ft.syndrom_key
+JOIN dim_altersgruppe da
+  ON da.altersgruppe_key = ft.altersgruppe_key
+JOIN dim_edtype de
+  ON de.edtype_key = ft.edtype_key;
+
+-- =========================
+-- Materialized BI layer (maintained by the ETL load, etl/load/bi_layer.py)
+-- =========================
+-- Plain tables instead of MATERIALIZED VIEWs: the load replaces only the months it
+-- changed (DELETE + INSERT in its own transaction), readers keep seeing the previous
+-- snapshot until the commit and are never blocked.
+
+-- Flattened dataset (one row per fact) with the dashboard classes precomputed
+CREATE TABLE IF NOT EXISTS bi.erkrankungen_monatlich (
+  datum_key BIGINT NOT NULL,
+  year INT NOT NULL,
+  month INT NOT NULL,
+  month_date DATE NOT NULL,
+  season TEXT NOT NULL,
+
+  syndrome TEXT NOT NULL,
+  age_group TEXT NOT NULL,
+  ed_type TEXT NOT NULL,
+
+  relative_cases DOUBLE PRECISION NULL,
+  relative_cases_7day_ma DOUBLE PRECISION NULL,
+  expected_value DOUBLE PRECISION NULL,
+  expected_lowerbound DOUBLE PRECISION NULL,
+  expected_upperbound DOUBLE PRECISION NULL,
+  ed_count DOUBLE PRECISION NULL,
+
+  temperature_mean DOUBLE PRECISION NULL,
+  precipitation DOUBLE PRECISION NULL,
+  sunshine_duration DOUBLE PRECISION NULL,
+
+  temperature_class TEXT NULL,
+  precipitation_class TEXT NULL,
+  precipitation_category TEXT NULL,
+  sunshine_class TEXT NULL,
+
+  PRIMARY KEY (datum_key, syndrome, age_group, ed_type)
+);
+
+CREATE INDEX IF NOT EXISTS ix_bi_erkrankungen_filter
+  ON bi.erkrankungen_monatlich (age_group, ed_type, syndrome);
+
+-- Rollups for the dashboard groupings: one row per
+-- (rollup_dim, bucket, syndrome, age_group, ed_type) over all months.
+-- rollup_dim: season | temperature | precipitation | precipitation_category | sunshine
+CREATE TABLE IF NOT EXISTS bi.agg_erkrankungen_klassen (
+  rollup_dim TEXT NOT NULL,
+  bucket TEXT NOT NULL,
+  syndrome TEXT NOT NULL,
+  age_group TEXT NOT NULL,
+  ed_type TEXT NOT NULL,
+
+  n_months BIGINT NOT NULL,
+  sum_relative_cases DOUBLE PRECISION NULL,
+  avg_relative_cases DOUBLE PRECISION NULL,
+  avg_ed_count DOUBLE PRECISION NULL,
+
+  PRIMARY KEY (rollup_dim, bucket, syndrome, age_group, ed_type)
+);
+
+CREATE INDEX IF NOT EXISTS ix_bi_agg_klassen_filter
+  ON bi.agg_erkrankungen_klassen (age_group, ed_type, rollup_dim);
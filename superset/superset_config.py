@@ -9,3 +9,29 @@ WTF_CSRF_ENABLED = True
 # Optional: if you run behind proxies later, you can adjust these.
 # ENABLE_PROXY_FIX = True
 
+# --- Caching ---
+# The DWH only changes when the ETL loads new data (monthly cron), so chart results can be
+# cached for a long time. The ETL load invalidates the dashboard's entries and re-warms its
+# charts afterwards (etl/load/superset_cache.py). File system cache in the superset_home
+# volume: shared by the gunicorn workers and kept across container restarts.
+CACHE_TTL = int(os.environ.get("SUPERSET_CACHE_TTL", str(35 * 24 * 3600)))
+CACHE_ROOT = os.environ.get("SUPERSET_CACHE_DIR", "/app/superset_home/cache")
+
+
+def _file_cache(name: str, timeout: int = CACHE_TTL) -> dict:
+    return {
+        "CACHE_TYPE": "FileSystemCache",
+        "CACHE_DIR": os.path.join(CACHE_ROOT, name),
+        "CACHE_DEFAULT_TIMEOUT": timeout,
+        "CACHE_KEY_PREFIX": f"superset_{name}_",
+        "CACHE_THRESHOLD": 10000,
+    }
+
+
+CACHE_CONFIG = _file_cache("metadata")              # dashboard/chart metadata
+DATA_CACHE_CONFIG = _file_cache("data")             # chart query results
+FILTER_STATE_CACHE_CONFIG = _file_cache("filter_state", 7 * 24 * 3600)
+EXPLORE_FORM_DATA_CACHE_CONFIG = _file_cache("explore_form_data", 7 * 24 * 3600)
+
+# record the cache keys per dataset, needed for /api/v1/cachekey/invalidate
+STORE_CACHE_KEYS_IN_METADATA_DB = True